@@ -0,0 +1,259 @@
+"""
+Word alignment for dictation scoring.
+
+Produces difflib-compatible opcodes from a single alignment pass. Words that
+occur exactly once on both sides are used as anchors (patience diff), and the
+gaps between anchors are aligned with Myers' linear-space O(ND) algorithm, so
+long transcripts with few mistakes stay close to linear time.
+
+Patience anchoring is not minimal: a unique word can pin the alignment to a
+pairing that costs more matches elsewhere (about 1 in 1000-3000 real and
+random cases). The whole input is therefore also aligned with Myers alone,
+and the result with more matched words is kept. Only the top level does
+this; repeating it in every anchored window adds up to O((N+M)D). The retry
+is abandoned once it runs out of budget, since it can only win where Myers
+finishes cheaply.
+"""
+from bisect import bisect_left
+from difflib import SequenceMatcher
+from typing import List, Tuple, Sequence, Hashable
+
+Block = Tuple[int, int, int]
+Opcode = Tuple[str, int, int, int, int]
+
+# Edit distance explored per bisection before falling back to the furthest
+# point reached (GNU diff's "too expensive" heuristic). Bounds the worst case
+# for unrelated texts at the cost of a possibly non-minimal alignment.
+MAX_COST = 128
+
+# Myers work (diagonals visited) one get_matching_blocks() call may spend, per
+# input element, across all bisections. Transcripts with up to half their words
+# wrong are aligned by the anchors and stay inside it (benchmarks/
+# bench_alignment.py). Only text with almost nothing in common (reversed,
+# unrelated) spends it; the gaps left are then aligned by difflib.SequenceMatcher
+# instead of costing O((N+M)D).
+COST_PER_ELEMENT = 1
+MIN_TOTAL_COST = 4096
+
+
+def _bisect(a: Sequence, b: Sequence, a0: int, a1: int, b0: int, b1: int, budget: List[int]):
+    """
+    Find the middle snake of the shortest edit script for a[a0:a1] and b[b0:b1].
+    Each step of d is charged to budget[0].
+
+    Returns:
+        (x, y) split point in absolute coordinates, or None if nothing matches
+    """
+    n, m = a1 - a0, b1 - b0
+    max_d = (n + m + 1) // 2
+    best_x = best_y = 0
+    offset = max_d
+    size = 2 * max_d + 2
+    v1 = [-1] * size
+    v2 = [-1] * size
+    v1[offset + 1] = 0
+    v2[offset + 1] = 0
+    delta = n - m
+    front = delta % 2 != 0
+    k1start = k1end = k2start = k2end = 0
+
+    for d in range(max_d):
+        # Forward path
+        for k1 in range(-d + k1start, d + 1 - k1end, 2):
+            k1_offset = offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[a0 + x1] == b[b0 + y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1_offset] = x1
+            if x1 + y1 > best_x + best_y and x1 <= n and y1 <= m:
+                best_x, best_y = x1, y1
+            if x1 > n:
+                k1end += 2
+            elif y1 > m:
+                k1start += 2
+            elif front:
+                k2_offset = offset + delta - k1
+                if 0 <= k2_offset < size and v2[k2_offset] != -1:
+                    if x1 >= n - v2[k2_offset]:
+                        return a0 + x1, b0 + y1
+
+        # Reverse path
+        for k2 in range(-d + k2start, d + 1 - k2end, 2):
+            k2_offset = offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[a1 - x2 - 1] == b[b1 - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            v2[k2_offset] = x2
+            if x2 > n:
+                k2end += 2
+            elif y2 > m:
+                k2start += 2
+            elif not front:
+                k1_offset = offset + delta - k2
+                if 0 <= k1_offset < size and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    y1 = offset + x1 - k1_offset
+                    if x1 >= n - x2:
+                        return a0 + x1, b0 + y1
+
+        budget[0] -= 2 * (d + 1)
+        if d >= MAX_COST or budget[0] <= 0:
+            # Too expensive: split at the furthest forward point, or the middle
+            if 0 < best_x + best_y < n + m:
+                return a0 + best_x, b0 + best_y
+            return a0 + n // 2, b0 + m // 2
+    return None
+
+
+def _unique_anchors(a: Sequence, b: Sequence, a0: int, a1: int, b0: int, b1: int) -> List[Tuple[int, int]]:
+    """
+    Patience anchors: elements occurring exactly once in both ranges, reduced
+    to the longest run that is increasing on both sides.
+    """
+    counts = {}
+    for i in range(a0, a1):
+        entry = counts.get(a[i])
+        counts[a[i]] = [1, i, -1] if entry is None else [entry[0] + 1, i, -1]
+    for j in range(b0, b1):
+        entry = counts.get(b[j])
+        if entry is not None and entry[0] == 1:
+            # -1: not seen in b yet; >= 0: seen once; -2: seen more than once
+            entry[2] = j if entry[2] == -1 else -2
+
+    pairs = sorted((i, j) for count, i, j in counts.values() if count == 1 and j >= 0)
+    if not pairs:
+        return []
+
+    # Longest increasing subsequence on the b indexes (patience sorting)
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        pile = bisect_left(tails, j)
+        if pile == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[pile] = j
+            tail_index[pile] = index
+        previous[index] = tail_index[pile - 1] if pile > 0 else -1
+
+    anchors = []
+    index = tail_index[-1]
+    while index != -1:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _align(a: Sequence, b: Sequence, a0: int, a1: int, b0: int, b1: int, blocks: List[Block],
+           budget: List[int], patience: bool = True):
+    """Append the matching blocks of a[a0:a1] vs b[b0:b1] in order"""
+    # Common prefix
+    start = 0
+    while a0 + start < a1 and b0 + start < b1 and a[a0 + start] == b[b0 + start]:
+        start += 1
+    if start:
+        blocks.append((a0, b0, start))
+        a0 += start
+        b0 += start
+
+    # Common suffix
+    end = 0
+    while a1 - end > a0 and b1 - end > b0 and a[a1 - end - 1] == b[b1 - end - 1]:
+        end += 1
+    a1 -= end
+    b1 -= end
+
+    if a0 < a1 and b0 < b1:
+        anchors = _unique_anchors(a, b, a0, a1, b0, b1) if patience else []
+        if anchors:
+            i, j = a0, b0
+            for ai, bj in anchors:
+                _align(a, b, i, ai, j, bj, blocks, budget)
+                blocks.append((ai, bj, 1))
+                i, j = ai + 1, bj + 1
+            _align(a, b, i, a1, j, b1, blocks, budget)
+        elif budget[0] <= 0:
+            # Left unaligned by the plain retry, which get_matching_blocks() then discards
+            if patience:
+                matcher = SequenceMatcher(None, a[a0:a1], b[b0:b1])
+                blocks.extend((a0 + i, b0 + j, size) for i, j, size in matcher.get_matching_blocks() if size)
+        elif not set(a[a0:a1]).isdisjoint(b[b0:b1]):
+            split = _bisect(a, b, a0, a1, b0, b1, budget)
+            if split is not None:
+                x, y = split
+                _align(a, b, a0, x, b0, y, blocks, budget, patience)
+                _align(a, b, x, a1, y, b1, blocks, budget, patience)
+
+    if end:
+        blocks.append((a1, b1, end))
+
+
+def get_matching_blocks(a: Sequence[Hashable], b: Sequence[Hashable]) -> List[Block]:
+    """
+    Align two sequences.
+
+    Returns:
+        (i, j, size) blocks with a[i:i+size] == b[j:j+size], merged and
+        terminated by a (len(a), len(b), 0) sentinel like difflib
+    """
+    raw: List[Block] = []
+    budget = [max(MIN_TOTAL_COST, COST_PER_ELEMENT * (len(a) + len(b)))]
+    _align(a, b, 0, len(a), 0, len(b), raw, budget)
+    # Keep the plain Myers alignment if the anchors cost matches. Skipped when every
+    # element of the shorter side is already matched, as nothing can beat that, or
+    # when the anchored pass has used up the budget; dropped if it runs out itself.
+    matched = sum(size for _, _, size in raw)
+    if budget[0] > 0 and matched < min(len(a), len(b)):
+        plain: List[Block] = []
+        _align(a, b, 0, len(a), 0, len(b), plain, budget, patience=False)
+        if budget[0] > 0 and sum(size for _, _, size in plain) > matched:
+            raw = plain
+
+    blocks: List[Block] = []
+    for i, j, size in raw:
+        if blocks and blocks[-1][0] + blocks[-1][2] == i and blocks[-1][1] + blocks[-1][2] == j:
+            last = blocks[-1]
+            blocks[-1] = (last[0], last[1], last[2] + size)
+        else:
+            blocks.append((i, j, size))
+    blocks.append((len(a), len(b), 0))
+    return blocks
+
+
+def get_opcodes(a: Sequence[Hashable], b: Sequence[Hashable]) -> List[Opcode]:
+    """difflib.SequenceMatcher.get_opcodes() equivalent built on get_matching_blocks()"""
+    opcodes: List[Opcode] = []
+    i = j = 0
+    for ai, bj, size in get_matching_blocks(a, b):
+        if i < ai and j < bj:
+            opcodes.append(('replace', i, ai, j, bj))
+        elif i < ai:
+            opcodes.append(('delete', i, ai, j, bj))
+        elif j < bj:
+            opcodes.append(('insert', i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            opcodes.append(('equal', ai, i, bj, j))
+    return opcodes
+
+
+def similarity(a: Sequence[Hashable], b: Sequence[Hashable]) -> float:
+    """Ratio of matched elements, 2 * matches / (len(a) + len(b)), like SequenceMatcher.ratio()"""
+    total = len(a) + len(b)
+    if not total:
+        return 1.0
+    matches = sum(size for _, _, size in get_matching_blocks(a, b))
+    return 2.0 * matches / total
@@ -1,14 +1,25 @@
 import os
 import re
 import json
-import difflib
-from flask import Flask, render_template, jsonify, send_file, request
+import tempfile
+import mimetypes
+from flask import Flask, render_template, jsonify, request
 from flask_cors import CORS
-import google.generativeai as genai
 import sys
-from collections import Counter
 from keyword_extractor import IELTSKeywordExtractor
 from search_engine import IELTSProjectSearch
+from catalog import MaterialCatalog
+from alignment import get_opcodes, similarity
+from transcripts import TranscriptStore, normalize_text
+from dictation import DictationSession, DictationSessions
+from pdf_analysis import PdfWordCounter, PdfAnalysisCache, spool_upload
+from jobs import JobQueue, FINISHED as JOB_FINISHED
+from llm_client import GeminiClient, GeminiBackend, FakeBackend
+from question_bank import QuestionCache, question_key, build_prompt, parse_questions, stream_questions
+from llm_json import extract_json, PartialObjectStream
+from payloads import JsonFilePayload, warm_payloads
+from lesson_index import LessonIndex
+from media import FileDigests, open_range
 
 # Add temporary libs to sys.path
 sys.path.append('/tmp/pip_libs')
@@ -18,13 +29,27 @@ try:
 except ImportError:
     PdfReader = None
 
-# Configure Gemini
+# Every Gemini call goes through one client: bounded concurrency, deadlines, retries.
+# LLM_BACKEND=fake answers with canned JSON so the app can be load-tested offline.
+# The Gemini model (and the google.generativeai import) is built on first use.
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel('gemini-flash-latest')
+if os.environ.get("LLM_BACKEND") == 'fake':
+    llm_backend = FakeBackend(latency=float(os.environ.get("LLM_FAKE_LATENCY", 0.5)))
+elif GEMINI_API_KEY:
+    llm_backend = GeminiBackend(api_key=GEMINI_API_KEY, model_name='gemini-flash-latest')
 else:
-    model = None
+    llm_backend = None
+llm = GeminiClient(
+    llm_backend,
+    max_concurrency=int(os.environ.get("GEMINI_MAX_CONCURRENCY", 8)),
+    timeout=float(os.environ.get("GEMINI_TIMEOUT", 30))
+) if llm_backend else None
+
+# Shapes the Gemini responses must have before they are returned to the client
+NUMBER = (int, float, str)
+SPEAKING_SCHEMA = {'score': NUMBER, 'feedback': str}
+SPEAKING_AUDIO_SCHEMA = {'overall_score': NUMBER, 'scores?': dict, 'analysis?': dict}
+ANSWER_SCHEMA = {'explanation': str, 'is_correct?': bool}
 
 app = Flask(__name__)
 CORS(app)
@@ -32,89 +57,103 @@ CORS(app)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Initialize keyword extractor and search engine
-keyword_extractor = IELTSKeywordExtractor()
-search_engine = IELTSProjectSearch()
+keyword_extractor = IELTSKeywordExtractor(cache_size=int(os.environ.get("KEYWORD_CACHE_SIZE", 4096)))
+# Load NLTK off the import path; requests that need tagging wait for it if it is not ready yet
+keyword_warm_up = keyword_extractor.warm_up(
+    background=True,
+    lessons_path=os.path.join(BASE_DIR, 'data', 'lessons.json') if os.environ.get("KEYWORD_CACHE_WARM") else None
+)
+# The search index is built off the import path too; the first search waits for it if needed
+search_engine = IELTSProjectSearch(synonym_lookup=keyword_extractor._get_synonyms, build=False)
+search_warm_up = search_engine.warm_up(background=True)
+
+# Scan the Cambridge/TOEFL folders once; later requests only re-list changed directories.
+# The index is persisted so restarted workers only stat directories instead of walking them.
+catalog = MaterialCatalog(BASE_DIR, index_path=os.path.join(BASE_DIR, 'data', 'catalog_index.json'))
+
+# Content-hash ETags for served PDFs and audio, persisted so restarts do not re-hash
+media_digests = FileDigests(os.path.join(BASE_DIR, 'data', 'media_digests.json'))
+MEDIA_MAX_AGE = int(os.environ.get("MEDIA_MAX_AGE", 7 * 86400))
+
+# Listening transcripts pre-normalized and pre-tokenized for /api/dictation/compare
+transcripts = TranscriptStore()
+# Live dictation sessions scored incrementally as words are typed
+dictation_sessions = DictationSessions(ttl=float(os.environ.get("DICTATION_SESSION_TTL", 1800)))
+
+# Uploaded PDFs are counted page-parallel in a process pool started on first use
+pdf_counter = PdfWordCounter(
+    keyword_extractor.filler_words,
+    workers=int(os.environ.get("PDF_WORKERS", 0)) or None
+)
+# Analyses keyed by the SHA-256 of the upload, so re-uploaded books are answered from disk
+pdf_cache = PdfAnalysisCache(
+    os.path.join(BASE_DIR, 'data', 'pdf_cache'),
+    max_bytes=int(os.environ.get("PDF_CACHE_MAX_MB", 64)) << 20
+)
+
+# Generated question sets keyed by article content; `python question_bank.py` pre-fills it
+question_cache = QuestionCache(
+    os.path.join(BASE_DIR, 'data', 'question_cache'),
+    max_bytes=int(os.environ.get("QUESTION_CACHE_MAX_MB", 16)) << 20,
+    ttl=float(os.environ.get("QUESTION_CACHE_TTL_DAYS", 30)) * 86400
+)
+
+# Slow endpoints can run as background jobs (?async=1); state lives in SQLite
+jobs = JobQueue(
+    os.path.join(BASE_DIR, 'data', 'jobs.sqlite3'),
+    workers=int(os.environ.get("JOB_WORKERS", 4))
+)
+
+# Read-mostly data files served as pre-serialized, pre-compressed bytes, swapped when the file changes
+data_payloads = {
+    name: JsonFilePayload(os.path.join(BASE_DIR, 'data', f'{name}.json'))
+    for name in ('lessons', 'vocabulary', 'guardian_articles')
+}
+payload_warm_up = warm_payloads(data_payloads.values())
+# Per-book / per-test lookups and field projections over lessons.json
+lesson_index = LessonIndex(data_payloads['lessons'])
 
 def get_pdf_files():
-    pdf_files = []
-    # Walk through the directory to find PDF files
-    # We are looking for 'Cambridge IELTS *' and 'TOEFL' directories
-    for root, dirs, files in os.walk(BASE_DIR):
-        for file in files:
-            if file.lower().endswith('.pdf'):
-                # Get relative path
-                rel_path = os.path.relpath(os.path.join(root, file), BASE_DIR)
-                # Filter to only include relevant directories
-                if 'Cambridge IELTS' in rel_path or 'TOEFL' in rel_path:
-                    pdf_files.append({
-                        'name': file,
-                        'path': rel_path,
-                        'category': 'IELTS' if 'Cambridge' in rel_path else 'TOEFL'
-                    })
-    return pdf_files
+    return catalog.get_pdf_files()
 
 def get_audio_files():
-    audio_files = []
-    
-    # Regex patterns for parsing filenames
-    pattern_section = re.compile(r'Test\s*(\d+)[_\s]+Section\s*(\d+)', re.IGNORECASE)
-    pattern_test = re.compile(r'Test\s*(\d+)', re.IGNORECASE)
-    pattern_track = re.compile(r'Track\s*(\d+)', re.IGNORECASE)
-
-    for root, dirs, files in os.walk(BASE_DIR):
-        for file in files:
-            if file.lower().endswith('.mp3'):
-                rel_path = os.path.relpath(os.path.join(root, file), BASE_DIR)
-                if 'Cambridge IELTS' in rel_path:
-                    book_name = "Cambridge IELTS Unknown"
-                    test_num = "Unknown"
-                    section_num = "All"
-                    
-                    # Extract book from path
-                    parts = rel_path.split(os.sep)
-                    for part in parts:
-                        if 'Cambridge IELTS' in part:
-                            book_name = part
-                            break
-                    
-                    # Try to extract from filename
-                    match_section = pattern_section.search(file)
-                    match_test = pattern_test.search(file)
-                    match_track = pattern_track.search(file)
-                    
-                    if match_section:
-                        test_num = match_section.group(1)
-                        section_num = match_section.group(2)
-                    elif match_test:
-                        test_num = match_test.group(1)
-                        if match_track:
-                             section_num = match_track.group(1)
-                    elif match_track:
-                        section_num = match_track.group(1)
-                    
-                    audio_files.append({
-                        'name': file,
-                        'path': rel_path,
-                        'book': book_name,
-                        'test': test_num,
-                        'section': section_num
-                    })
-    
-    # Sort files: Book -> Test -> Section
-    def sort_key(x):
-        try:
-            # Extract numbers for sorting
-            b_match = re.search(r'(\d+)', x['book'])
-            b = int(b_match.group(1)) if b_match else 0
-            t = int(x['test']) if x['test'].isdigit() else 0
-            s = int(x['section']) if x['section'].isdigit() else 0
-            return (b, t, s)
-        except:
-            return (0, 0, 0)
-
-    audio_files.sort(key=sort_key)
-    print(f"Found {len(audio_files)} audio files")
-    return audio_files
+    return catalog.get_audio_files()
+
+def catalog_response(name):
+    """Serve a pre-serialized catalog list with ETag / 304 support"""
+    body, etag = catalog.payload(name)
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+def payload_response(name):
+    """Serve a prepared data file"""
+    return prepared_response(data_payloads[name].get())
+
+def prepared_response(prepared):
+    """Serve a PreparedPayload in the best encoding the client accepts, with ETag / 304 support"""
+    body, encoding, etag = prepared.select(request.accept_encodings)
+    response = app.response_class(body, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    """Stream an iterator of formatted events without proxy buffering"""
+    response = app.response_class(events, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def wants_stream():
+    """Clients ask for incremental results with Accept: text/event-stream"""
+    return request.accept_mimetypes.best == 'text/event-stream'
 
 @app.route('/')
 def index():
@@ -122,38 +161,69 @@ def index():
 
 @app.route('/api/materials')
 def list_materials():
-    materials = get_pdf_files()
-    print(f"Found {len(materials)} PDF materials")
-    return jsonify(materials)
+    return catalog_response('pdfs')
 
 @app.route('/api/audio')
 def list_audio():
-    audio = get_audio_files()
-    return jsonify(audio)
+    return catalog_response('audio')
+
+def media_response(kind, filename):
+    """
+    Serve a cataloged PDF or mp3 with a content-hash ETag and single-range support.
+
+    Ranged and full bodies are handed to the server's wsgi.file_wrapper so
+    gunicorn/waitress can use sendfile(); multi-range requests get the
+    whole file.
+    """
+    file_path = catalog.resolve(kind, filename)
+    if file_path is None:
+        return "File not found", 404
+    try:
+        stat = os.stat(file_path)
+        etag = media_digests.get(file_path, stat)
+    except OSError:
+        return "File not found", 404
+    size = stat.st_size
+
+    headers = {
+        'ETag': f'"{etag}"',
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': f'public, max-age={MEDIA_MAX_AGE}'
+    }
+    if request.if_none_match.contains(etag):
+        return app.response_class(status=304, headers=headers)
+
+    start, stop, status = 0, size, 200
+    # A stale If-Range validator means the client's partial copy is outdated: send it all
+    if request.range and ('If-Range' not in request.headers or request.if_range.etag == etag):
+        byte_range = request.range.range_for_length(size)
+        if byte_range is None and request.range.units == 'bytes' and len(request.range.ranges) == 1:
+            headers['Content-Range'] = f'bytes */{size}'
+            return app.response_class(status=416, headers=headers)
+        if byte_range is not None:
+            start, stop = byte_range
+            status = 206
+            headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+
+    body = open_range(file_path, start, stop - start, request.environ.get('wsgi.file_wrapper'))
+    response = app.response_class(body, status=status, headers=headers, direct_passthrough=True,
+                                  mimetype=mimetypes.guess_type(file_path)[0] or 'application/octet-stream')
+    response.content_length = stop - start
+    return response
 
 @app.route('/pdfs/<path:filename>')
 def serve_pdf(filename):
-    # Security check to prevent directory traversal
-    if '..' in filename or filename.startswith('/'):
-        return "Invalid path", 400
-    
-    file_path = os.path.join(BASE_DIR, filename)
-    if os.path.exists(file_path):
-        return send_file(file_path)
-    else:
-        return "File not found", 404
+    return media_response('pdfs', filename)
 
 @app.route('/audio/<path:filename>')
 def serve_audio(filename):
-    if '..' in filename or filename.startswith('/'):
-        return "Invalid path", 400
-    
-    file_path = os.path.join(BASE_DIR, filename)
-    if os.path.exists(file_path):
-        return send_file(file_path)
-    else:
-        return "File not found", 404
+    return media_response('audio', filename)
+
 
+@app.route('/api/dictation/transcripts')
+def list_transcripts():
+    """List the reference transcripts that can be compared against by ID"""
+    return jsonify(transcripts.list())
 
 @app.route('/api/dictation/compare', methods=['POST'])
 def compare_transcripts():
@@ -161,33 +231,40 @@ def compare_transcripts():
     try:
         data = request.get_json()
         user_text = data.get('user_text', '').strip()
-        reference_text = data.get('reference_text', '').strip()
-        
-        if not user_text or not reference_text:
-            return jsonify({'error': 'Both user_text and reference_text are required'}), 400
+        transcript_id = data.get('transcript_id')
         
-        # Normalize texts for comparison (lowercase, remove extra spaces)
-        user_normalized = normalize_text(user_text)
-        reference_normalized = normalize_text(reference_text)
-        
-        # Generate diff
-        user_lines = user_normalized.split('\n')
-        reference_lines = reference_normalized.split('\n')
-        
-        # Use difflib for word-level comparison
-        user_words = user_normalized.split()
-        reference_words = reference_normalized.split()
+        if transcript_id:
+            # Stored transcript: its words and token ids are already prepared
+            reference = transcripts.get(transcript_id)
+            if reference is None:
+                return jsonify({'error': f'Unknown transcript_id: {transcript_id}'}), 404
+            if not user_text:
+                return jsonify({'error': 'user_text is required'}), 400
+            reference_text = reference.text
+            reference_words = reference.words
+            user_words = normalize_text(user_text).split()
+            opcodes = get_opcodes(transcripts.encode(user_words), reference.token_ids)
+        else:
+            reference_text = data.get('reference_text', '').strip()
+            if not user_text or not reference_text:
+                return jsonify({'error': 'Both user_text and reference_text (or transcript_id) are required'}), 400
+            
+            # Normalize texts for comparison (lowercase, remove extra spaces)
+            user_words = normalize_text(user_text).split()
+            reference_words = normalize_text(reference_text).split()
+            # Align the word lists once; HTML, errors and accuracy all reuse the opcodes
+            opcodes = get_opcodes(user_words, reference_words)
         
         # Create HTML with error highlighting
         user_html, reference_html, errors = create_comparison_html(
-            user_text, reference_text, user_words, reference_words
+            user_text, reference_text, user_words, reference_words, opcodes
         )
         
         return jsonify({
             'user_html': user_html,
             'reference_html': reference_html,
             'errors': errors,
-            'accuracy': calculate_accuracy(user_words, reference_words),
+            'accuracy': calculate_accuracy(user_words, reference_words, opcodes),
             'total_words_user': len(user_words),
             'total_words_reference': len(reference_words)
         })
@@ -195,25 +272,96 @@ def compare_transcripts():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def normalize_text(text):
-    """Normalize text for comparison"""
-    # Lowercase, remove extra whitespace, preserve sentence structure
-    text = re.sub(r'\s+', ' ', text)
-    return text.lower().strip()
+@app.route('/api/dictation/session', methods=['POST'])
+def create_dictation_session():
+    """Start live scoring against a stored transcript_id or an ad-hoc reference_text"""
+    data = request.get_json() or {}
+    transcript_id = data.get('transcript_id')
+    reference_text = (data.get('reference_text') or '').strip()
+    
+    if transcript_id:
+        reference = transcripts.get(transcript_id)
+        if reference is None:
+            return jsonify({'error': f'Unknown transcript_id: {transcript_id}'}), 404
+        session = DictationSession(reference.words, reference.token_ids, transcripts.encode,
+                                   categorize_error, transcript_id=transcript_id)
+    elif reference_text:
+        session = DictationSession.from_text(reference_text, categorize_error)
+    else:
+        return jsonify({'error': 'transcript_id or reference_text is required'}), 400
+    
+    dictation_sessions.add(session)
+    return jsonify({
+        'session_id': session.id,
+        'transcript_id': session.transcript_id,
+        'total_words_reference': len(session.reference_words)
+    })
+
+@app.route('/api/dictation/session/<session_id>/append', methods=['POST'])
+def append_dictation(session_id):
+    """Append typed words ({"text": "...", "retract": 0}) and return the incremental score"""
+    session = dictation_sessions.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Session not found or expired'}), 404
+    data = request.get_json() or {}
+    try:
+        retract = int(data.get('retract', 0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'retract must be an integer'}), 400
+    return jsonify(session.append(data.get('text', ''), retract=max(0, retract)))
+
+@app.route('/api/dictation/session/<session_id>/events')
+def dictation_events(session_id):
+    """Server-Sent Events stream of score updates for a session"""
+    session = dictation_sessions.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Session not found or expired'}), 404
+    
+    def stream():
+        # Updates can be skipped while we write; since() folds their committed errors in
+        version, epoch, committed = 0, None, 0
+        while True:
+            if session.wait(version, timeout=15.0) is None:
+                # Closed, or idle: stop once the session has been removed, evicted or has expired
+                if session.closed or dictation_sessions.get(session_id) is not session:
+                    break
+                yield ": keepalive\n\n"
+                continue
+            update, epoch, committed = session.since(epoch, committed)
+            version = update['version']
+            yield sse_event('reset' if update['reset'] else 'update', update)
+        yield sse_event('closed', {})
+    
+    return sse_response(stream())
+
+@app.route('/api/dictation/session/<session_id>', methods=['DELETE'])
+def close_dictation_session(session_id):
+    """End a session; returns the final list of errors"""
+    session = dictation_sessions.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Session not found or expired'}), 404
+    errors = session.errors()
+    summary = dict(session.last_update, errors=errors)
+    summary.pop('committed_errors', None)
+    summary.pop('pending_errors', None)
+    summary.pop('reset', None)
+    dictation_sessions.remove(session_id)
+    return jsonify(summary)
 
-def create_comparison_html(user_text, reference_text, user_words, reference_words):
+def create_comparison_html(user_text, reference_text, user_words, reference_words, opcodes=None):
     """Create HTML with highlighted differences and categorize errors"""
     errors = []
     
-    # Use SequenceMatcher for word-by-word comparison
-    matcher = difflib.SequenceMatcher(None, user_words, reference_words)
+    # Word-by-word alignment (computed here if the caller has not already)
+    if opcodes is None:
+        opcodes = get_opcodes(user_words, reference_words)
     
     user_html_parts = []
     reference_html_parts = []
     user_pos = 0
     ref_pos = 0
     
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+    for tag, i1, i2, j1, j2 in opcodes:
         if tag == 'equal':
             # Matching words
             user_segment = ' '.join(user_words[i1:i2])
@@ -279,8 +427,8 @@ def categorize_error(user_word, correct_word):
     correct_lower = correct_word.lower().strip()
     
     # Spelling errors (similar words, typos)
-    similarity = difflib.SequenceMatcher(None, user_lower, correct_lower).ratio()
-    if similarity > 0.7 and similarity < 1.0:
+    ratio = similarity(user_lower, correct_lower)
+    if ratio > 0.7 and ratio < 1.0:
         return 'spelling'
     
     # Common homophones
@@ -303,7 +451,7 @@ def categorize_error(user_word, correct_word):
         return 'grammar'
     
     # Vocabulary errors (completely different words)
-    if similarity < 0.5:
+    if ratio < 0.5:
         return 'vocabulary'
     
     # Default to listening if unclear
@@ -326,13 +474,14 @@ def check_grammar_errors(user_text, reference_text):
     # This is a simplified check - in production, use a proper grammar checker
     return errors
 
-def calculate_accuracy(user_words, reference_words):
+def calculate_accuracy(user_words, reference_words, opcodes=None):
     """Calculate accuracy percentage"""
     if not reference_words:
         return 0.0
     
-    matcher = difflib.SequenceMatcher(None, user_words, reference_words)
-    matches = sum(i2 - i1 for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag == 'equal')
+    if opcodes is None:
+        opcodes = get_opcodes(user_words, reference_words)
+    matches = sum(i2 - i1 for tag, i1, i2, j1, j2 in opcodes if tag == 'equal')
     
     return round((matches / len(reference_words)) * 100, 2)
 
@@ -385,6 +534,28 @@ def analyze_question_text():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/keywords/analyze/batch', methods=['POST'])
+def analyze_question_set():
+    """Analyze a whole question set against one passage in a single call"""
+    try:
+        data = request.get_json()
+        text = data.get('text', '')
+        questions = data.get('questions', [])
+        if not isinstance(text, str) or not isinstance(questions, list):
+            return jsonify({'error': 'text must be a string and questions a list'}), 400
+        text = text.strip()
+        questions = [q.strip() for q in questions if isinstance(q, str) and q.strip()]
+        
+        if not questions or not text:
+            return jsonify({'error': 'Both questions and text are required'}), 400
+        
+        analysis = keyword_extractor.analyze_question_set(questions, text)
+        
+        return jsonify(analysis)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/keywords/matches', methods=['POST'])
 def find_keyword_matches():
     """Find matches for specific keywords in text"""
@@ -408,6 +579,16 @@ def find_keyword_matches():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/keywords/status')
+def keyword_extractor_status():
+    """Readiness of the keyword extractor's tagger"""
+    return jsonify(keyword_extractor.status())
+
+@app.route('/api/keywords/cache/stats')
+def keyword_cache_stats():
+    """Hit/miss/eviction counters for the keyword extraction cache"""
+    return jsonify(keyword_extractor.keyword_cache.stats())
+
 @app.route('/api/keywords/synonyms/<word>')
 def get_synonyms(word):
     """Get synonyms for a specific word"""
@@ -422,21 +603,66 @@ def get_synonyms(word):
 
 @app.route('/api/lessons')
 def get_lessons():
-    """Serve the ingested lesson data"""
-    data_path = os.path.join(BASE_DIR, 'data', 'lessons.json')
-    if os.path.exists(data_path):
-        with open(data_path, 'r') as f:
-            return jsonify(json.load(f))
-    return jsonify([])
+    """
+    Serve the ingested lesson data.
+
+    ?fields=book,tests.test_number,reading.title keeps only those fields;
+    ?limit=N (and the returned next_cursor as ?cursor=) pages through books.
+    """
+    try:
+        tree = lesson_index.parse_fields(request.args.get('fields'))
+        limit = request.args.get('limit')
+        if limit is not None:
+            if not limit.isdigit() or int(limit) < 1:
+                return jsonify({'error': 'limit must be a positive integer'}), 400
+            limit = int(limit)
+        prepared = lesson_index.lessons(tree, cursor=request.args.get('cursor'), limit=limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return prepared_response(prepared)
+
+@app.route('/api/lessons/<book>')
+def get_lesson_book(book):
+    """One book, by slug ('cambridge-ielts-10') or exact name, with optional ?fields="""
+    try:
+        tree = lesson_index.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    prepared = lesson_index.book(book, tree)
+    if prepared is None:
+        return jsonify({'error': f'Unknown book: {book}'}), 404
+    return prepared_response(prepared)
+
+@app.route('/api/lessons/<book>/<int:test>')
+def get_lesson_test(book, test):
+    """One test of a book; ?fields= paths are relative to the test (e.g. reading.title)"""
+    try:
+        tree = lesson_index.parse_fields(request.args.get('fields'), scope='test')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    prepared = lesson_index.test(book, test, tree)
+    if prepared is None:
+        return jsonify({'error': f'Unknown test: {book}/{test}'}), 404
+    return prepared_response(prepared)
 
 @app.route('/api/vocabulary')
 def get_vocabulary():
     """Serve the analyzed vocabulary frequency data"""
-    data_path = os.path.join(BASE_DIR, 'data', 'vocabulary.json')
-    if os.path.exists(data_path):
-        with open(data_path, 'r') as f:
-            return jsonify(json.load(f))
-    return jsonify([])
+    return payload_response('vocabulary')
+
+def wants_async():
+    """Clients opt into background execution with ?async=1 or 'Prefer: respond-async'"""
+    return (request.args.get('async', '').lower() in ('1', 'true')
+            or 'respond-async' in request.headers.get('Prefer', ''))
+
+def job_accepted(kind, fn, *args):
+    """Queue fn(*args) as a background job and answer 202 with its polling URL"""
+    job_id = jobs.submit(kind, fn, *args)
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/api/jobs/{job_id}'
+    }), 202
 
 @app.route('/api/analyze/pdf', methods=['POST'])
 def analyze_pdf():
@@ -454,28 +680,35 @@ def analyze_pdf():
     if PdfReader is None:
         return jsonify({'error': 'PDF processing library (pypdf) not available'}), 500
 
+    # Spool the upload to disk so worker processes can read pages directly,
+    # hashing it on the way for the result cache
+    fd, tmp_path = tempfile.mkstemp(suffix='.pdf')
+    os.close(fd)
+    try:
+        digest = spool_upload(file.stream, tmp_path)
+    except Exception as e:
+        os.remove(tmp_path)
+        return jsonify({'error': str(e)}), 500
+    
+    cached = pdf_cache.get(digest)
+    if cached is not None:
+        os.remove(tmp_path)
+        return jsonify(dict(cached, filename=file.filename, cached=True))
+    
+    if wants_async():
+        return job_accepted('analyze_pdf', run_pdf_analysis, tmp_path, digest, file.filename)
+    payload, status = run_pdf_analysis(tmp_path, digest, file.filename)
+    return jsonify(payload), status
+
+def run_pdf_analysis(tmp_path, digest, filename):
+    """Count keyword frequencies of a spooled upload and cache the result; removes tmp_path"""
     try:
-        reader = PdfReader(file)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-        
-        if not text.strip():
-            return jsonify({'error': 'Could not extract text from PDF'}), 400
-
-        # Extract keyword frequencies
-        clean_text = keyword_extractor._clean_text(text)
-        words = clean_text.lower().split()
-        
-        word_counts = Counter()
-        for word in words:
-            if (word not in keyword_extractor.filler_words and 
-                len(word) > 2 and 
-                not word.isdigit()):
-                word_counts[word] += 1
+        # Extract and count page chunks in parallel, merging per-chunk Counters
+        word_counts, total_words = pdf_counter.count(tmp_path)
         
+        if not total_words:
+            return {'error': 'Could not extract text from PDF'}, 400
+
         total_content_words = sum(word_counts.values())
         
         results = []
@@ -487,36 +720,72 @@ def analyze_pdf():
                 'ratio': round(ratio, 2),
                 'synonyms': keyword_extractor._get_synonyms(word)[:3]
             })
-            
-        return jsonify({
-            'filename': file.filename,
-            'total_words': len(words),
+        
+        analysis = {
+            'total_words': total_words,
             'unique_keywords': len(word_counts),
             'frequencies': results
-        })
+        }
+        pdf_cache.put(digest, analysis)
+        return dict(analysis, filename=filename, cached=False), 200
 
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
+    finally:
+        os.remove(tmp_path)
+
+@app.route('/api/analyze/pdf/cache/stats')
+def pdf_cache_stats():
+    """Hit/miss/eviction counters and disk usage of the PDF analysis cache"""
+    return jsonify(pdf_cache.stats())
 
 @app.route('/api/evaluate/speaking', methods=['POST'])
 def evaluate_speaking():
-    """Evaluate speaking attempt using AI or mock feedback"""
+    """Evaluate a speaking attempt (audio and/or transcript) using Gemini or mock feedback"""
     # Note: In a production app, we would use Speech-to-Text here.
-    # For this simulation, we'll assume a transcript is provided or mock it.
+    # Without audio we assume a transcript is provided or mock it.
     transcript = request.form.get('transcript', '')
+    audio_data = request.files['audio'].read() if 'audio' in request.files else None
     
-    if not model:
-        import random
-        feedback_options = [
-            "Good fluency, but watch your pronunciation of 'th' sounds.",
-            "You used a nice range of vocabulary. Try to speak a bit faster.",
-            "Great work! Your grammar was mostly correct.",
-            "Try to expand more on your answers to reach a higher band score."
-        ]
-        return jsonify({
-            "score": random.choice([5.5, 6.0, 6.5, 7.0]),
-            "feedback": random.choice(feedback_options)
-        })
+    if llm and wants_stream():
+        contents, schema = speaking_prompt(transcript, audio_data)
+        return sse_response(stream_json(contents, schema, fallback=lambda e: speaking_error(e, audio_data)))
+    if llm and wants_async():
+        return job_accepted('evaluate_speaking', run_evaluate_speaking, transcript, audio_data)
+    payload, status = run_evaluate_speaking(transcript, audio_data)
+    return jsonify(payload), status
+
+def speaking_prompt(transcript, audio_data=None):
+    """Gemini contents and expected response schema for a speaking evaluation"""
+    if audio_data:
+        prompt = """
+        You are an expert IELTS Speaking examiner. Evaluate the provided audio response for a Part 2 speaking task.
+        
+        Criteria:
+        1. Fluency and Coherence (Band 0-9)
+        2. Lexical Resource (Band 0-9)
+        3. Grammatical Range and Accuracy (Band 0-9)
+        4. Pronunciation (Band 0-9)
+        
+        Provide an overall band score and detailed feedback on strengths and areas for improvement.
+        
+        Return ONLY JSON:
+        {
+          "overall_score": 7.0,
+          "scores": {
+            "fluency": "7.0",
+            "lexical": "7.5",
+            "grammar": "6.5",
+            "pronunciation": "7.0"
+          },
+          "analysis": {
+            "strengths": "...",
+            "improvements": "..."
+          }
+        }
+        """
+        # Using multimodal capabilities of Gemini 1.5
+        return [prompt, {"mime_type": "audio/wav", "data": audio_data}], SPEAKING_AUDIO_SCHEMA
     
     prompt = f"""
     Evaluate the following IELTS speaking transcript. Provide a band score (0-9) and constructive feedback.
@@ -534,15 +803,82 @@ def evaluate_speaking():
       "feedback": "..."
     }}
     """
+    return prompt, SPEAKING_SCHEMA
+
+def run_evaluate_speaking(transcript, audio_data=None):
+    if not llm:
+        return mock_speaking_feedback()
     
+    contents, schema = speaking_prompt(transcript, audio_data)
+    try:
+        return speaking_result(llm.generate_sync(contents), schema, audio_data)
+    except Exception as e:
+        return speaking_error(e, audio_data)
+
+def mock_speaking_feedback():
+    import random
+    feedback_options = [
+        "Good fluency, but watch your pronunciation of 'th' sounds.",
+        "You used a nice range of vocabulary. Try to speak a bit faster.",
+        "Great work! Your grammar was mostly correct.",
+        "Try to expand more on your answers to reach a higher band score."
+    ]
+    return {
+        "score": random.choice([5.5, 6.0, 6.5, 7.0]),
+        "feedback": random.choice(feedback_options)
+    }, 200
+
+def speaking_result(response_text, schema, audio_data=None):
+    """(payload, status) for a Gemini speaking evaluation response"""
+    result = extract_json(response_text, schema)
+    if result is not None:
+        return result, 200
+    return speaking_error(None, audio_data)
+
+def speaking_error(e, audio_data=None):
+    """(payload, status) for a failed speaking evaluation; e is None if the response could not be parsed"""
+    if e is None:
+        if audio_data:
+            return {'error': 'Failed to parse AI response'}, 500
+        return {"score": 6.0, "feedback": "AI analysis completed but format was unexpected."}, 200
+    if audio_data:
+        return {'error': str(e)}, 500
+    return {"score": 6.0, "feedback": f"AI error: {str(e)}"}, 200
+
+def stream_json(contents, schema, max_depth=1, fallback=None):
+    """
+    Forward a streamed Gemini response as SSE: 'partial' events carry the
+    object's completed fields so far, 'done' the validated result.
+
+    fallback(e) gives the (payload, status) the blocking route answers a
+    failure with (e is None if the response could not be parsed); a 200
+    payload is sent as 'done', anything else as 'error'.
+    """
+    stream = PartialObjectStream(schema, max_depth)
     try:
-        response = model.generate_content(prompt)
-        match = re.search(r'\{.*\}', response.text, re.DOTALL)
-        if match:
-            return jsonify(json.loads(match.group()))
-        return jsonify({"score": 6.0, "feedback": "AI analysis completed but format was unexpected."})
+        for chunk in llm.stream_sync(contents):
+            current = stream.feed(chunk)
+            if stream.result is not None:
+                break
+            if current is not None:
+                yield sse_event('partial', current)
     except Exception as e:
-        return jsonify({"score": 6.0, "feedback": f"AI error: {str(e)}"})
+        yield stream_json_failure(e, fallback)
+        return
+    yield stream_json_result(stream, fallback)
+
+def stream_json_result(stream, fallback=None):
+    """Final SSE event of stream_json()"""
+    if stream.close() is None:
+        return stream_json_failure(None, fallback)
+    return sse_event('done', stream.result)
+
+def stream_json_failure(e, fallback=None):
+    """Final SSE event of a stream_json() whose call failed or could not be parsed"""
+    if fallback is None:
+        return sse_event('error', {'error': str(e) if e is not None else 'Failed to parse AI response'})
+    payload, status = fallback(e)
+    return sse_event('done' if status == 200 else 'error', payload)
 
 @app.route('/api/search')
 def search():
@@ -550,75 +886,109 @@ def search():
     query = request.args.get('q', '').strip()
     if not query:
         return jsonify([])
-    results = search_engine.search(query)
+    expand = request.args.get('expand') or None
+    if expand not in (None, 'synonyms'):
+        return jsonify({'error': "expand must be 'synonyms'"}), 400
+    limit = request.args.get('limit', '10')
+    if not limit.isdigit() or int(limit) < 1:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    limit = min(int(limit), 50)
+    results = search_engine.search(query, limit=limit, expand=expand)
     return jsonify(results)
 
 @app.route('/api/guardian/list')
 def list_guardian_articles():
     """List all ingested Guardian articles"""
-    path = os.path.join(BASE_DIR, 'data', 'guardian_articles.json')
-    if os.path.exists(path):
-        with open(path, 'r') as f:
-            return jsonify(json.load(f))
-    return jsonify([])
+    return payload_response('guardian_articles')
 
 @app.route('/api/generate/questions', methods=['POST'])
 def generate_questions():
     """Generate IELTS-style questions from any text using Gemini"""
-    if not model:
+    data = request.get_json(silent=True)
+    data = data if isinstance(data, dict) else {}
+    content = data.get('content', '')
+    title = data.get('title', 'Article')
+    if not isinstance(content, str) or not isinstance(title, str):
+        return jsonify({'error': 'Content and title must be strings'}), 400
+    content = content.strip()
+    
+    if not content:
+        return jsonify({'error': 'Content is required'}), 400
+    
+    # Question sets already generated for this article are served without Gemini
+    cached = question_cache.get(question_key(content, title))
+    if cached is not None:
+        if wants_stream():
+            events = [sse_event('question', q) for q in cached['questions']] + [sse_event('done', cached)]
+            return sse_response(iter(events))
+        return jsonify(cached)
+    
+    if not llm:
         return jsonify({'error': 'Gemini API not configured'}), 503
-        
-    try:
-        data = request.get_json()
-        content = data.get('content', '').strip()
-        title = data.get('title', 'Article')
-        
-        if not content:
-            return jsonify({'error': 'Content is required'}), 400
-            
-        prompt = f"""
-        You are an expert IELTS examiner. Generate 4 high-quality reading comprehension questions (Multiple Choice) for the following article.
-        
-        Article Title: {title}
-        Content: {content[:4000]} 
+    
+    if wants_stream():
+        return sse_response(stream_generate_questions(content, title))
+    if wants_async():
+        return job_accepted('generate_questions', run_generate_questions, content, title)
+    payload, status = run_generate_questions(content, title)
+    return jsonify(payload), status
 
-        Return ONLY JSON in this format:
-        {{
-          "title": "{title}",
-          "questions": [
-            {{
-              "id": 1,
-              "question": "...",
-              "options": ["A) ...", "B) ...", "C) ...", "D) ..."],
-              "answer": "A"
-            }}
-          ]
-        }}
-        """
-        
-        response = model.generate_content(prompt)
-        match = re.search(r'\{.*\}', response.text, re.DOTALL)
-        if match:
-            return jsonify(json.loads(match.group()))
-        return jsonify({'error': 'Failed to parse AI response'}), 500
+def stream_generate_questions(content, title):
+    """Send each question as soon as its JSON object closes, then the whole set"""
+    for event, data in stream_questions(llm, content, title):
+        if event == 'done':
+            question_cache.put(question_key(content, title), data)
+        yield sse_event(event, data)
+
+def run_generate_questions(content, title):
+    try:
+        return questions_result(llm.generate_sync(build_prompt(content, title)), content, title)
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
+
+def questions_result(response_text, content, title):
+    """(payload, status) for a Gemini question generation response; caches a valid set"""
+    questions = parse_questions(response_text)
+    if questions is None:
+        return {'error': 'Failed to parse AI response'}, 500
+    question_cache.put(question_key(content, title), questions)
+    return questions, 200
+
+@app.route('/api/generate/questions/cache/stats')
+def question_cache_stats():
+    """Hit/miss/eviction/expiry counters of the generated question cache"""
+    return jsonify(question_cache.stats())
 
 @app.route('/api/evaluate/answer', methods=['POST'])
 def evaluate_answer():
     """Evaluate a user's answer and provide reasoning"""
-    if not model:
+    if not llm:
         return jsonify({'error': 'Gemini API not configured'}), 503
         
+    data = request.get_json() or {}
+    args = (
+        data.get('question', ''),
+        data.get('user_answer', ''),
+        data.get('correct_answer', ''),
+        data.get('context', '')
+    )
+    
+    if wants_async():
+        return job_accepted('evaluate_answer', run_evaluate_answer, *args)
+    payload, status = run_evaluate_answer(*args)
+    return jsonify(payload), status
+
+def run_evaluate_answer(question, user_answer, correct_answer, context):
     try:
-        data = request.get_json()
-        question = data.get('question', '')
-        user_answer = data.get('user_answer', '')
-        correct_answer = data.get('correct_answer', '')
-        context = data.get('context', '')
+        response_text = llm.generate_sync(answer_prompt(question, user_answer, correct_answer, context))
+        return answer_result(response_text, correct_answer)
         
-        prompt = f"""
+    except Exception as e:
+        return {'error': str(e)}, 500
+
+def answer_prompt(question, user_answer, correct_answer, context):
+    return f"""
         Evaluate this IELTS reading answer.
         Question: {question}
         User's Answer: {user_answer}
@@ -633,72 +1003,52 @@ def evaluate_answer():
           "explanation": "..."
         }}
         """
+
+def answer_result(response_text, correct_answer):
+    """(payload, status) for a Gemini answer evaluation response"""
+    result = extract_json(response_text, ANSWER_SCHEMA)
+    if result is not None:
+        return result, 200
+    return {'explanation': f"The correct answer is {correct_answer}."}, 200
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Poll a background job, or follow it as Server-Sent Events (Accept: text/event-stream)"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if wants_stream():
+        def stream():
+            current = job
+            while True:
+                yield sse_event(current['status'], current)
+                if current['status'] in JOB_FINISHED:
+                    return
+                update = None
+                while update is None:
+                    update = jobs.wait(job_id, current['status'], timeout=15.0)
+                    if update is None:
+                        if jobs.get(job_id) is None:
+                            return
+                        yield ": keepalive\n\n"
+                current = update
         
-        response = model.generate_content(prompt)
-        match = re.search(r'\{.*\}', response.text, re.DOTALL)
-        if match:
-            return jsonify(json.loads(match.group()))
-        return jsonify({'explanation': f"The correct answer is {correct_answer}."})
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return sse_response(stream())
+    return jsonify(job)
 
-@app.route('/api/evaluate/speaking', methods=['POST'])
-def evaluate_speaking():
-    """Evaluate a user's speaking audio using Gemini."""
-    if not model:
+@app.route('/api/llm/stats')
+def llm_stats():
+    """Concurrency, retry and timeout counters of the Gemini client"""
+    if not llm:
         return jsonify({'error': 'Gemini API not configured'}), 503
-        
-    if 'audio' not in request.files:
-        return jsonify({'error': 'No audio file provided'}), 400
-        
-    try:
-        audio_file = request.files['audio']
-        audio_data = audio_file.read()
-        
-        prompt = """
-        You are an expert IELTS Speaking examiner. Evaluate the provided audio response for a Part 2 speaking task.
-        
-        Criteria:
-        1. Fluency and Coherence (Band 0-9)
-        2. Lexical Resource (Band 0-9)
-        3. Grammatical Range and Accuracy (Band 0-9)
-        4. Pronunciation (Band 0-9)
-        
-        Provide an overall band score and detailed feedback on strengths and areas for improvement.
-        
-        Return ONLY JSON:
-        {
-          "overall_score": 7.0,
-          "scores": {
-            "fluency": "7.0",
-            "lexical": "7.5",
-            "grammar": "6.5",
-            "pronunciation": "7.0"
-          },
-          "analysis": {
-            "strengths": "...",
-            "improvements": "..."
-          }
-        }
-        """
-        
-        # Using multimodal capabilities of Gemini 1.5
-        response = model.generate_content([
-            prompt,
-            {
-                "mime_type": "audio/wav",
-                "data": audio_data
-            }
-        ])
-        
-        match = re.search(r'\{.*\}', response.text, re.DOTALL)
-        if match:
-            return jsonify(json.loads(match.group()))
-        return jsonify({'error': 'Failed to parse AI response'}), 500
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return jsonify(llm.stats())
+
+@app.route('/api/jobs/stats')
+def job_stats():
+    """Job counts by status"""
+    return jsonify(jobs.stats())
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
+    # Development server only; see wsgi.py and gunicorn.conf.py for production
+    app.run(debug=os.environ.get("FLASK_DEBUG", "1") == "1", port=int(os.environ.get("PORT", 5001)))
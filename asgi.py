@@ -0,0 +1,274 @@
+"""
+ASGI build of the app.
+
+    uvicorn asgi:app --port 8000
+
+The Gemini-bound routes (/api/generate/questions, /api/evaluate/answer,
+/api/evaluate/speaking) are native async handlers: a request waiting on
+Gemini is a suspended coroutine, not a blocked thread, so thousands of
+them fit in one process. Set GEMINI_MAX_CONCURRENCY to what the API quota
+allows; calls beyond it queue inside the client.
+
+CPU-bound routes (/api/keywords/matches, /api/analyze/pdf) run their work
+on a dedicated executor so it never stalls the event loop. Every other
+route is served by the Flask app, mounted as WSGI.
+"""
+import os
+import asyncio
+import tempfile
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+import app as flask_app
+from app import (llm, jobs, pdf_cache, pdf_counter, question_cache, keyword_extractor, sse_event,
+                 speaking_prompt, speaking_result, speaking_error, mock_speaking_feedback,
+                 stream_json_result, stream_json_failure, answer_prompt, answer_result, questions_result,
+                 run_evaluate_speaking, run_evaluate_answer, run_generate_questions, run_pdf_analysis)
+from question_bank import question_key, build_prompt, astream_questions
+from llm_json import PartialObjectStream
+from pdf_analysis import spool_upload
+
+# Keyword matching and PDF counting; separate from the threads serving the mounted Flask app
+cpu_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("ASGI_CPU_WORKERS", 0)) or min(32, (os.cpu_count() or 1) + 4),
+    thread_name_prefix='asgi-cpu'
+)
+
+
+async def run_cpu(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(cpu_executor, fn, *args)
+
+
+def wants_stream(request: Request) -> bool:
+    """Clients ask for incremental results with Accept: text/event-stream"""
+    return parse_accept_header(request.headers.get('accept'), MIMEAccept).best == 'text/event-stream'
+
+
+def wants_async(request: Request) -> bool:
+    """Clients opt into background execution with ?async=1 or 'Prefer: respond-async'"""
+    return (request.query_params.get('async', '').lower() in ('1', 'true')
+            or 'respond-async' in request.headers.get('prefer', ''))
+
+
+def sse_response(events) -> StreamingResponse:
+    """Stream an async iterator of formatted events without proxy buffering"""
+    return StreamingResponse(events, media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def job_accepted(kind, fn, *args) -> JSONResponse:
+    """Queue fn(*args) as a background job and answer 202 with its polling URL"""
+    job_id = jobs.submit(kind, fn, *args)
+    return JSONResponse({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/api/jobs/{job_id}'
+    }, status_code=202)
+
+
+async def json_body(request: Request) -> dict:
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def stream_json(contents, schema, max_depth=1, fallback=None):
+    """Async stream_json() from app.py: 'partial' events, then 'done' or 'error'"""
+    stream = PartialObjectStream(schema, max_depth)
+    chunks = llm.stream(contents)
+    try:
+        async for chunk in chunks:
+            current = stream.feed(chunk)
+            if stream.result is not None:
+                break
+            if current is not None:
+                yield sse_event('partial', current)
+    except Exception as e:
+        yield stream_json_failure(e, fallback)
+        return
+    finally:
+        await chunks.aclose()
+    yield stream_json_result(stream, fallback)
+
+
+async def generate_questions(request: Request):
+    """Generate IELTS-style questions from any text using Gemini"""
+    data = await json_body(request)
+    content = data.get('content', '')
+    title = data.get('title', 'Article')
+    if not isinstance(content, str) or not isinstance(title, str):
+        return JSONResponse({'error': 'Content and title must be strings'}, status_code=400)
+    content = content.strip()
+
+    if not content:
+        return JSONResponse({'error': 'Content is required'}, status_code=400)
+
+    cached = await run_cpu(question_cache.get, question_key(content, title))
+    if cached is not None:
+        if wants_stream(request):
+            async def replay():
+                for question in cached['questions']:
+                    yield sse_event('question', question)
+                yield sse_event('done', cached)
+            return sse_response(replay())
+        return JSONResponse(cached)
+
+    if not llm:
+        return JSONResponse({'error': 'Gemini API not configured'}, status_code=503)
+
+    if wants_stream(request):
+        async def events():
+            async for event, payload in astream_questions(llm, content, title):
+                if event == 'done':
+                    await run_cpu(question_cache.put, question_key(content, title), payload)
+                yield sse_event(event, payload)
+        return sse_response(events())
+    if wants_async(request):
+        return job_accepted('generate_questions', run_generate_questions, content, title)
+    try:
+        response_text = await llm.generate(build_prompt(content, title))
+        payload, status = await run_cpu(questions_result, response_text, content, title)
+    except Exception as e:
+        payload, status = {'error': str(e)}, 500
+    return JSONResponse(payload, status_code=status)
+
+
+async def evaluate_answer(request: Request):
+    """Evaluate a user's answer and provide reasoning"""
+    if not llm:
+        return JSONResponse({'error': 'Gemini API not configured'}, status_code=503)
+
+    data = await json_body(request)
+    args = (
+        data.get('question', ''),
+        data.get('user_answer', ''),
+        data.get('correct_answer', ''),
+        data.get('context', '')
+    )
+
+    if wants_async(request):
+        return job_accepted('evaluate_answer', run_evaluate_answer, *args)
+    try:
+        payload, status = answer_result(await llm.generate(answer_prompt(*args)), args[2])
+    except Exception as e:
+        payload, status = {'error': str(e)}, 500
+    return JSONResponse(payload, status_code=status)
+
+
+async def evaluate_speaking(request: Request):
+    """Evaluate a speaking attempt (audio and/or transcript) using Gemini or mock feedback"""
+    form = await request.form()
+    transcript = form.get('transcript', '')
+    audio = form.get('audio')
+    audio_data = await audio.read() if audio is not None and hasattr(audio, 'read') else None
+
+    if not llm:
+        payload, status = mock_speaking_feedback()
+        return JSONResponse(payload, status_code=status)
+
+    contents, schema = speaking_prompt(transcript, audio_data)
+    if wants_stream(request):
+        return sse_response(stream_json(contents, schema, fallback=lambda e: speaking_error(e, audio_data)))
+    if wants_async(request):
+        return job_accepted('evaluate_speaking', run_evaluate_speaking, transcript, audio_data)
+    try:
+        payload, status = speaking_result(await llm.generate(contents), schema, audio_data)
+    except Exception as e:
+        payload, status = speaking_error(e, audio_data)
+    return JSONResponse(payload, status_code=status)
+
+
+async def find_keyword_matches(request: Request):
+    """Find matches for specific keywords in text"""
+    data = await json_body(request)
+    keywords = data.get('keywords', [])
+    text = data.get('text', '')
+    if not isinstance(text, str) or not isinstance(keywords, list) \
+            or not all(isinstance(keyword, str) for keyword in keywords):
+        return JSONResponse({'error': 'text must be a string and keywords a list of strings'}, status_code=400)
+    text = text.strip()
+
+    if not keywords or not text:
+        return JSONResponse({'error': 'Both keywords and text are required'}, status_code=400)
+
+    try:
+        matches = await run_cpu(keyword_extractor.find_matches_in_text, keywords, text)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+    return JSONResponse({
+        'keywords': keywords,
+        'text': text,
+        'matches': matches,
+        'total_matches': sum(len(m) for m in matches.values())
+    })
+
+
+async def analyze_pdf(request: Request):
+    """Extract text from uploaded PDF and analyze keyword frequencies"""
+    form = await request.form()
+    file = form.get('file')
+    if file is None or not hasattr(file, 'filename'):
+        return JSONResponse({'error': 'No file part'}, status_code=400)
+    if not file.filename:
+        return JSONResponse({'error': 'No selected file'}, status_code=400)
+    if not file.filename.lower().endswith('.pdf'):
+        return JSONResponse({'error': 'Only PDF files are supported'}, status_code=400)
+    if flask_app.PdfReader is None:
+        return JSONResponse({'error': 'PDF processing library (pypdf) not available'}, status_code=500)
+
+    fd, tmp_path = tempfile.mkstemp(suffix='.pdf')
+    os.close(fd)
+    try:
+        digest = await run_cpu(spool_upload, file.file, tmp_path)
+    except Exception as e:
+        os.remove(tmp_path)
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+    cached = await run_cpu(pdf_cache.get, digest)
+    if cached is not None:
+        os.remove(tmp_path)
+        return JSONResponse(dict(cached, filename=file.filename, cached=True))
+
+    if wants_async(request):
+        return job_accepted('analyze_pdf', run_pdf_analysis, tmp_path, digest, file.filename)
+    # Page chunks are counted in pdf_counter's process pool; this thread only waits and merges
+    payload, status = await run_cpu(run_pdf_analysis, tmp_path, digest, file.filename)
+    return JSONResponse(payload, status_code=status)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    cpu_executor.shutdown(wait=False)
+    pdf_counter.shutdown()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/generate/questions', generate_questions, methods=['POST']),
+        Route('/api/evaluate/answer', evaluate_answer, methods=['POST']),
+        Route('/api/evaluate/speaking', evaluate_speaking, methods=['POST']),
+        Route('/api/keywords/matches', find_keyword_matches, methods=['POST']),
+        Route('/api/analyze/pdf', analyze_pdf, methods=['POST']),
+        Mount('/', WSGIMiddleware(flask_app.app)),
+    ],
+    # Same policy as CORS(app) in app.py, so the async routes answer preflights too
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
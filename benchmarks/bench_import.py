@@ -0,0 +1,50 @@
+"""
+Import-time budget check for the Flask app.
+
+Imports app.py in a fresh interpreter a few times and fails if the best
+wall-clock time exceeds the budget. NLTK loading and the search index
+build happen in background threads, and google.generativeai is imported on
+the first Gemini call, so none of them may show up here.
+
+    python benchmarks/bench_import.py [--budget-ms 800] [--module app]
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_import(module, runs=5):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-c', f'import {module}'],
+            cwd=BASE_DIR, capture_output=True, text=True
+        )
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'import failed')
+            sys.exit(2)
+        best = min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=800.0)
+    parser.add_argument('--module', default='app')
+    args = parser.parse_args()
+
+    baseline = time_import('sys')
+    elapsed = time_import(args.module)
+    cost_ms = (elapsed - baseline) * 1000
+    print(f"import {args.module}: {cost_ms:.1f} ms over a bare interpreter (budget {args.budget_ms:.0f} ms)")
+    sys.exit(0 if cost_ms <= args.budget_ms else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Offline load test for the Gemini client layer.
+
+Fires requests at GeminiClient backed by FakeBackend, both from a pool of
+request threads (the Flask path, generate_sync) and from a single event
+loop (the ASGI path, generate), and reports throughput and latency for a
+few concurrency caps. --failure-rate injects retryable errors.
+
+    python benchmarks/bench_llm.py --requests 200 --latency 0.2
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_client import GeminiClient, FakeBackend, LLMError
+
+PROMPT = "Generate 4 high-quality reading comprehension questions for the following article."
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def run_threads(client, requests, threads):
+    latencies, errors = [], 0
+
+    def call(_):
+        start = time.perf_counter()
+        client.generate_sync(PROMPT)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(call, i) for i in range(requests)]:
+            try:
+                latencies.append(future.result())
+            except LLMError:
+                errors += 1
+    return time.perf_counter() - start, latencies, errors
+
+
+def run_async(client, requests):
+    async def call():
+        start = time.perf_counter()
+        await client.generate(PROMPT)
+        return time.perf_counter() - start
+
+    async def main():
+        return await asyncio.gather(*(call() for _ in range(requests)), return_exceptions=True)
+
+    start = time.perf_counter()
+    results = asyncio.run(main())
+    latencies = [r for r in results if isinstance(r, float)]
+    return time.perf_counter() - start, latencies, len(results) - len(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=64, help='request threads for the sync path')
+    parser.add_argument('--latency', type=float, default=0.2, help='fake backend latency in seconds')
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 128])
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, fake latency {args.latency * 1000:.0f} ms, "
+          f"failure rate {args.failure_rate:.0%}")
+    for limit in args.concurrency:
+        for label in ('threads', 'async'):
+            backend = FakeBackend(latency=args.latency, jitter=args.latency / 4, failure_rate=args.failure_rate)
+            client = GeminiClient(backend, max_concurrency=limit, timeout=600, backoff=0.05)
+            if label == 'threads':
+                elapsed, latencies, errors = run_threads(client, args.requests, args.threads)
+            else:
+                elapsed, latencies, errors = run_async(client, args.requests)
+            print(f"cap {limit:4d} {label:8s} {args.requests / elapsed:8.1f} req/s   "
+                  f"p50 {percentile(latencies, 0.5) * 1000:8.1f} ms   "
+                  f"p99 {percentile(latencies, 0.99) * 1000:8.1f} ms   "
+                  f"retries {client.retried:4d}   errors {errors}")
+
+
+if __name__ == '__main__':
+    main()
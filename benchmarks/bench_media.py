@@ -0,0 +1,129 @@
+"""
+Concurrent partial-content load test for /audio/ and /pdfs/.
+
+Reads the file list from /api/audio and /api/materials of a running server
+and fires random single-range requests at them from a pool of threads
+(one keep-alive connection each), checking every 206 and Content-Range.
+A final pass revalidates each file with If-None-Match and expects 304.
+
+    gunicorn -w 4 -k gthread --threads 8 app:app &
+    python benchmarks/bench_media.py --base-url http://127.0.0.1:8000 --requests 2000
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit, quote
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+class Client(threading.local):
+    """One persistent HTTP connection per worker thread"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.conn = None
+
+    def request(self, path, headers=None):
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.conn.request('GET', path, headers=headers or {})
+                response = self.conn.getresponse()
+                return response, response.read()
+            except (http.client.HTTPException, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+
+def list_files(client, kinds):
+    files = []
+    for kind in kinds:
+        endpoint, prefix = ('/api/audio', '/audio/') if kind == 'audio' else ('/api/materials', '/pdfs/')
+        response, body = client.request(endpoint)
+        for item in json.loads(body):
+            files.append(prefix + quote(item['path'].replace('\\', '/')))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--range-kb', type=int, default=256, help='size of each requested range')
+    parser.add_argument('--kind', choices=('audio', 'pdfs', 'both'), default='both')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    client = Client(args.base_url)
+    files = list_files(client, ('audio', 'pdfs') if args.kind == 'both' else (args.kind,))
+    if not files:
+        print("No cataloged files to request")
+        sys.exit(2)
+
+    # A one-byte probe per file gives its length and ETag (this also computes the server-side digest)
+    info = {}
+    for path in files:
+        response, _ = client.request(path, {'Range': 'bytes=0-0'})
+        size = int(response.getheader('Content-Range', '/0').rsplit('/', 1)[1])
+        if response.status == 206 and size:
+            info[path] = (size, response.getheader('ETag'))
+    print(f"{len(info)} files, {args.requests} range requests of {args.range_kb} KB, "
+          f"{args.concurrency} concurrent connections")
+
+    rng = random.Random(args.seed)
+    span = args.range_kb << 10
+    plan = []
+    for _ in range(args.requests):
+        path = rng.choice(list(info))
+        size = info[path][0]
+        start = rng.randrange(0, max(1, size - span))
+        plan.append((path, start, min(size, start + span) - 1))
+
+    errors = []
+
+    def fetch(item):
+        path, first, last = item
+        start = time.perf_counter()
+        response, body = client.request(path, {'Range': f'bytes={first}-{last}'})
+        elapsed = time.perf_counter() - start
+        expected = f'bytes {first}-{last}/{info[path][0]}'
+        if response.status != 206 or response.getheader('Content-Range') != expected or len(body) != last - first + 1:
+            errors.append(f"{path} {first}-{last}: {response.status} {response.getheader('Content-Range')} {len(body)} bytes")
+        return elapsed, len(body)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(fetch, plan))
+    elapsed = time.perf_counter() - start
+    latencies = [r[0] for r in results]
+    transferred = sum(r[1] for r in results)
+
+    not_modified = 0
+    for path, (_, etag) in info.items():
+        response, _ = client.request(path, {'If-None-Match': etag})
+        not_modified += response.status == 304
+
+    print(f"{args.requests / elapsed:8.1f} req/s   {transferred / elapsed / (1 << 20):8.1f} MB/s   "
+          f"p50 {percentile(latencies, 0.5) * 1000:7.1f} ms   p99 {percentile(latencies, 0.99) * 1000:7.1f} ms")
+    print(f"304 on revalidation: {not_modified}/{len(info)}   range errors: {len(errors)}")
+    for error in errors[:5]:
+        print(f"  {error}")
+    sys.exit(1 if errors or not_modified != len(info) else 0)
+
+
+if __name__ == '__main__':
+    main()
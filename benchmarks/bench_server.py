@@ -0,0 +1,157 @@
+"""
+Throughput of the debug server vs gunicorn vs waitress vs the ASGI build.
+
+Starts each server in turn with the offline fake Gemini backend, waits for
+it to answer, then drives it from a pool of client threads with a mix of
+cheap reads (/api/lessons, /api/materials) and I/O-bound question
+generation (/api/generate/questions with unique content, so nothing is
+served from cache). Reports requests/s and latency per route.
+
+    python benchmarks/bench_server.py --duration 20 --clients 64
+    python benchmarks/bench_server.py --servers gunicorn --llm-latency 1.0
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import signal
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from collections import defaultdict
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'debug': [sys.executable, 'app.py'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+    'waitress': [sys.executable, 'wsgi.py'],
+    'uvicorn': [sys.executable, '-m', 'uvicorn', 'asgi:app', '--no-access-log'],
+}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def request(conn, method, path, body=None):
+    headers = {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'} if body else {'Accept-Encoding': 'gzip'}
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def start_server(name, port, env):
+    env = dict(env, PORT=str(port), GUNICORN_BIND=f"127.0.0.1:{port}", HOST='127.0.0.1', GUNICORN_ACCESS_LOG='',
+               UVICORN_PORT=str(port), UVICORN_HOST='127.0.0.1')
+    if name == 'debug':
+        # As app.py has always run: debug mode with the reloader
+        env['FLASK_DEBUG'] = '1'
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(SERVERS[name], cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+                               start_new_session=True)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            log.seek(0)
+            raise RuntimeError(f"{name} exited:\n{log.read().decode(errors='replace')[-2000:]}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            if request(conn, 'GET', '/api/materials') == 200:
+                return process, log
+        except OSError:
+            time.sleep(0.25)
+    raise RuntimeError(f"{name} did not start")
+
+
+def stop_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def drive(port, clients, duration, llm_share):
+    """Each client loops on one connection; every llm_share-th request generates questions"""
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(index):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+        count = index
+        while time.monotonic() < stop_at:
+            count += 1
+            if llm_share and count % llm_share == 0:
+                route, method = '/api/generate/questions', 'POST'
+                body = json.dumps({'title': 'Bench', 'content': f"Article {uuid.uuid4().hex} about urban planning."})
+            else:
+                route, method, body = ('/api/lessons', '/api/materials')[count % 2], 'GET', None
+            start = time.perf_counter()
+            try:
+                status = request(conn, method, route, body)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+                status = 0
+            elapsed = time.perf_counter() - start
+            with lock:
+                if status == 200:
+                    latencies[route].append(elapsed)
+                else:
+                    errors[route] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='fake Gemini latency in seconds')
+    parser.add_argument('--llm-share', type=int, default=4, help='every Nth request generates questions (0 = none)')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    # Question caching is off so every generation call waits on the fake backend
+    env = dict(os.environ, LLM_BACKEND='fake', LLM_FAKE_LATENCY=str(args.llm_latency),
+               QUESTION_CACHE_MAX_MB='0', GEMINI_MAX_CONCURRENCY='256', PYTHONUNBUFFERED='1')
+    env.pop('GEMINI_API_KEY', None)
+
+    print(f"{args.clients} clients for {args.duration:.0f}s, fake Gemini latency {args.llm_latency * 1000:.0f} ms, "
+          f"1 in {args.llm_share or 'no'} requests generates questions, {os.cpu_count()} CPUs")
+    for name in args.servers:
+        try:
+            process, log = start_server(name, args.port, env)
+        except RuntimeError as e:
+            print(f"{name:9s} skipped: {e}")
+            continue
+        try:
+            elapsed, latencies, errors = drive(args.port, args.clients, args.duration, args.llm_share)
+        finally:
+            stop_server(process)
+            log.close()
+        total = sum(len(v) for v in latencies.values())
+        print(f"{name:9s} {total / elapsed:8.1f} req/s   errors {sum(errors.values())}")
+        for route in sorted(latencies):
+            values = latencies[route]
+            print(f"          {route:26s} {len(values) / elapsed:8.1f} req/s   "
+                  f"p50 {percentile(values, 0.5) * 1000:8.1f} ms   p99 {percentile(values, 0.99) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
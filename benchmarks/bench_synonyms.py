@@ -0,0 +1,81 @@
+"""
+Microbenchmark for IELTSKeywordExtractor._get_synonyms.
+
+Replays the frequency step of /api/analyze/pdf on a ~5,000-word document
+built from the ingested lessons and compares the precomputed synonym graph
+with the previous linear scan over synonym_db.
+
+    python benchmarks/bench_synonyms.py
+"""
+import os
+import sys
+import json
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_extractor import IELTSKeywordExtractor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_get_synonyms(extractor, word):
+    """The original implementation: one pass over synonym_db per call"""
+    synonyms = []
+    base_word = extractor._get_synonym_key(word)
+    if base_word in extractor.synonym_db:
+        synonyms.extend(extractor.synonym_db[base_word])
+    for key, synonym_set in extractor.synonym_db.items():
+        if (word in synonym_set or base_word in synonym_set) and key not in synonyms:
+            synonyms.append(key)
+    return list(set(synonyms))
+
+
+def build_document(target_words=5000):
+    with open(os.path.join(BASE_DIR, 'data', 'lessons.json'), 'r') as f:
+        lessons = json.load(f)
+    words = []
+    while len(words) < target_words:
+        for book in lessons:
+            for test in book.get('tests', []):
+                for passage in test.get('reading', []):
+                    words.extend(passage.get('content', '').split())
+    return ' '.join(words[:target_words])
+
+
+def timeit(fn, repeat=20):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    extractor = IELTSKeywordExtractor()
+    text = build_document()
+    words = extractor._clean_text(text).lower().split()
+    distinct = list(dict.fromkeys(words))
+
+    # Same answers as before, modulo ordering
+    for word in distinct + list(extractor.synonym_graph):
+        assert set(extractor._get_synonyms(word)) == set(legacy_get_synonyms(extractor, word)), word
+
+    counts = Counter(w for w in words if w not in extractor.filler_words and len(w) > 2)
+    top = [w for w, _ in counts.most_common(100)]
+
+    cases = [
+        ('top 100 keywords (/api/analyze/pdf)', top),
+        (f'every distinct word ({len(distinct)})', distinct),
+    ]
+    print(f"Document: {len(words)} words, {len(distinct)} distinct")
+    for label, sample in cases:
+        old = timeit(lambda: [legacy_get_synonyms(extractor, w) for w in sample])
+        new = timeit(lambda: [extractor._get_synonyms(w) for w in sample])
+        print(f"{label:40s} legacy {old * 1000:8.3f} ms   graph {new * 1000:8.3f} ms   x{old / new:6.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Load time and tagging speed of the built-in CompactTagger, compared with
+NLTK's averaged perceptron when NLTK and its data are installed.
+
+    python benchmarks/bench_tagger.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pos_tagger import CompactTagger
+
+QUESTIONS = [
+    "The majority of energy was generated by electricity.",
+    "Research shows that children who read regularly perform better at school.",
+    "The government should increase spending on public transport in rural areas.",
+    "Which paragraph describes the effects of climate change on Pacific islands?",
+    "They have been producing more renewable energy since 2010.",
+    "The writer suggests that zoos are becoming centres of conservation.",
+    "Early humans probably stored fire by keeping logs alight.",
+    "Do you agree or disagree with this statement?",
+]
+
+CONTENT_TAGS = {
+    'NN', 'NNS', 'NNP', 'NNPS', 'VB', 'VBD', 'VBG', 'VBN', 'VBP', 'VBZ',
+    'JJ', 'JJR', 'JJS', 'RB', 'RBR', 'RBS',
+}
+
+
+def per_question_us(tag_sents, tokenized, rounds=500):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        tag_sents(tokenized)
+    return (time.perf_counter() - start) / (rounds * len(tokenized)) * 1e6
+
+
+def main():
+    start = time.perf_counter()
+    tagger = CompactTagger()
+    load_ms = (time.perf_counter() - start) * 1000
+    tokenized = [tagger.tokenize(q) for q in QUESTIONS]
+    print(f"builtin  load {load_ms:7.2f} ms   tag {per_question_us(tagger.tag_sents, tokenized):7.1f} us/question")
+
+    try:
+        from nltk.tag import pos_tag_sents
+        from nltk.tokenize import word_tokenize
+        start = time.perf_counter()
+        nltk_tokenized = [word_tokenize(q) for q in QUESTIONS]
+        reference = pos_tag_sents(nltk_tokenized)
+        load_ms = (time.perf_counter() - start) * 1000
+    except (ImportError, LookupError) as e:
+        print(f"nltk     unavailable ({e.__class__.__name__})")
+        return
+
+    print(f"nltk     load {load_ms:7.2f} ms   tag {per_question_us(pos_tag_sents, nltk_tokenized):7.1f} us/question")
+
+    # Agreement on what the extractor cares about: content word or not
+    agree = total = 0
+    for ours, theirs in zip(tagger.tag_sents(nltk_tokenized), reference):
+        for (_, a), (_, b) in zip(ours, theirs):
+            agree += (a in CONTENT_TAGS) == (b in CONTENT_TAGS)
+            total += 1
+    print(f"content/function agreement with nltk: {agree / total * 100:.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,356 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from dataclasses import dataclass, asdict
+from typing import List, Dict, Optional, Tuple
+
+# Regex patterns for parsing audio filenames
+PATTERN_SECTION = re.compile(r'Test\s*(\d+)[_\s]+Section\s*(\d+)', re.IGNORECASE)
+PATTERN_TEST = re.compile(r'Test\s*(\d+)', re.IGNORECASE)
+PATTERN_TRACK = re.compile(r'Track\s*(\d+)', re.IGNORECASE)
+PATTERN_NUMBER = re.compile(r'(\d+)')
+
+# Directories that never contain study material
+SKIP_DIRS = {'libs', 'data', 'static', 'templates', 'node_modules', '__pycache__'}
+
+# Bump whenever the snapshot layout or the parsing rules change
+INDEX_VERSION = 1
+
+
+@dataclass(frozen=True)
+class PdfEntry:
+    name: str
+    path: str
+    category: str
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass(frozen=True)
+class AudioTrack:
+    name: str
+    path: str
+    book: str
+    test: str
+    section: str
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def sort_key(self) -> Tuple[int, int, int]:
+        """Book -> Test -> Section ordering"""
+        b_match = PATTERN_NUMBER.search(self.book)
+        b = int(b_match.group(1)) if b_match else 0
+        t = int(self.test) if self.test.isdigit() else 0
+        s = int(self.section) if self.section.isdigit() else 0
+        return (b, t, s)
+
+
+def parse_pdf(rel_path: str) -> Optional[PdfEntry]:
+    """Build a PdfEntry for a relative path, or None if it is not study material"""
+    if 'Cambridge IELTS' not in rel_path and 'TOEFL' not in rel_path:
+        return None
+    return PdfEntry(
+        name=os.path.basename(rel_path),
+        path=rel_path,
+        category='IELTS' if 'Cambridge' in rel_path else 'TOEFL'
+    )
+
+
+def parse_audio(rel_path: str) -> Optional[AudioTrack]:
+    """Build an AudioTrack for a relative path, extracting book/test/section"""
+    if 'Cambridge IELTS' not in rel_path:
+        return None
+
+    file = os.path.basename(rel_path)
+    book_name = "Cambridge IELTS Unknown"
+    test_num = "Unknown"
+    section_num = "All"
+
+    # Extract book from path
+    for part in rel_path.split(os.sep):
+        if 'Cambridge IELTS' in part:
+            book_name = part
+            break
+
+    # Try to extract from filename
+    match_section = PATTERN_SECTION.search(file)
+    match_test = PATTERN_TEST.search(file)
+    match_track = PATTERN_TRACK.search(file)
+
+    if match_section:
+        test_num = match_section.group(1)
+        section_num = match_section.group(2)
+    elif match_test:
+        test_num = match_test.group(1)
+        if match_track:
+            section_num = match_track.group(1)
+    elif match_track:
+        section_num = match_track.group(1)
+
+    return AudioTrack(
+        name=file,
+        path=rel_path,
+        book=book_name,
+        test=test_num,
+        section=section_num
+    )
+
+
+class MaterialCatalog:
+    """
+    In-memory index of the PDF books and listening tracks under a base directory.
+    The tree is scanned once; afterwards only directories whose mtime changed
+    are re-listed, so /api/materials and /api/audio are served from memory.
+
+    When index_path is given the per-directory index is persisted there, and
+    on startup it is validated by stat-ing the recorded directories instead of
+    walking the whole tree again.
+    """
+
+    def __init__(self, base_dir: str, refresh_interval: float = 5.0,
+                 index_path: Optional[str] = None):
+        self.base_dir = base_dir
+        self.refresh_interval = refresh_interval
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+
+        # rel_dir -> (mtime_ns, subdirs, pdfs, audio)
+        self._dirs: Dict[str, Tuple[int, List[str], List[PdfEntry], List[AudioTrack]]] = {}
+
+        self.pdfs: List[PdfEntry] = []
+        self.audio: List[AudioTrack] = []
+        self._payloads: Dict[str, Tuple[bytes, str]] = {}
+        # 'pdfs' / 'audio' -> URL path ('/'-separated) -> absolute file path
+        self._paths: Dict[str, Dict[str, str]] = {'pdfs': {}, 'audio': {}}
+
+        if self._load_index():
+            with self._lock:
+                if self._refresh_dirs():
+                    self._save_index()
+                self._publish(announce=True)
+                self._last_check = time.monotonic()
+        else:
+            self.rebuild()
+
+    def _abs(self, rel_dir: str) -> str:
+        return os.path.join(self.base_dir, rel_dir) if rel_dir else self.base_dir
+
+    def _scan_dir(self, rel_dir: str) -> bool:
+        """List a single directory and record its contents. Returns False if it vanished."""
+        abs_dir = self._abs(rel_dir)
+        try:
+            mtime = os.stat(abs_dir).st_mtime_ns
+            entries = list(os.scandir(abs_dir))
+        except OSError:
+            return False
+
+        subdirs, pdfs, audio = [], [], []
+        for entry in entries:
+            rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+            try:
+                # Do not follow links: a symlinked directory loop would recurse forever
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if entry.name.startswith('.') or entry.name in SKIP_DIRS:
+                    continue
+                subdirs.append(rel_path)
+                continue
+            lower = entry.name.lower()
+            if lower.endswith('.pdf'):
+                pdf = parse_pdf(rel_path)
+                if pdf:
+                    pdfs.append(pdf)
+            elif lower.endswith('.mp3'):
+                track = parse_audio(rel_path)
+                if track:
+                    audio.append(track)
+
+        self._dirs[rel_dir] = (mtime, sorted(subdirs), pdfs, audio)
+        return True
+
+    def _scan_tree(self, rel_dir: str):
+        """Scan a directory and every directory below it"""
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            if self._scan_dir(current):
+                stack.extend(self._dirs[current][1])
+
+    def _drop_tree(self, rel_dir: str):
+        prefix = rel_dir + os.sep
+        for key in [k for k in self._dirs if k == rel_dir or k.startswith(prefix)]:
+            del self._dirs[key]
+
+    def _publish(self, announce: bool = False):
+        """
+        Flatten the per-directory index into sorted lists and pre-serialized payloads.
+
+        Args:
+            announce: Print the totals (startup and full rebuilds, not every refresh)
+        """
+        pdfs, audio = [], []
+        for _, _, dir_pdfs, dir_audio in self._dirs.values():
+            pdfs.extend(dir_pdfs)
+            audio.extend(dir_audio)
+        pdfs.sort(key=lambda p: p.path)
+        audio.sort(key=lambda a: a.path)
+        audio.sort(key=AudioTrack.sort_key)
+
+        payloads = {}
+        for name, items in (('pdfs', pdfs), ('audio', audio)):
+            body = json.dumps([item.to_dict() for item in items]).encode('utf-8')
+            payloads[name] = (body, hashlib.sha1(body).hexdigest())
+
+        paths = {
+            name: {item.path.replace(os.sep, '/'): os.path.join(self.base_dir, item.path) for item in items}
+            for name, items in (('pdfs', pdfs), ('audio', audio))
+        }
+
+        self.pdfs, self.audio, self._payloads, self._paths = pdfs, audio, payloads, paths
+        if announce:
+            print(f"Catalog: {len(pdfs)} PDF materials, {len(audio)} audio files")
+
+    def rebuild(self):
+        """Full rescan of the tree"""
+        with self._lock:
+            self._dirs = {}
+            self._scan_tree('')
+            self._publish(announce=True)
+            self._save_index()
+            self._last_check = time.monotonic()
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Re-list only the directories whose mtime changed since the last scan.
+
+        Args:
+            force: Ignore refresh_interval and check immediately
+
+        Returns:
+            True if the catalog changed
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < self.refresh_interval:
+            return False
+
+        with self._lock:
+            self._last_check = now
+            changed = self._refresh_dirs()
+            if changed:
+                self._publish()
+                self._save_index()
+            return changed
+
+    def _refresh_dirs(self) -> bool:
+        """Stat every known directory and re-list the ones that changed"""
+        changed = False
+        for rel_dir in sorted(self._dirs):
+            if rel_dir not in self._dirs:
+                continue  # dropped together with a parent
+            old_mtime, old_subdirs = self._dirs[rel_dir][0], self._dirs[rel_dir][1]
+            try:
+                mtime = os.stat(self._abs(rel_dir)).st_mtime_ns
+            except OSError:
+                self._drop_tree(rel_dir)
+                changed = True
+                continue
+            if mtime == old_mtime:
+                continue
+
+            changed = True
+            self._scan_dir(rel_dir)
+            new_subdirs = self._dirs[rel_dir][1]
+            for gone in set(old_subdirs) - set(new_subdirs):
+                self._drop_tree(gone)
+            for added in set(new_subdirs) - set(old_subdirs):
+                self._scan_tree(added)
+        return changed
+
+    def _load_index(self) -> bool:
+        """Load the persisted per-directory index. Returns False if missing or stale."""
+        if not self.index_path or not os.path.exists(self.index_path):
+            return False
+        try:
+            with open(self.index_path, 'r') as f:
+                snapshot = json.load(f)
+            if snapshot.get('version') != INDEX_VERSION or '' not in snapshot['dirs']:
+                return False
+            dirs = {}
+            for rel_dir, entry in snapshot['dirs'].items():
+                rel_dir = rel_dir.replace('/', os.sep)
+                dirs[rel_dir] = (
+                    entry['mtime'],
+                    [d.replace('/', os.sep) for d in entry['subdirs']],
+                    [PdfEntry(**p) for p in entry['pdfs']],
+                    [AudioTrack(**a) for a in entry['audio']]
+                )
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Catalog: ignoring unreadable index {self.index_path}: {e}")
+            return False
+        self._dirs = dirs
+        return True
+
+    def _save_index(self):
+        """Atomically write the per-directory index next to the other data files"""
+        if not self.index_path:
+            return
+        snapshot = {
+            'version': INDEX_VERSION,
+            'dirs': {
+                rel_dir.replace(os.sep, '/'): {
+                    'mtime': mtime,
+                    'subdirs': [d.replace(os.sep, '/') for d in subdirs],
+                    'pdfs': [p.to_dict() for p in pdfs],
+                    'audio': [a.to_dict() for a in audio]
+                }
+                for rel_dir, (mtime, subdirs, pdfs, audio) in self._dirs.items()
+            }
+        }
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f, separators=(',', ':'))
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"Catalog: could not write index {self.index_path}: {e}")
+
+    def payload(self, name: str) -> Tuple[bytes, str]:
+        """
+        Get the serialized JSON list and its ETag.
+
+        Args:
+            name: 'pdfs' or 'audio'
+
+        Returns:
+            (body, etag) tuple
+        """
+        self.refresh()
+        return self._payloads[name]
+
+    def resolve(self, name: str, url_path: str) -> Optional[str]:
+        """
+        Absolute path of a cataloged file, or None if it is not in the catalog.
+
+        Args:
+            name: 'pdfs' or 'audio'
+            url_path: The entry's path with '/' separators, as used in URLs
+        """
+        self.refresh()
+        return self._paths[name].get(url_path)
+
+    def get_pdf_files(self) -> List[Dict]:
+        self.refresh()
+        return [p.to_dict() for p in self.pdfs]
+
+    def get_audio_files(self) -> List[Dict]:
+        self.refresh()
+        return [a.to_dict() for a in self.audio]
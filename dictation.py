@@ -0,0 +1,323 @@
+import time
+import uuid
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from typing import List, Dict, Optional, Callable, Sequence, Tuple
+
+from alignment import get_opcodes
+from transcripts import normalize_text, UNKNOWN_TOKEN
+
+# An equal run at least this long is trusted: everything up to its end is frozen
+FREEZE_RUN = 3
+# A tail this long without a trusted run is frozen up to its middle anyway
+MAX_TAIL = 200
+# Extra reference words aligned beyond twice the tail length (skipped words)
+WINDOW_SLACK = 16
+# Longer replace runs are categorized word by word rather than as one segment
+MAX_REPLACE_WORDS = 4
+# Categorized (user, reference) segments remembered per session; the tail is
+# re-scored on every append but mostly pairs the same words again
+CATEGORY_MEMO = 4 * MAX_TAIL
+
+ERROR_CATEGORIES = ('grammar', 'spelling', 'listening', 'vocabulary')
+
+
+class DictationSession:
+    """
+    Live dictation scoring against one reference transcript.
+
+    The user's words arrive in appended chunks. Alignment is kept as a frozen
+    prefix (fixed matches, errors and category counts) plus a short tail that
+    is re-aligned against a window of the reference on every update, so the
+    cost of an append depends on the chunk and the tail, not on how much has
+    been typed. Reference words past the user's position count as pending,
+    not as missed.
+
+    Committed errors are final until a retraction reaches into the frozen
+    prefix. That update has reset=True and its committed_errors replace
+    everything committed before.
+    """
+
+    def __init__(self, reference_words: Sequence[str], reference_ids: Sequence[int],
+                 encode: Callable[[List[str]], array],
+                 categorize: Callable[[str, str], str],
+                 transcript_id: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.transcript_id = transcript_id
+        self.reference_words = reference_words
+        self.reference_ids = reference_ids
+        self.encode = encode
+        self.categorize = categorize
+
+        self.user_words: List[str] = []
+        self.user_ids = array('i')
+
+        # Frozen prefix: user_words[:frozen_user] aligned to reference_words[:frozen_ref]
+        self.frozen_user = 0
+        self.frozen_ref = 0
+        self.frozen_matches = 0
+        self.frozen_errors: List[Dict] = []
+        self.frozen_categories = Counter()
+        # Two generations: a full memo becomes the old one, so tail pairs survive the swap
+        self._categories: Dict[Tuple[str, str], str] = {}
+        self._old_categories: Dict[Tuple[str, str], str] = {}
+
+        self.version = 0
+        # Bumped when a retraction un-freezes the prefix and committed errors start over
+        self.epoch = 0
+        self.last_update: Dict = {}
+        self.last_active = time.monotonic()
+        self.closed = False
+        self._lock = threading.Lock()
+        self.changed = threading.Condition(self._lock)
+
+    @classmethod
+    def from_text(cls, reference_text: str, categorize: Callable[[str, str], str]) -> 'DictationSession':
+        """Session for an ad-hoc reference, tokenized once with its own vocabulary"""
+        words = tuple(normalize_text(reference_text).split())
+        vocabulary: Dict[str, int] = {}
+        ids = array('i', [vocabulary.setdefault(word, len(vocabulary)) for word in words])
+        lookup = vocabulary.get
+        return cls(words, ids, lambda user_words: array('i', [lookup(w, UNKNOWN_TOKEN) for w in user_words]),
+                   categorize)
+
+    def append(self, text: str = '', retract: int = 0) -> Dict:
+        """
+        Add typed words and re-score.
+
+        Args:
+            text: Newly typed words (appended after the existing ones)
+            retract: Number of trailing words to remove first (corrections)
+
+        Returns:
+            Update dictionary (see _snapshot)
+        """
+        words = normalize_text(text).split()
+        with self._lock:
+            self.last_active = time.monotonic()
+            reset = False
+            if retract:
+                keep = max(0, len(self.user_words) - retract)
+                del self.user_words[keep:]
+                del self.user_ids[keep:]
+                if keep < self.frozen_user:
+                    # Correction reaches into the frozen prefix: start over and tell the client
+                    self._reset_frozen()
+                    self.epoch += 1
+                    reset = True
+            self.user_words.extend(words)
+            self.user_ids.extend(self.encode(words))
+
+            committed_from = len(self.frozen_errors)
+            tail_errors, tail_matches, tail_ref = self._align_tail()
+            update = self._snapshot(self.frozen_errors[committed_from:], tail_errors, tail_matches, tail_ref)
+            self.version += 1
+            update['version'] = self.version
+            update['reset'] = reset
+            self.last_update = update
+            self.changed.notify_all()
+            return update
+
+    def _reset_frozen(self):
+        self.frozen_user = self.frozen_ref = self.frozen_matches = 0
+        self.frozen_errors = []
+        self.frozen_categories = Counter()
+
+    def _align_tail(self) -> Tuple[List[Dict], int, int]:
+        """Re-align the unfrozen tail, freeze what became stable, return the rest"""
+        tail_len = len(self.user_ids) - self.frozen_user
+        window_end = min(len(self.reference_ids), self.frozen_ref + 2 * tail_len + WINDOW_SLACK)
+        opcodes = get_opcodes(self.user_ids[self.frozen_user:], self.reference_ids[self.frozen_ref:window_end])
+        opcodes = self._split_replaces(self._trim_pending(opcodes))
+
+        # Freeze through the last trusted equal run, or half of an overlong tail
+        cut = 0
+        for index, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+            if tag == 'equal' and i2 - i1 >= FREEZE_RUN:
+                cut = index + 1
+        if not cut and tail_len > MAX_TAIL:
+            for index, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+                if i2 >= tail_len // 2:
+                    cut = index + 1
+                    break
+
+        base_user, base_ref = self.frozen_user, self.frozen_ref
+        for tag, i1, i2, j1, j2 in opcodes[:cut]:
+            error = self._error(tag, base_user + i1, base_user + i2, base_ref + j1, base_ref + j2)
+            if error:
+                self.frozen_errors.append(error)
+                self.frozen_categories[error['category']] += 1
+            elif tag == 'equal':
+                self.frozen_matches += i2 - i1
+            self.frozen_user, self.frozen_ref = base_user + i2, base_ref + j2
+
+        tail_errors, tail_matches, tail_ref = [], 0, 0
+        for tag, i1, i2, j1, j2 in opcodes[cut:]:
+            error = self._error(tag, base_user + i1, base_user + i2, base_ref + j1, base_ref + j2)
+            if error:
+                tail_errors.append(error)
+            elif tag == 'equal':
+                tail_matches += i2 - i1
+            tail_ref = base_ref + j2 - self.frozen_ref
+        return tail_errors, tail_matches, tail_ref
+
+    @staticmethod
+    def _trim_pending(opcodes: List[Tuple]) -> List[Tuple]:
+        """Reference words after the user's last word have not been dictated yet"""
+        if opcodes and opcodes[-1][0] == 'insert':
+            opcodes = opcodes[:-1]
+        if opcodes and opcodes[-1][0] == 'replace':
+            tag, i1, i2, j1, j2 = opcodes[-1]
+            opcodes = opcodes[:-1] + [(tag, i1, i2, j1, j1 + min(j2 - j1, i2 - i1))]
+        return opcodes
+
+    @staticmethod
+    def _split_replaces(opcodes: List[Tuple]) -> List[Tuple]:
+        """
+        Pair the words of overlong replace runs one to one, with the remainder as
+        a delete or insert, so categorize() never compares whole garbled passages.
+        """
+        split = []
+        for opcode in opcodes:
+            tag, i1, i2, j1, j2 = opcode
+            if tag != 'replace' or max(i2 - i1, j2 - j1) <= MAX_REPLACE_WORDS:
+                split.append(opcode)
+                continue
+            pairs = min(i2 - i1, j2 - j1)
+            split.extend(('replace', i1 + k, i1 + k + 1, j1 + k, j1 + k + 1) for k in range(pairs))
+            if i2 - i1 > pairs:
+                split.append(('delete', i1 + pairs, i2, j2, j2))
+            elif j2 - j1 > pairs:
+                split.append(('insert', i2, i2, j1 + pairs, j2))
+        return split
+
+    def _categorize(self, user_segment: str, ref_segment: str) -> str:
+        """categorize() through the per-session memo"""
+        key = (user_segment, ref_segment)
+        category = self._categories.get(key)
+        if category is None:
+            category = self._old_categories.get(key)
+            if category is None:
+                category = self.categorize(user_segment, ref_segment)
+            if len(self._categories) >= CATEGORY_MEMO:
+                self._old_categories, self._categories = self._categories, {}
+            self._categories[key] = category
+        return category
+
+    def _error(self, tag: str, i1: int, i2: int, j1: int, j2: int) -> Optional[Dict]:
+        """Error entry for one opcode, categorized like /api/dictation/compare"""
+        if tag == 'equal':
+            return None
+        user_segment = ' '.join(self.user_words[i1:i2])
+        ref_segment = ' '.join(self.reference_words[j1:j2])
+        category = self._categorize(user_segment, ref_segment) if tag == 'replace' else 'listening'
+        return {
+            'user_word': user_segment,
+            'correct_word': ref_segment,
+            'category': category,
+            'position': i1
+        }
+
+    def _snapshot(self, committed: List[Dict], tail_errors: List[Dict],
+                  tail_matches: int, tail_ref: int) -> Dict:
+        total = len(self.reference_words)
+        matches = self.frozen_matches + tail_matches
+        position = self.frozen_ref + tail_ref
+        categories = Counter(self.frozen_categories)
+        for error in tail_errors:
+            categories[error['category']] += 1
+        return {
+            'session_id': self.id,
+            'total_words_user': len(self.user_words),
+            'total_words_reference': total,
+            'position': position,
+            'progress': round(position / total * 100, 2) if total else 0.0,
+            'accuracy': round(matches / total * 100, 2) if total else 0.0,
+            'accuracy_so_far': round(matches / position * 100, 2) if position else 0.0,
+            'categories': {c: categories.get(c, 0) for c in ERROR_CATEGORIES},
+            # Final from now on (unless reset); clients append these to what they already have
+            'committed_errors': committed,
+            # May still change as more words arrive
+            'pending_errors': tail_errors
+        }
+
+    def errors(self) -> List[Dict]:
+        with self._lock:
+            return self.frozen_errors + self.last_update.get('pending_errors', [])
+
+    def wait(self, version: int, timeout: float) -> Optional[Dict]:
+        """Block until an update newer than version exists; None on timeout or close"""
+        with self._lock:
+            self.changed.wait_for(lambda: self.version > version or self.closed, timeout)
+            if self.closed or self.version <= version:
+                return None
+            return self.last_update
+
+    def since(self, epoch: Optional[int], committed: int) -> Tuple[Dict, int, int]:
+        """
+        Latest update for a subscriber that may have missed versions.
+
+        Args:
+            epoch: The epoch the subscriber last saw (None if it saw nothing)
+            committed: How many committed errors it has received in that epoch
+
+        Returns:
+            (update with every committed error it is missing, current epoch, committed count)
+        """
+        with self._lock:
+            update = dict(self.last_update)
+            update['reset'] = epoch is not None and epoch != self.epoch
+            if update['reset']:
+                committed = 0
+            update['committed_errors'] = self.frozen_errors[committed:]
+            return update, self.epoch, len(self.frozen_errors)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            self.changed.notify_all()
+
+
+class DictationSessions:
+    """Registry of live sessions; idle ones are dropped after ttl seconds"""
+
+    def __init__(self, ttl: float = 1800.0, max_sessions: int = 1000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: 'OrderedDict[str, DictationSession]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, session: DictationSession) -> DictationSession:
+        with self._lock:
+            self._expire()
+            while len(self._sessions) >= self.max_sessions:
+                _, oldest = self._sessions.popitem(last=False)
+                oldest.close()
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str) -> Optional[DictationSession]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.monotonic() - session.last_active > self.ttl:
+                del self._sessions[session_id]
+                session.close()
+                return None
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def _expire(self):
+        now = time.monotonic()
+        for session_id in [s for s, session in self._sessions.items() if now - session.last_active > self.ttl]:
+            self._sessions.pop(session_id).close()
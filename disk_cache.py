@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class DiskCache:
+    """
+    Persistent JSON result cache with size-based LRU eviction and optional TTL.
+
+    Each entry is one JSON file under cache_dir; when their total size exceeds
+    max_bytes the least recently used files are deleted. Recency is the file
+    mtime, touched on every hit, so it survives restarts. Entries written with
+    a different version, or older than ttl seconds, count as misses.
+
+    Several processes (gunicorn workers, the question_bank CLI) may share one
+    cache_dir: a key missing from this process's index is looked up on disk,
+    and eviction re-reads the directory so sizes and recency include files
+    the other processes wrote.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 64 << 20,
+                 ttl: Optional[float] = None, version: int = 1):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version = version
+        self._lock = threading.Lock()
+        # key -> size in bytes, least recently used first
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._load()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load(self):
+        """(Re)build the index from the files in cache_dir, least recently used first"""
+        self._entries.clear()
+        self._bytes = 0
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        found = []
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            found.append((stat.st_mtime_ns, name[:-5], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._bytes += size
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            path = self._path(key)
+            if key not in self._entries:
+                # Possibly written by another process since we last listed the directory
+                try:
+                    size = os.stat(path).st_size
+                except OSError:
+                    self.misses += 1
+                    return None
+                self._entries[key] = size
+                self._bytes += size
+            try:
+                with open(path, 'r') as f:
+                    entry = json.load(f)
+                if entry.get('version') != self.version:
+                    raise ValueError('stale cache entry')
+                if self.ttl is not None and time.time() - entry.get('created', 0) > self.ttl:
+                    self._discard(key)
+                    self.expirations += 1
+                    self.misses += 1
+                    return None
+                os.utime(path)
+            except (OSError, ValueError):
+                self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['result']
+
+    def put(self, key: str, result: Dict):
+        if self.max_bytes <= 0:
+            return
+        body = json.dumps({'version': self.version, 'created': time.time(), 'result': result},
+                          separators=(',', ':'))
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(tmp_path, 'w') as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Cache: could not write {path}: {e}")
+                return
+            self._bytes += len(body) - self._entries.pop(key, 0)
+            self._entries[key] = len(body)
+            if self._bytes > self.max_bytes:
+                # Other processes add and evict files too; evict from what is actually on disk
+                self._load()
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def _discard(self, key: str):
+        self._bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'size': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0.0
+            }
+            if self.ttl is not None:
+                stats['ttl'] = self.ttl
+                stats['expirations'] = self.expirations
+            return stats
@@ -0,0 +1,54 @@
+"""
+gunicorn settings for the Flask app.
+
+    gunicorn -c gunicorn.conf.py
+
+Most request time is spent waiting on Gemini, so the worker is gthread: one
+process with many threads. The app is loaded once in the master
+(preload_app) and forked, so a restarted worker starts with the catalog,
+search index, transcripts and NLTK data already loaded.
+
+One worker is the default because some state lives in the process:
+dictation sessions (an append or event stream that lands on another worker
+gets a 404) and the GEMINI_MAX_CONCURRENCY cap, which is per process.
+To run more workers (WEB_CONCURRENCY), put them behind sticky routing so a
+dictation session always reaches the worker that created it, and divide
+GEMINI_MAX_CONCURRENCY by the worker count to stay within the API quota.
+Background jobs are kept in SQLite and work from any worker.
+
+Reloading:
+    kill -HUP <master pid>     restart workers gracefully (config and data;
+                                code is not re-imported because of preload)
+    kill -USR2 <master pid>    start a new master with new code, then
+                                kill -TERM the old one once it is up
+Data files (lessons.json, the catalog folders) are picked up without a reload.
+"""
+import gc
+import os
+
+wsgi_app = 'wsgi:create_app()'
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', 8000)}")
+
+worker_class = 'gthread'
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+
+preload_app = True
+
+# gthread workers heartbeat from their main loop, so this bounds a stuck worker, not a slow request
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Recycle workers now and then to bound slow growth of per-process caches
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", '-') or None
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the collector's reach: a GC pass in a worker
+    # would otherwise touch every object header and un-share those pages
+    gc.freeze()
+    server.log.info(f"Preloaded app frozen ({gc.get_freeze_count()} objects); starting {workers} x {threads} threads")
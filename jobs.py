@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+# A job function returns the JSON payload and HTTP status the synchronous route would send
+JobResult = Tuple[Dict, int]
+
+FINISHED = ('done', 'failed')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    owner INTEGER NOT NULL,
+    instance TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    http_status INTEGER,
+    result TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS instances (
+    token TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    heartbeat REAL NOT NULL
+);
+"""
+
+
+class JobQueue:
+    """
+    Local background jobs for slow endpoints, with no external broker.
+
+    Work runs on a small executor inside the web process while the job rows
+    (status, timings and the JSON result) live in a SQLite table, so any
+    worker process sharing the database file can answer /api/jobs/<id>.
+
+    Each queue (and each forked copy of it) records its jobs under a random
+    instance token and, while it has jobs, refreshes the token's heartbeat
+    every lease / 3 seconds. Unfinished jobs whose instance missed its lease
+    are marked failed on startup and when polled; a restarted process that
+    reuses the old PID (e.g. PID 1 in a container) gets a new token, so its
+    predecessor's jobs do not look alive. Finished jobs are purged after
+    retention seconds.
+    """
+
+    def __init__(self, db_path: str, workers: int = 4, retention: float = 86400.0, lease: float = 30.0):
+        self.db_path = db_path
+        self.retention = retention
+        self.workers = workers
+        self.lease = lease
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._local = threading.local()
+        self._last_purge = 0.0
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        db = self._connect()
+        db.executescript(SCHEMA)
+        if 'instance' not in {row['name'] for row in db.execute('PRAGMA table_info(jobs)')}:
+            # Tables from before instance tokens; their unfinished jobs fail as orphans below
+            db.execute('ALTER TABLE jobs ADD COLUMN instance TEXT')
+        self._start_instance()
+        self._fail_orphans()
+        self.purge()
+        # SQLite connections must not be used across fork(), e.g. by preloaded gunicorn workers
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+        self._start_instance()
+
+    def _start_instance(self):
+        """Register a fresh instance token; its heartbeat thread starts with the first job"""
+        self.instance = uuid.uuid4().hex
+        self._heartbeat_thread = None
+        self._heartbeat()
+
+    def _heartbeat(self):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO instances (token, pid, heartbeat) VALUES (?, ?, ?)",
+            (self.instance, os.getpid(), time.time())
+        )
+
+    def _keep_alive(self):
+        if self._heartbeat_thread is not None:
+            return
+
+        def beat():
+            while True:
+                time.sleep(self.lease / 3)
+                self._heartbeat()
+
+        self._heartbeat()
+        self._heartbeat_thread = threading.Thread(target=beat, name='job-heartbeat', daemon=True)
+        self._heartbeat_thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets pollers read while a job writes"""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.row_factory = sqlite3.Row
+            self._local.db = db
+        return db
+
+    def _fail_orphans(self, job_id: Optional[str] = None):
+        """Mark unfinished jobs (all, or just job_id) whose instance missed its lease as failed"""
+        now = time.time()
+        self._connect().execute(
+            "UPDATE jobs SET status = 'failed', http_status = 500, error = 'Interrupted by a restart', "
+            "finished_at = ? WHERE status IN ('queued', 'running') AND (? IS NULL OR id = ?) "
+            "AND (instance IS NULL OR (instance != ? AND instance NOT IN "
+            "(SELECT token FROM instances WHERE heartbeat >= ?)))",
+            (now, job_id, job_id, self.instance, now - self.lease)
+        )
+
+    def submit(self, kind: str, fn: Callable[..., JobResult], *args) -> str:
+        """
+        Queue fn(*args) and return the job id immediately.
+
+        Args:
+            kind: Short label for the job type, e.g. 'analyze_pdf'
+            fn: Callable returning (payload, http_status)
+        """
+        if time.monotonic() - self._last_purge > 3600:
+            self.purge()
+        self._keep_alive()
+        job_id = uuid.uuid4().hex
+        self._connect().execute(
+            "INSERT INTO jobs (id, kind, status, owner, instance, created_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+            (job_id, kind, os.getpid(), self.instance, time.time())
+        )
+        self._executor.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def _run(self, job_id: str, fn: Callable[..., JobResult], args: tuple):
+        db = self._connect()
+        db.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (time.time(), job_id))
+        try:
+            payload, http_status = fn(*args)
+            db.execute(
+                "UPDATE jobs SET status = 'done', http_status = ?, result = ?, finished_at = ? WHERE id = ?",
+                (http_status, json.dumps(payload), time.time(), job_id)
+            )
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            db.execute(
+                "UPDATE jobs SET status = 'failed', http_status = 500, error = ?, finished_at = ? WHERE id = ?",
+                (str(e), time.time(), job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        db = self._connect()
+        row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        if row['status'] not in FINISHED and row['instance'] != self.instance:
+            self._fail_orphans(job_id)
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def wait(self, job_id: str, status: Optional[str], timeout: float,
+             interval: float = 0.25) -> Optional[Dict]:
+        """Poll until the job's status differs from status; returns the job or None on timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job['status'] != status:
+                return job
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(interval)
+
+    def purge(self):
+        """Drop finished jobs older than the retention period"""
+        self._last_purge = time.monotonic()
+        db = self._connect()
+        db.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (time.time() - self.retention,)
+        )
+        db.execute("DELETE FROM instances WHERE heartbeat < ? AND token != ?",
+                   (time.time() - max(self.retention, self.lease), self.instance))
+
+    def stats(self) -> Dict:
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
@@ -1,13 +1,163 @@
+import os
 import re
-try:
-    import nltk
-    from nltk.corpus import stopwords
-    from nltk.tokenize import word_tokenize
-    from nltk.tag import pos_tag
-except ImportError:
-    nltk = None
-    print("Warning: nltk not found. Keyword extraction will be limited.")
-from typing import List, Dict, Tuple, Set
+import json
+import threading
+from typing import List, Dict, Tuple, Set, Optional
+from collections import deque, OrderedDict
+from pos_tagger import CompactTagger
+
+# NLTK resources the extractor needs, as (data path, download package)
+NLTK_RESOURCES = [
+    ('tokenizers/punkt', 'punkt'),
+    ('tokenizers/punkt_tab', 'punkt_tab'),
+    ('taggers/averaged_perceptron_tagger', 'averaged_perceptron_tagger'),
+    ('taggers/averaged_perceptron_tagger_eng', 'averaged_perceptron_tagger_eng'),
+]
+
+# Project-local NLTK data directory, searched first (used as-is in offline mode)
+BUNDLED_NLTK_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'nltk_data')
+
+# Word tokens for matching; multi-word patterns may only span spaces or hyphens
+WORD_RE = re.compile(r'\w+')
+JOINER_RE = re.compile(r'[\s\-]+')
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over word tokens.
+    
+    Patterns are single words or multi-word phrases. Because the alphabet is
+    whole words, every hit respects word boundaries ("rise" never matches
+    inside "surprise"), and all patterns are found in one pass over the text.
+    """
+    
+    def __init__(self, patterns: List[str]):
+        self.patterns: List[str] = []
+        self.pattern_lengths: List[int] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        
+        for pattern in patterns:
+            self._add(pattern)
+        self._link()
+    
+    def _add(self, pattern: str):
+        tokens = WORD_RE.findall(pattern.lower())
+        if not tokens:
+            return
+        state = 0
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][token] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append(len(self.patterns))
+        self.patterns.append(pattern)
+        self.pattern_lengths.append(len(tokens))
+    
+    def _link(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+    
+    def find_all(self, text: str) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        Find every occurrence of every pattern.
+        
+        Args:
+            text: Text to scan (should already be lowercased)
+            
+        Returns:
+            Dictionary mapping each pattern to its (start, end) character spans
+        """
+        hits = {pattern: [] for pattern in self.patterns}
+        goto, fail, out = self._goto, self._fail, self._out
+        starts = []
+        state = 0
+        prev_end = None
+        
+        for match in WORD_RE.finditer(text):
+            token = match.group()
+            # Phrases must not run across sentence punctuation
+            if prev_end is not None and not JOINER_RE.fullmatch(text, prev_end, match.start()):
+                state = 0
+            prev_end = match.end()
+            starts.append(match.start())
+            
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            
+            for pattern_id in out[state]:
+                first = len(starts) - self.pattern_lengths[pattern_id]
+                hits[self.patterns[pattern_id]].append((starts[first], match.end()))
+        
+        return hits
+
+class KeywordCache:
+    """
+    Bounded, thread-safe LRU cache for extract_keywords results.
+    
+    Keys are the _clean_text() form of a question. Hit, miss and eviction
+    counters are kept for monitoring.
+    """
+    
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: str, value: Dict):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0.0
+            }
 
 class IELTSKeywordExtractor:
     """
@@ -16,33 +166,28 @@ class IELTSKeywordExtractor:
     from questions to match against synonyms in texts.
     """
     
-    def __init__(self):
-        # Download required NLTK data
-        if nltk:
-            try:
-                nltk.data.find('tokenizers/punkt')
-            except LookupError:
-                nltk.download('punkt')
-            
-            try:
-                nltk.data.find('tokenizers/punkt_tab')
-            except LookupError:
-                nltk.download('punkt_tab')
-            
-            try:
-                nltk.data.find('corpora/stopwords')
-            except LookupError:
-                nltk.download('stopwords')
-            
-            try:
-                nltk.data.find('taggers/averaged_perceptron_tagger')
-            except LookupError:
-                nltk.download('averaged_perceptron_tagger')
-            
-            try:
-                nltk.data.find('taggers/averaged_perceptron_tagger_eng')
-            except LookupError:
-                nltk.download('averaged_perceptron_tagger_eng')
+    def __init__(self, cache_size: int = 4096, offline: Optional[bool] = None,
+                 tagger: Optional[str] = None):
+        # NLTK is imported and its resources checked on first use (or by warm_up),
+        # so constructing the extractor never blocks on disk or network.
+        # Offline mode never downloads; it only uses data already installed or
+        # bundled under data/nltk_data.
+        if offline is None:
+            offline = bool(os.environ.get('KEYWORD_OFFLINE'))
+        self.offline = offline
+        self.ready = threading.Event()
+        self._nltk_lock = threading.Lock()
+        self._word_tokenize = None
+        self._pos_tag_sents = None
+        
+        # 'nltk' uses the averaged perceptron (falling back to the built-in tagger
+        # when NLTK is unavailable); 'builtin' skips NLTK entirely
+        self.tagger = tagger or os.environ.get('KEYWORD_TAGGER', 'nltk')
+        if self.tagger not in ('nltk', 'builtin'):
+            raise ValueError(f"Unknown tagger '{self.tagger}', expected 'nltk' or 'builtin'")
+        self.compact_tagger = CompactTagger()
+        if self.tagger == 'builtin':
+            self.ready.set()
         
         # Content word tags (nouns, verbs, adjectives, adverbs)
         self.content_tags = {
@@ -64,6 +209,12 @@ class IELTSKeywordExtractor:
         
         # IELTS-specific synonyms database
         self.synonym_db = self._build_synonym_db()
+        
+        # Bidirectional synonym graph, precomputed so lookups are a dict hit
+        self.synonym_graph = self._build_synonym_graph()
+        
+        # Memoized extract_keywords results, keyed by cleaned question text
+        self.keyword_cache = KeywordCache(cache_size)
     
     def _build_synonym_db(self) -> Dict[str, Set[str]]:
         """Build a comprehensive synonym database for IELTS vocabulary"""
@@ -172,6 +323,29 @@ class IELTSKeywordExtractor:
             'implication': {'consequence', 'effect', 'impact', 'outcome', 'result', 'repercussion'}
         }
     
+    def _build_synonym_graph(self) -> Dict[str, Tuple[str, ...]]:
+        """
+        Precompute synonyms for every word that appears in the synonym database,
+        either as a key or as a member of another key's set.
+        
+        Each entry lists the word's own synonyms (sorted) followed by the keys
+        it is a synonym of (in database order), without duplicates.
+        """
+        reverse = {}
+        for key, synonym_set in self.synonym_db.items():
+            for synonym in synonym_set:
+                reverse.setdefault(synonym, []).append(key)
+        
+        graph = {}
+        for word in set(self.synonym_db) | set(reverse):
+            base_word = self._get_synonym_key(word)
+            synonyms = dict.fromkeys(sorted(self.synonym_db.get(base_word, ())))
+            for source in (word, base_word):
+                for key in reverse.get(source, ()):
+                    synonyms.setdefault(key)
+            graph[word] = tuple(synonyms)
+        return graph
+    
     def extract_keywords(self, question: str) -> Dict[str, List[str]]:
         """
         Extract just-the-words from an IELTS question.
@@ -186,17 +360,171 @@ class IELTSKeywordExtractor:
             - 'pos_tags': POS tags for all words
             - 'synonyms': Synonyms for each keyword
         """
-        # Clean and tokenize
-        question = self._clean_text(question)
-        if nltk:
-            tokens = word_tokenize(question)
-            pos_tags = pos_tag(tokens)
-        else:
-            # Fallback to simple split if nltk is missing
-            tokens = question.lower().split()
-            # If no pos_tag, treat all as content-like NN for simplicity in fallback
-            pos_tags = [(word, 'NN') for word in tokens]
+        return self.extract_keywords_batch([question])[0]
+    
+    def extract_keywords_batch(self, questions: List[str]) -> List[Dict[str, List[str]]]:
+        """
+        Extract just-the-words from several questions with a single tagging call.
         
+        Questions already in the keyword cache are not re-tagged.
+        
+        Args:
+            questions: IELTS question texts
+            
+        Returns:
+            One extract_keywords() result per question, in order
+        """
+        # Clean, then serve what we can from the cache
+        cleaned = [self._clean_text(question) for question in questions]
+        results = [None] * len(cleaned)
+        missing = {}
+        for i, question in enumerate(cleaned):
+            cached = self.keyword_cache.get(question)
+            if cached is not None:
+                results[i] = cached
+            else:
+                missing.setdefault(question, []).append(i)
+        
+        if missing:
+            pending = list(missing)
+            for question, pos_tags in zip(pending, self._tag_questions(pending)):
+                result = self._keywords_from_tags(pos_tags)
+                self.keyword_cache.put(question, result)
+                for i in missing[question]:
+                    results[i] = result
+        
+        # Hand out copies so callers cannot modify cached entries
+        return [{
+            'keywords': list(result['keywords']),
+            'filtered_words': list(result['filtered_words']),
+            'pos_tags': list(result['pos_tags']),
+            'synonyms': {k: list(v) for k, v in result['synonyms'].items()}
+        } for result in results]
+    
+    def _load_nltk(self) -> bool:
+        """
+        Import NLTK, make sure its resources exist and load the tagger model.
+        Runs once; concurrent callers wait for the first one to finish.
+        
+        Returns:
+            True if NLTK tagging is available
+        """
+        if self.ready.is_set():
+            return self._pos_tag_sents is not None
+        
+        with self._nltk_lock:
+            if self.ready.is_set():
+                return self._pos_tag_sents is not None
+            try:
+                import nltk
+                from nltk.tokenize import word_tokenize
+                from nltk.tag import pos_tag_sents
+            except ImportError:
+                print("Warning: nltk not found. Using the built-in POS tagger.")
+            else:
+                if os.path.isdir(BUNDLED_NLTK_DATA) and BUNDLED_NLTK_DATA not in nltk.data.path:
+                    nltk.data.path.insert(0, BUNDLED_NLTK_DATA)
+                if not self.offline:
+                    for path, package in NLTK_RESOURCES:
+                        try:
+                            nltk.data.find(path)
+                        except LookupError:
+                            nltk.download(package, quiet=True)
+                try:
+                    # Loads the perceptron model so the first request does not pay for it
+                    pos_tag_sents([word_tokenize('warm up the tagger')])
+                    self._word_tokenize = word_tokenize
+                    self._pos_tag_sents = pos_tag_sents
+                except LookupError as e:
+                    print(f"Warning: NLTK data unavailable ({'offline' if self.offline else 'download failed'}): {e}")
+            self.ready.set()
+        return self._pos_tag_sents is not None
+    
+    def warm_up(self, background: bool = True, lessons_path: Optional[str] = None) -> Optional[threading.Thread]:
+        """
+        Load NLTK resources ahead of the first request.
+        
+        Args:
+            background: Run in a daemon thread and return immediately
+            lessons_path: Optionally pre-warm the keyword cache from this file afterwards
+            
+        Returns:
+            The warm-up thread when running in the background
+        """
+        def run():
+            self._load_nltk()
+            if lessons_path:
+                self.warm_cache(lessons_path)
+        
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name='keyword-extractor-warm-up', daemon=True)
+        thread.start()
+        return thread
+    
+    def status(self) -> Dict:
+        """Readiness of the tagging backend"""
+        ready = self.ready.is_set()
+        return {
+            'ready': ready,
+            'offline': self.offline,
+            'tagger': ('nltk' if self._pos_tag_sents else 'builtin') if ready else 'loading'
+        }
+    
+    def _tag_questions(self, questions: List[str]) -> List[List[Tuple[str, str]]]:
+        """POS-tag cleaned questions in a single call"""
+        if self.tagger == 'nltk' and self._load_nltk():
+            return self._pos_tag_sents([self._word_tokenize(question) for question in questions])
+        # Built-in lexicon/suffix tagger when NLTK is unavailable or not wanted
+        tagger = self.compact_tagger
+        return tagger.tag_sents([tagger.tokenize(question) for question in questions])
+    
+    def warm_cache(self, lessons_path: str) -> int:
+        """
+        Pre-populate the keyword cache from an ingested lessons file.
+        
+        Collects every 'questions' entry (plain strings or {'question': ...})
+        and every writing prompt in the file.
+        
+        Args:
+            lessons_path: Path to data/lessons.json
+            
+        Returns:
+            Number of questions tagged
+        """
+        try:
+            with open(lessons_path, 'r') as f:
+                lessons = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Keyword cache warm-up skipped: {e}")
+            return 0
+        
+        questions = []
+        stack = [lessons]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(node)
+            elif isinstance(node, dict):
+                listed = node.get('questions')
+                for item in listed if isinstance(listed, list) else []:
+                    if isinstance(item, str):
+                        questions.append(item)
+                    elif isinstance(item, dict) and isinstance(item.get('question'), str):
+                        questions.append(item['question'])
+                if isinstance(node.get('prompt'), str):
+                    questions.append(node['prompt'])
+                stack.extend(v for k, v in node.items() if isinstance(v, (list, dict)) and k != 'questions')
+        
+        questions = [q for q in dict.fromkeys(questions) if q.strip()]
+        if questions:
+            self.extract_keywords_batch(questions)
+        print(f"Keyword cache warmed with {len(questions)} questions")
+        return len(questions)
+    
+    def _keywords_from_tags(self, pos_tags: List[Tuple[str, str]]) -> Dict[str, List[str]]:
+        """Split tagged tokens into keywords and filtered words"""
         # Extract content words
         keywords = []
         filtered_words = []
@@ -251,20 +579,13 @@ class IELTSKeywordExtractor:
         return word
 
     def _get_synonyms(self, word: str) -> List[str]:
-        """Get synonyms for a word from the database"""
-        synonyms = []
-        
-        # Direct or stemmed match
-        base_word = self._get_synonym_key(word)
-        if base_word in self.synonym_db:
-            synonyms.extend(self.synonym_db[base_word])
-        
-        # Check if word or base_word is a synonym of another word
-        for key, synonym_set in self.synonym_db.items():
-            if (word in synonym_set or base_word in synonym_set) and key not in synonyms:
-                synonyms.append(key)
-        
-        return list(set(synonyms))  # Remove duplicates
+        """Get synonyms for a word from the precomputed synonym graph"""
+        synonyms = self.synonym_graph.get(word)
+        if synonyms is None:
+            # Unknown words can only match through their stemmed base form
+            base_word = self._get_synonym_key(word)
+            synonyms = self.synonym_graph.get(base_word, ()) if base_word != word else ()
+        return list(synonyms)
     
     def find_matches_in_text(self, keywords: List[str], text: str) -> Dict[str, List[Dict]]:
         """
@@ -277,61 +598,83 @@ class IELTSKeywordExtractor:
         Returns:
             Dictionary mapping each keyword to its matches
         """
-        text_lower = text.lower()
-        matches = {}
+        return self._match_keyword_groups([keywords], text)[0]
+    
+    def _match_keyword_groups(self, keyword_groups: List[List[str]], text: str) -> List[Dict[str, List[Dict]]]:
+        """
+        Find matches for several keyword lists with a single scan of the text.
         
-        for keyword in keywords:
-            keyword_matches = []
-            keyword_lower = keyword.lower()
+        Args:
+            keyword_groups: One list of keywords per question
+            text: Text to search in
             
-            # Find direct matches
-            if keyword_lower in text_lower:
-                # Find all positions
-                start = 0
-                while True:
-                    pos = text_lower.find(keyword_lower, start)
-                    if pos == -1:
-                        break
-                    
-                    # Get context around the match
-                    context_start = max(0, pos - 50)
-                    context_end = min(len(text), pos + len(keyword) + 50)
-                    context = text[context_start:context_end]
-                    
+        Returns:
+            One find_matches_in_text() result per keyword list
+        """
+        text_lower = text.lower()
+        
+        # Collect every keyword and synonym, then scan the text once
+        keyword_synonyms = {}
+        patterns = {}
+        for keywords in keyword_groups:
+            for keyword in keywords:
+                if keyword in keyword_synonyms:
+                    continue
+                keyword_lower = keyword.lower()
+                synonyms = self._get_synonyms(keyword_lower)
+                keyword_synonyms[keyword] = synonyms
+                patterns[keyword_lower] = None
+                for synonym in synonyms:
+                    patterns[synonym.lower()] = None
+        
+        hits = KeywordAutomaton(list(patterns)).find_all(text_lower)
+        
+        def context_for(start, end):
+            return text[max(0, start - 50):min(len(text), end + 50)]
+        
+        results = []
+        for keywords in keyword_groups:
+            matches = {}
+            for keyword in keywords:
+                keyword_matches = []
+                
+                # Direct matches
+                for start, end in hits.get(keyword.lower(), []):
                     keyword_matches.append({
                         'type': 'direct',
                         'word': keyword,
-                        'position': pos,
-                        'context': context
+                        'position': start,
+                        'context': context_for(start, end)
                     })
-                    start = pos + 1
-            
-            # Find synonym matches
-            synonyms = self._get_synonyms(keyword_lower)
-            for synonym in synonyms:
-                if synonym.lower() in text_lower:
-                    start = 0
-                    while True:
-                        pos = text_lower.find(synonym.lower(), start)
-                        if pos == -1:
-                            break
-                        
-                        context_start = max(0, pos - 50)
-                        context_end = min(len(text), pos + len(synonym) + 50)
-                        context = text[context_start:context_end]
-                        
+                
+                # Synonym matches
+                for synonym in keyword_synonyms[keyword]:
+                    for start, end in hits.get(synonym.lower(), []):
                         keyword_matches.append({
                             'type': 'synonym',
                             'word': synonym,
                             'original_keyword': keyword,
-                            'position': pos,
-                            'context': context
+                            'position': start,
+                            'context': context_for(start, end)
                         })
-                        start = pos + 1
-            
-            matches[keyword] = keyword_matches
+                
+                matches[keyword] = keyword_matches
+            results.append(matches)
+        
+        return results
+    
+    def _match_statistics(self, keywords: List[str], matches: Dict[str, List[Dict]]) -> Dict:
+        """Coverage statistics for one question's matches"""
+        total_keywords = len(keywords)
+        keywords_with_matches = sum(1 for k, m in matches.items() if m)
+        match_coverage = (keywords_with_matches / total_keywords * 100) if total_keywords > 0 else 0
         
-        return matches
+        return {
+            'total_keywords': total_keywords,
+            'keywords_with_matches': keywords_with_matches,
+            'match_coverage': round(match_coverage, 2),
+            'total_matches': sum(len(m) for m in matches.values())
+        }
     
     def analyze_question_text_match(self, question: str, text: str) -> Dict:
         """
@@ -350,21 +693,53 @@ class IELTSKeywordExtractor:
         # Find matches
         matches = self.find_matches_in_text(extraction_result['keywords'], text)
         
-        # Calculate match statistics
-        total_keywords = len(extraction_result['keywords'])
-        keywords_with_matches = sum(1 for k, m in matches.items() if m)
-        match_coverage = (keywords_with_matches / total_keywords * 100) if total_keywords > 0 else 0
-        
         return {
             'question': question,
             'text': text,
             'extraction': extraction_result,
             'matches': matches,
+            'statistics': self._match_statistics(extraction_result['keywords'], matches)
+        }
+    
+    def analyze_question_set(self, questions: List[str], text: str) -> Dict:
+        """
+        Analyze a whole question set against one passage.
+        
+        The questions are tagged in a single batch and the passage is scanned
+        once for the keywords and synonyms of every question.
+        
+        Args:
+            questions: IELTS questions for the passage
+            text: Passage to search for matches
+            
+        Returns:
+            Per-question analysis results plus overall statistics
+        """
+        extractions = self.extract_keywords_batch(questions)
+        all_matches = self._match_keyword_groups([e['keywords'] for e in extractions], text)
+        
+        results = []
+        for question, extraction_result, matches in zip(questions, extractions, all_matches):
+            results.append({
+                'question': question,
+                'extraction': extraction_result,
+                'matches': matches,
+                'statistics': self._match_statistics(extraction_result['keywords'], matches)
+            })
+        
+        total_keywords = sum(r['statistics']['total_keywords'] for r in results)
+        keywords_with_matches = sum(r['statistics']['keywords_with_matches'] for r in results)
+        match_coverage = (keywords_with_matches / total_keywords * 100) if total_keywords > 0 else 0
+        
+        return {
+            'text': text,
+            'results': results,
             'statistics': {
+                'total_questions': len(results),
                 'total_keywords': total_keywords,
                 'keywords_with_matches': keywords_with_matches,
                 'match_coverage': round(match_coverage, 2),
-                'total_matches': sum(len(m) for m in matches.values())
+                'total_matches': sum(r['statistics']['total_matches'] for r in results)
             }
         }
     
@@ -0,0 +1,231 @@
+import re
+import json
+import base64
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from payloads import JsonFilePayload, PreparedPayload
+
+SLUG_RE = re.compile(r'[^a-z0-9]+')
+
+# Keys of a test object; a field path starting with one of these is relative to a test
+TEST_KEYS = ('test_number', 'reading', 'listening', 'writing')
+
+
+def book_slug(name: str) -> str:
+    """URL-friendly book id, e.g. 'Cambridge IELTS 10' -> 'cambridge-ielts-10'"""
+    return SLUG_RE.sub('-', name.lower()).strip('-')
+
+
+def encode_cursor(book_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps({'after': book_id}).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> str:
+    """Book id the page starts after; raises ValueError for a malformed cursor"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return str(data['after'])
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def _collect_paths(value: Any, prefix: str, paths: set):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            paths.add(prefix + key)
+            _collect_paths(item, prefix + key + '.', paths)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_paths(item, prefix, paths)
+
+
+def _project(value: Any, tree: Dict) -> Any:
+    """Keep only the keys in tree (key -> subtree, or None for the whole value)"""
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    result = {}
+    for key, subtree in tree.items():
+        if key in value:
+            result[key] = value[key] if subtree is None else _project(value[key], subtree)
+    return result
+
+
+@dataclass(frozen=True)
+class _LessonState:
+    """One version of the lessons file and its lookups, swapped in as a whole"""
+    source: Optional[PreparedPayload]
+    generation: int
+    books: List[Dict]
+    book_ids: List[str]
+    # slug and lowercased name -> position in books
+    positions: Dict[str, int]
+    tests: Dict[Tuple[int, int], Dict]
+    fields: frozenset
+
+
+class LessonIndex:
+    """
+    In-memory index over data/lessons.json for projected and paginated reads.
+
+    Books are addressed by slug (or exact name) and tests by number, so a
+    single test is a dict lookup instead of a walk over the whole file.
+    Projected responses are serialized and compressed once per distinct
+    query and kept in a small LRU; the index and that cache are rebuilt
+    whenever the underlying payload is swapped for a new file version.
+    """
+
+    def __init__(self, payload: JsonFilePayload, max_cached: int = 256):
+        self.payload = payload
+        self.max_cached = max_cached
+        self._lock = threading.Lock()
+        self._state = _LessonState(None, 0, [], [], {}, {}, frozenset())
+        # Keys start with the state generation, so a result built from an older
+        # version of the file can never be served for the current one
+        self._cache: 'OrderedDict[tuple, PreparedPayload]' = OrderedDict()
+
+    def _current(self) -> _LessonState:
+        """The index for the current lessons file, rebuilt if it changed since the last request"""
+        source = self.payload.get()
+        state = self._state
+        if source is state.source:
+            return state
+        with self._lock:
+            state = self._state
+            if source is state.source:
+                return state
+            books = json.loads(source.body)
+            if not isinstance(books, list):
+                books = []
+            book_ids, positions, tests, fields = [], {}, {}, set()
+            for position, book in enumerate(books):
+                name = str(book.get('book', ''))
+                book_id = book_slug(name) or str(position)
+                # Disambiguate books whose names slug the same
+                while book_id in positions:
+                    book_id += '-' + str(position)
+                book_ids.append(book_id)
+                positions[book_id] = position
+                positions.setdefault(name.lower(), position)
+                for test in book.get('tests', []):
+                    tests[(position, test.get('test_number'))] = test
+            _collect_paths(books, '', fields)
+            state = _LessonState(source, state.generation + 1, books, book_ids, positions, tests, frozenset(fields))
+            self._cache.clear()
+            self._state = state
+            return state
+
+    def parse_fields(self, fields: Optional[str], scope: str = 'book') -> Optional[Dict]:
+        """
+        Turn 'book,tests.test_number,reading.title' into a projection tree.
+
+        Paths are relative to a book; paths starting with a test key
+        (e.g. 'reading.title') are taken relative to each test. For the
+        'test' scope a leading 'tests.' is dropped. Raises ValueError for
+        fields that do not occur in the data, and in the 'test' scope for
+        book-level fields.
+        """
+        if not fields:
+            return None
+        known = self._current().fields
+        tree: Dict = {}
+        for field in fields.split(','):
+            field = field.strip()
+            if not field:
+                continue
+            if field.split('.', 1)[0] in TEST_KEYS:
+                field = 'tests.' + field
+            if field not in known:
+                raise ValueError(f'Unknown field: {field}')
+            parts = field.split('.')
+            if scope == 'test':
+                if field == 'tests':
+                    return None
+                if parts[0] != 'tests':
+                    raise ValueError(f'Not a test field: {field}')
+                parts = parts[1:]
+            node = tree
+            for part in parts[:-1]:
+                if node.get(part, {}) is None:
+                    break   # an ancestor is already selected whole
+                node = node.setdefault(part, {})
+            else:
+                node[parts[-1]] = None
+        return tree
+
+    def _prepared(self, state: _LessonState, key: tuple, build) -> PreparedPayload:
+        key = (state.generation,) + key
+        with self._lock:
+            prepared = self._cache.get(key)
+            if prepared is not None:
+                self._cache.move_to_end(key)
+                return prepared
+        # Per-query results are compressed at a moderate level; they are built on demand
+        prepared = PreparedPayload.from_value(build(), level=5)
+        with self._lock:
+            if self._state is not state:
+                return prepared   # the file changed meanwhile: answer this request, cache nothing
+            self._cache[key] = prepared
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return prepared
+
+    @staticmethod
+    def _position(state: _LessonState, book: str) -> Optional[int]:
+        position = state.positions.get(book)
+        if position is None:
+            position = state.positions.get(book.lower())
+        return position
+
+    def lessons(self, tree: Optional[Dict] = None, cursor: Optional[str] = None,
+                limit: Optional[int] = None) -> PreparedPayload:
+        """
+        All books, projected. With a limit or cursor the response is a page:
+        {'lessons': [...], 'next_cursor': str or None}.
+        Raises ValueError for a cursor that does not name a known book.
+        """
+        state = self._current()
+        books, book_ids, positions = state.books, state.book_ids, state.positions
+        if tree is None and cursor is None and limit is None:
+            return state.source
+        start = 0
+        if cursor is not None:
+            position = positions.get(decode_cursor(cursor))
+            if position is None:
+                raise ValueError('Invalid cursor')
+            start = position + 1
+        key = ('lessons', json.dumps(tree, sort_keys=True), start, limit)
+
+        def build():
+            if cursor is None and limit is None:
+                return _project(books, tree) if tree is not None else books
+            end = len(books) if limit is None else min(len(books), start + limit)
+            page = books[start:end]
+            return {
+                'lessons': _project(page, tree) if tree is not None else page,
+                'next_cursor': encode_cursor(book_ids[end - 1]) if end < len(books) else None
+            }
+
+        return self._prepared(state, key, build)
+
+    def book(self, book: str, tree: Optional[Dict] = None) -> Optional[PreparedPayload]:
+        state = self._current()
+        position = self._position(state, book)
+        if position is None:
+            return None
+        key = ('book', position, json.dumps(tree, sort_keys=True))
+        data = state.books[position]
+        return self._prepared(state, key, lambda: _project(data, tree) if tree is not None else data)
+
+    def test(self, book: str, test_number: int, tree: Optional[Dict] = None) -> Optional[PreparedPayload]:
+        state = self._current()
+        position = self._position(state, book)
+        data = state.tests.get((position, test_number)) if position is not None else None
+        if data is None:
+            return None
+        key = ('test', position, test_number, json.dumps(tree, sort_keys=True))
+        return self._prepared(state, key, lambda: _project(data, tree) if tree is not None else data)
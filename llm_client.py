@@ -0,0 +1,347 @@
+import json
+import queue
+import random
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+# HTTP-style status codes worth retrying (google.api_core exceptions expose .code)
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+# A TimeoutError this close to the deadline is taken to be the deadline's own (timer granularity)
+DEADLINE_SLACK = 0.001
+
+
+# Marks the end of a stream handed between the client loop and its consumer
+_END = object()
+
+
+class LLMError(Exception):
+    """Base error raised by GeminiClient"""
+
+
+class LLMTimeout(LLMError):
+    """The call did not finish before its deadline"""
+
+
+class GeminiBackend:
+    """
+    Calls a google.generativeai GenerativeModel.
+
+    Pass a model, or an api_key and model_name to have it built on first use:
+    google.generativeai takes over half a second to import, which would
+    otherwise be paid by every process that imports app.py.
+    """
+
+    def __init__(self, model: Any = None, api_key: Optional[str] = None,
+                 model_name: str = 'gemini-flash-latest'):
+        self._model = model
+        self.api_key = api_key
+        self.model_name = model_name
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            self.load()
+        return self._model
+
+    def load(self):
+        """Import google.generativeai and build the model now (e.g. before forking workers)"""
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._model = genai.GenerativeModel(self.model_name)
+
+    async def generate(self, contents: Any) -> str:
+        if hasattr(self.model, 'generate_content_async'):
+            response = await self.model.generate_content_async(contents)
+        else:
+            response = await asyncio.to_thread(self.model.generate_content, contents)
+        return response.text
+
+    async def generate_stream(self, contents: Any) -> AsyncIterator[str]:
+        if not hasattr(self.model, 'generate_content_async'):
+            yield await self.generate(contents)
+            return
+        response = await self.model.generate_content_async(contents, stream=True)
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                continue  # chunk without text parts (e.g. safety metadata)
+            if text:
+                yield text
+
+
+class FakeBackend:
+    """
+    Offline stand-in for Gemini, for load tests and development without an
+    API key. Sleeps for a configurable latency, optionally fails a fraction of
+    calls with a retryable error, and answers with canned JSON shaped like
+    what each prompt in app.py asks for.
+    """
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.2, failure_rate: float = 0.0,
+                 responder: Optional[Callable[[Any], str]] = None,
+                 first_token: float = 0.1, chunk_size: int = 40):
+        self.latency = latency
+        self.first_token = first_token
+        self.chunk_size = chunk_size
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.responder = responder or self.canned_response
+        self.calls = 0
+
+    async def generate(self, contents: Any) -> str:
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        if self.failure_rate and random.random() < self.failure_rate:
+            error = LLMError('Fake backend: service unavailable')
+            error.code = 503
+            raise error
+        return self.responder(contents)
+
+    async def generate_stream(self, contents: Any) -> AsyncIterator[str]:
+        """Stream the canned response: first chunk after first_token of the latency, the rest spread out"""
+        self.calls += 1
+        latency = max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+        await asyncio.sleep(latency * self.first_token)
+        if self.failure_rate and random.random() < self.failure_rate:
+            error = LLMError('Fake backend: service unavailable')
+            error.code = 503
+            raise error
+        text = self.responder(contents)
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        for index, chunk in enumerate(chunks):
+            if index:
+                await asyncio.sleep(latency * (1 - self.first_token) / len(chunks))
+            yield chunk
+
+    @staticmethod
+    def canned_response(contents: Any) -> str:
+        prompt = contents[0] if isinstance(contents, list) else contents
+        if 'reading comprehension questions' in prompt:
+            return json.dumps({
+                'title': 'Article',
+                'questions': [
+                    {
+                        'id': i,
+                        'question': f'Sample question {i}?',
+                        'options': ['A) One', 'B) Two', 'C) Three', 'D) Four'],
+                        'answer': 'A'
+                    }
+                    for i in range(1, 5)
+                ]
+            })
+        if 'reading answer' in prompt:
+            return json.dumps({'is_correct': True, 'explanation': 'Sample explanation.'})
+        if 'audio response' in prompt:
+            return json.dumps({
+                'overall_score': 6.5,
+                'scores': {'fluency': '6.5', 'lexical': '6.5', 'grammar': '6.5', 'pronunciation': '6.5'},
+                'analysis': {'strengths': 'Sample strengths.', 'improvements': 'Sample improvements.'}
+            })
+        return json.dumps({'score': 6.5, 'feedback': 'Sample feedback.'})
+
+
+class GeminiClient:
+    """
+    Shared async wrapper around a generation backend.
+
+    All calls run on one event loop owned by the client (started in a daemon
+    thread on first use), so the backend's connections are reused and a
+    single semaphore caps concurrency across Flask threads and ASGI tasks.
+    Each call has an overall deadline; retryable failures are retried with
+    full-jitter exponential backoff while the deadline allows.
+
+    From sync code use generate_sync(); from async code await generate().
+    stream_sync() / stream() yield response text as it is generated; a
+    stream is only retried if it fails before its first chunk.
+    """
+
+    def __init__(self, backend, max_concurrency: int = 8, timeout: float = 30.0,
+                 retries: int = 2, backoff: float = 0.5, max_backoff: float = 8.0):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.calls = 0
+        self.retried = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                    ready.set()
+                    loop.run_forever()
+
+                threading.Thread(target=run, name='gemini-client', daemon=True).start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def generate_sync(self, contents: Any, timeout: Optional[float] = None) -> str:
+        """Blocking call for request threads; returns the response text"""
+        future = asyncio.run_coroutine_threadsafe(self._generate(contents, timeout), self._get_loop())
+        return future.result()
+
+    async def generate(self, contents: Any, timeout: Optional[float] = None) -> str:
+        """Awaitable call usable from any event loop; returns the response text"""
+        loop = self._get_loop()
+        if asyncio.get_running_loop() is loop:
+            return await self._generate(contents, timeout)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._generate(contents, timeout), loop))
+
+    async def _generate(self, contents: Any, timeout: Optional[float]) -> str:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        self.calls += 1
+        attempt = 0
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                self.timeouts += 1
+                raise LLMTimeout(f'Gemini call exceeded {timeout or self.timeout:.1f}s deadline')
+            try:
+                # Time spent waiting for a concurrency slot counts against the deadline
+                return await asyncio.wait_for(self._attempt(contents), remaining)
+            except Exception as e:
+                if self._deadline_expired(e, loop, deadline):
+                    self.timeouts += 1
+                    raise LLMTimeout(f'Gemini call exceeded {timeout or self.timeout:.1f}s deadline') from None
+                if attempt >= self.retries or not self._retryable(e):
+                    self.failures += 1
+                    raise
+            attempt += 1
+            self.retried += 1
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            await asyncio.sleep(min(delay, max(0.0, deadline - loop.time())))
+
+    def stream_sync(self, contents: Any, timeout: Optional[float] = None) -> Iterator[str]:
+        """Blocking iterator over response chunks for request threads"""
+        items = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._stream(contents, timeout, items.put), self._get_loop())
+        try:
+            while True:
+                item = items.get()
+                if item is _END:
+                    break
+                yield item
+            future.result()
+        finally:
+            # Consumer went away (e.g. the browser disconnected): stop generating
+            future.cancel()
+
+    async def stream(self, contents: Any, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Async iterator over response chunks, usable from any event loop"""
+        loop = self._get_loop()
+        consumer = asyncio.get_running_loop()
+        items = asyncio.Queue()
+        if consumer is loop:
+            producer = asyncio.ensure_future(self._stream(contents, timeout, items.put_nowait))
+        else:
+            producer = asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+                self._stream(contents, timeout, lambda item: consumer.call_soon_threadsafe(items.put_nowait, item)),
+                loop
+            ))
+        try:
+            while True:
+                item = await items.get()
+                if item is _END:
+                    break
+                yield item
+            await producer
+        finally:
+            producer.cancel()
+
+    async def _stream(self, contents: Any, timeout: Optional[float], put: Callable[[Any], None]):
+        """Run one streamed call on the client loop, handing chunks to put()"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        self.calls += 1
+        attempt = 0
+        progress = {'started': False}
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise LLMTimeout(f'Gemini call exceeded {timeout or self.timeout:.1f}s deadline')
+                try:
+                    await asyncio.wait_for(self._stream_attempt(contents, put, progress), remaining)
+                    return
+                except Exception as e:
+                    if self._deadline_expired(e, loop, deadline):
+                        self.timeouts += 1
+                        raise LLMTimeout(f'Gemini call exceeded {timeout or self.timeout:.1f}s deadline') from None
+                    if progress['started'] or attempt >= self.retries or not self._retryable(e):
+                        self.failures += 1
+                        raise
+                attempt += 1
+                self.retried += 1
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                await asyncio.sleep(min(delay, max(0.0, deadline - loop.time())))
+        finally:
+            put(_END)
+
+    async def _stream_attempt(self, contents: Any, put: Callable[[Any], None], progress: Dict):
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                async for chunk in self.backend.generate_stream(contents):
+                    progress['started'] = True
+                    put(chunk)
+            finally:
+                self.in_flight -= 1
+
+    async def _attempt(self, contents: Any) -> str:
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await self.backend.generate(contents)
+            finally:
+                self.in_flight -= 1
+
+    @staticmethod
+    def _deadline_expired(error: Exception, loop: asyncio.AbstractEventLoop, deadline: float) -> bool:
+        """
+        Whether error is wait_for giving up at the deadline. Since 3.11
+        asyncio.TimeoutError is the builtin TimeoutError, so a backend's own
+        timeout (e.g. a socket timeout) raised earlier is told apart by the clock
+        and stays retryable.
+        """
+        return isinstance(error, asyncio.TimeoutError) and loop.time() >= deadline - DEADLINE_SLACK
+
+    @staticmethod
+    def _retryable(error: Exception) -> bool:
+        if isinstance(error, (ConnectionError, TimeoutError)):
+            return True
+        return getattr(error, 'code', None) in RETRYABLE_CODES
+
+    def stats(self) -> Dict:
+        return {
+            'backend': type(self.backend).__name__,
+            'max_concurrency': self.max_concurrency,
+            'timeout': self.timeout,
+            'in_flight': self.in_flight,
+            'calls': self.calls,
+            'retried': self.retried,
+            'timeouts': self.timeouts,
+            'failures': self.failures
+        }
@@ -0,0 +1,296 @@
+import re
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+# Characters that can change the scanner state; everything else is skipped in bulk
+STRUCTURAL_RE = re.compile(r'[{}\[\]",\\]')
+# Inside a string only the closing quote and escapes matter
+STRING_RE = re.compile(r'["\\]')
+
+CLOSERS = {'{': '}', '[': ']'}
+
+
+class SchemaError(ValueError):
+    """A parsed object does not have the shape an endpoint expects"""
+
+
+class JsonObjectScanner:
+    """
+    Incremental brace matcher for JSON objects embedded in model output.
+
+    Text is fed in chunks as it streams in. The scanner tracks string and
+    escape state, so braces inside strings or surrounding prose do not
+    confuse it, and it stops at the first balanced object that parses (and
+    validates, if a schema is given). Only structural characters are
+    visited; runs of ordinary text are skipped by one regex search.
+
+    partial() returns a best-effort parse of the object received so far,
+    closed at the last complete element, so results can be shown before
+    generation finishes. close() marks the end of the stream and falls back
+    to extract_json() over the whole buffer, which also finds an object that
+    follows prose with an unclosed '{'.
+    """
+
+    def __init__(self, schema: Any = None):
+        self.schema = schema
+        self._chunks: List[str] = []
+        self._length = 0
+        self._pos = 0              # absolute offset of the next unscanned character
+        self._start = -1           # offset of the '{' that opened the current candidate
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape_at = -1       # offset of the character escaped by a backslash
+        # depth -> last offset where the candidate can be cut and closed with _stack[:depth]
+        self._safe_at: Dict[int, int] = {}
+        # (start, end, depth) of the last partial() parse, and its value
+        self._partial_key = None
+        self._partial = None
+        self.result: Optional[Dict] = None
+
+    def _text(self) -> str:
+        if len(self._chunks) > 1:
+            self._chunks = [''.join(self._chunks)]
+        return self._chunks[0] if self._chunks else ''
+
+    def feed(self, chunk: str) -> Optional[Dict]:
+        """Add streamed text; returns the object once the first valid one is complete"""
+        if self.result is not None or not chunk:
+            return self.result
+        # Only the new chunk is scanned; the buffer is joined when a candidate completes
+        base = self._length
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        text = chunk
+
+        while self._pos < self._length:
+            if self._pos < base:
+                # A rejected candidate sent us back into earlier chunks
+                text, base = self._text(), 0
+
+            if self._start < 0:
+                # Outside any candidate: jump straight to the next opening brace
+                brace = text.find('{', self._pos - base)
+                if brace < 0:
+                    self._pos = self._length
+                    break
+                brace += base
+                self._start, self._pos = brace, brace + 1
+                self._stack = ['{']
+                self._safe_at = {1: brace + 1}
+                continue
+
+            match = (STRING_RE if self._in_string else STRUCTURAL_RE).search(text, self._pos - base)
+            if match is None:
+                self._pos = self._length
+                break
+            index, char = match.start() + base, match.group()
+            self._pos = index + 1
+
+            if self._in_string:
+                if index == self._escape_at:
+                    continue
+                if char == '\\':
+                    self._escape_at = index + 1
+                elif char == '"':
+                    self._in_string = False
+                    if self._stack[-1] == '[':
+                        self._safe_at[len(self._stack)] = index + 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._stack.append(char)
+            elif char in '}]':
+                if CLOSERS[self._stack[-1]] != char:
+                    self._restart()
+                    continue
+                self._stack.pop()
+                depth = len(self._stack)
+                if not depth:
+                    candidate = self._accept(self._text()[self._start:index + 1])
+                    if candidate is not None:
+                        self.result = candidate
+                        return candidate
+                    self._restart()
+                    continue
+                # Cut points inside the container that just closed are no longer valid
+                for stale in [d for d in self._safe_at if d > depth]:
+                    del self._safe_at[stale]
+                self._safe_at[depth] = index + 1
+            elif char == ',':
+                self._safe_at[len(self._stack)] = index
+        return None
+
+    def _accept(self, candidate: str) -> Optional[Dict]:
+        try:
+            value = json.loads(candidate)
+        except ValueError:
+            return None
+        if not isinstance(value, dict):
+            return None
+        if self.schema is not None:
+            try:
+                validate(value, self.schema)
+            except SchemaError:
+                return None
+        return value
+
+    def _restart(self):
+        """Drop the current candidate and look for the next '{' after its opening brace"""
+        self._pos = self._start + 1
+        self._start = -1
+        self._stack = []
+        self._in_string = False
+        self._escape_at = -1
+        self._safe_at = {}
+
+    def close(self) -> Optional[Dict]:
+        """
+        End of stream: the first valid object anywhere in the text, or None.
+
+        The incremental scan commits to the first '{' it sees, so a stray
+        brace in leading prose ("prefix {{{ {...}") keeps it from ever
+        closing; extract_json() retries from every brace instead.
+        """
+        if self.result is None:
+            self.result = extract_json(self._text(), self.schema)
+        return self.result
+
+    def partial(self, max_depth: Optional[int] = None) -> Optional[Dict]:
+        """
+        Best-effort parse of the incomplete candidate, without schema validation.
+
+        Args:
+            max_depth: Only cut at this nesting depth or shallower, so every
+                container deeper than it is complete (e.g. 2 keeps only
+                fully closed objects of a top-level array)
+        """
+        if self.result is not None:
+            return self.result
+        points = [(end, depth) for depth, end in self._safe_at.items()
+                  if max_depth is None or depth <= max_depth]
+        if self._start < 0 or not points:
+            return None
+        end, depth = max(points)
+        # Join and parse the buffer only when the cut point has moved since the last call
+        key = (self._start, end, depth)
+        if key == self._partial_key:
+            return self._partial
+        self._partial_key, self._partial = key, None
+        stack = self._stack[:depth]
+        text = self._text()[self._start:end].rstrip()
+        if text.endswith(','):
+            text = text[:-1]
+        text += ''.join(CLOSERS[c] for c in reversed(stack))
+        try:
+            value = json.loads(text)
+        except ValueError:
+            return None
+        self._partial = value if isinstance(value, dict) else None
+        return self._partial
+
+
+_decoder = json.JSONDecoder()
+
+
+def extract_json(text: str, schema: Any = None) -> Optional[Dict]:
+    """
+    First JSON object in a complete response that parses and matches schema, or None.
+
+    Each '{' is tried with JSONDecoder.raw_decode, which stops at the end of
+    the object it starts, so prose braces before it and text after it are
+    never backtracked over. Use JsonObjectScanner for streamed text.
+    """
+    position = text.find('{')
+    while position >= 0:
+        try:
+            value, _ = _decoder.raw_decode(text, position)
+        except ValueError:
+            value = None
+        if isinstance(value, dict):
+            if schema is None:
+                return value
+            try:
+                validate(value, schema)
+                return value
+            except SchemaError:
+                pass
+        position = text.find('{', position + 1)
+    return None
+
+
+class PartialObjectStream:
+    """
+    Push-style iter_partial() for callers that receive chunks themselves,
+    from a blocking iterator or an async one.
+    """
+
+    def __init__(self, schema: Any = None, max_depth: Optional[int] = None):
+        self.scanner = JsonObjectScanner(schema)
+        self.max_depth = max_depth
+        self._last = None
+
+    @property
+    def result(self) -> Optional[Dict]:
+        return self.scanner.result
+
+    def close(self) -> Optional[Dict]:
+        """End of stream; see JsonObjectScanner.close()"""
+        return self.scanner.close()
+
+    def feed(self, chunk: str) -> Optional[Dict]:
+        """The partial object if this chunk changed it; check .result for completion"""
+        if self.scanner.feed(chunk) is not None:
+            return None
+        current = self.scanner.partial(self.max_depth)
+        if current and current != self._last:
+            self._last = current
+            return current
+        return None
+
+
+def iter_partial(chunks: Iterable[str], schema: Any = None, max_depth: Optional[int] = None):
+    """
+    Yield (partial_object, done) as streamed chunks arrive. The last item
+    has done=True and the validated object (or None if there was none).
+    """
+    stream = PartialObjectStream(schema, max_depth)
+    for chunk in chunks:
+        current = stream.feed(chunk)
+        if stream.result is not None:
+            break
+        if current is not None:
+            yield current, False
+    yield stream.close(), True
+
+
+def validate(value: Any, schema: Any, path: str = '$'):
+    """
+    Check value against a small structural schema and raise SchemaError.
+
+    A schema is a type (or tuple of types), a one-item list describing
+    every element, or a dict of key -> schema. Keys ending in '?' are
+    optional; keys not in the schema are allowed.
+    """
+    if isinstance(schema, dict):
+        if not isinstance(value, dict):
+            raise SchemaError(f"{path}: expected object")
+        for key, sub_schema in schema.items():
+            optional = key.endswith('?')
+            name = key[:-1] if optional else key
+            if name not in value:
+                if optional:
+                    continue
+                raise SchemaError(f"{path}.{name}: missing")
+            validate(value[name], sub_schema, f"{path}.{name}")
+    elif isinstance(schema, list):
+        if not isinstance(value, list):
+            raise SchemaError(f"{path}: expected array")
+        for index, item in enumerate(value):
+            validate(item, schema[0], f"{path}[{index}]")
+    elif schema is not None:
+        types = schema if isinstance(schema, tuple) else (schema,)
+        # bool is an int subclass, but true/false is never a valid number here
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            raise SchemaError(f"{path}: expected {'/'.join(t.__name__ for t in types)}")
@@ -0,0 +1,110 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+# Read size for hashing and for the fallback range iterator
+CHUNK_SIZE = 256 << 10
+
+# Bump whenever the digest snapshot layout changes
+DIGESTS_VERSION = 1
+
+
+class FileDigests:
+    """
+    Content-hash ETags for the served PDF and audio files.
+
+    A file is hashed (SHA-256) the first time it is requested and the
+    digest is remembered against its size and mtime, so later requests
+    only stat it. With index_path the digests are persisted, so restarted
+    workers do not re-read 100 MB books to answer a conditional request.
+    """
+
+    def __init__(self, index_path: Optional[str] = None):
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        # abs path -> (mtime_ns, size, digest)
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+        # abs path -> lock held while that file is hashed, so concurrent requests hash it once
+        self._hashing: Dict[str, threading.Lock] = {}
+        self._load()
+
+    def _load(self):
+        if not self.index_path or not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r') as f:
+                snapshot = json.load(f)
+            if snapshot.get('version') != DIGESTS_VERSION:
+                return
+            self._digests = {path: tuple(entry) for path, entry in snapshot['files'].items()}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Media: ignoring unreadable digest index {self.index_path}: {e}")
+
+    def _save(self):
+        if not self.index_path:
+            return
+        with self._lock:
+            snapshot = {'version': DIGESTS_VERSION, 'files': dict(self._digests)}
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f, separators=(',', ':'))
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"Media: could not write digest index {self.index_path}: {e}")
+
+    def get(self, path: str, stat: os.stat_result) -> str:
+        """Digest of the file at path; stat is the caller's fresh os.stat() of it"""
+        cached = self._digests.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+        with self._lock:
+            hashing = self._hashing.setdefault(path, threading.Lock())
+        with hashing:
+            cached = self._digests.get(path)
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                return cached[2]
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            value = digest.hexdigest()[:32]
+            with self._lock:
+                self._digests[path] = (stat.st_mtime_ns, stat.st_size, value)
+                self._hashing.pop(path, None)
+        self._save()
+        return value
+
+
+def iter_file_range(f, length: int) -> Iterator[bytes]:
+    """Yield exactly length bytes from the current position of f, then close it"""
+    try:
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def open_range(path: str, start: int, length: int, file_wrapper=None):
+    """
+    Response body for bytes [start, start + length) of a file.
+
+    With the server's wsgi.file_wrapper the file is handed over positioned
+    at start; gunicorn and waitress send from the current offset up to
+    Content-Length, via sendfile() where the platform has it. Without one
+    the range is streamed in chunks.
+    """
+    f = open(path, 'rb')
+    if start:
+        f.seek(start)
+    if file_wrapper is not None:
+        return file_wrapper(f, CHUNK_SIZE)
+    return iter_file_range(f, length)
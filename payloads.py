@@ -0,0 +1,119 @@
+import os
+import json
+import gzip
+import time
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+@dataclass(frozen=True)
+class PreparedPayload:
+    """A JSON document serialized once, with its compressed variants and ETag"""
+    body: bytes
+    gzip: bytes
+    br: Optional[bytes]
+    etag: str
+
+    @classmethod
+    def from_value(cls, value: Any, level: int = 9) -> 'PreparedPayload':
+        """Serialize and compress value; level 9 is gzip's maximum and maps to brotli's 11"""
+        body = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        return cls(
+            body=body,
+            gzip=gzip.compress(body, compresslevel=level, mtime=0),
+            br=brotli.compress(body, quality=level + 2) if brotli else None,
+            etag=hashlib.sha1(body).hexdigest()
+        )
+
+    def select(self, accept_encodings) -> Tuple[bytes, Optional[str], str]:
+        """
+        Pick the smallest representation the client accepts.
+
+        Args:
+            accept_encodings: werkzeug Accept object from request.accept_encodings
+
+        Returns:
+            (body, content_encoding or None, strong ETag for that representation)
+        """
+        if self.br is not None and accept_encodings['br']:
+            return self.br, 'br', f"{self.etag}-br"
+        if accept_encodings['gzip']:
+            return self.gzip, 'gzip', f"{self.etag}-gz"
+        return self.body, None, self.etag
+
+
+class JsonFilePayload:
+    """
+    A data file served as a PreparedPayload.
+
+    The file is read, re-serialized and compressed on first use. Afterwards
+    its size and mtime are checked at most every refresh_interval seconds;
+    when they change the payload is rebuilt off to the side and swapped in
+    with a single assignment, so requests never see a half-built payload.
+    """
+
+    def __init__(self, path: str, default: Any = None, refresh_interval: float = 5.0):
+        self.path = path
+        self.default = [] if default is None else default
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._prepared: Optional[PreparedPayload] = None
+        self._signature = None
+        self._last_check = 0.0
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self) -> PreparedPayload:
+        prepared = self._prepared
+        now = time.monotonic()
+        if prepared is not None and now - self._last_check < self.refresh_interval:
+            return prepared
+
+        with self._lock:
+            if self._prepared is not None and now - self._last_check < self.refresh_interval:
+                return self._prepared
+            self._last_check = now
+            signature = self._stat()
+            if self._prepared is None or signature != self._signature:
+                self._reload(signature)
+            return self._prepared
+
+    def _reload(self, signature):
+        value = self.default
+        if signature is not None:
+            try:
+                with open(self.path, 'r') as f:
+                    value = json.load(f)
+            except (OSError, ValueError) as e:
+                # Keep serving the previous version if a write is in progress
+                print(f"Payload: could not load {self.path}: {e}")
+                if self._prepared is not None:
+                    return
+        self._prepared = PreparedPayload.from_value(value)
+        self._signature = signature
+
+
+def warm_payloads(payloads, background: bool = True):
+    """Build every payload up front so the first request does not pay for compression"""
+    def build():
+        for payload in payloads:
+            payload.get()
+
+    if not background:
+        build()
+        return None
+    thread = threading.Thread(target=build, name='payload-warm', daemon=True)
+    thread.start()
+    return thread
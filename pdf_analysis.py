@@ -0,0 +1,157 @@
+import os
+import re
+import hashlib
+import threading
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import FrozenSet, Optional, Tuple
+
+from disk_cache import DiskCache
+
+# Same cleaning as IELTSKeywordExtractor._clean_text, applied page by page
+PUNCTUATION_RE = re.compile(r'[^\w\s\-]')
+
+
+def count_pages(path: str, start: int, stop: int, stop_words: FrozenSet[str]) -> Tuple[Counter, int]:
+    """
+    Extract pages [start, stop) of a PDF and count their content words.
+
+    The file is opened per chunk and the reader dropped on return, so a
+    worker holds nothing of a document between tasks. pypdf reads from the
+    open file rather than loading all of it, which keeps reopening cheap.
+
+    Returns:
+        (content word counts, total word count)
+    """
+    from pypdf import PdfReader
+    with open(path, 'rb') as f:
+        return _count_reader_pages(PdfReader(f), start, stop, stop_words)
+
+
+def _count_reader_pages(reader, start: int, stop: int, stop_words: FrozenSet[str]) -> Tuple[Counter, int]:
+    counts = Counter()
+    total = 0
+    for index in range(start, stop):
+        page_text = reader.pages[index].extract_text()
+        if not page_text:
+            continue
+        words = PUNCTUATION_RE.sub(' ', page_text).lower().split()
+        total += len(words)
+        counts.update(w for w in words if w not in stop_words and len(w) > 2 and not w.isdigit())
+    return counts, total
+
+
+class PdfWordCounter:
+    """
+    Page-parallel word counting for uploaded PDFs.
+
+    Pages are handed to a process pool in small chunks and every chunk comes
+    back as its own Counter, which is merged as soon as it completes. At most
+    2 * workers chunks are in flight, so the text of the whole document is
+    never held at once. Short documents are counted inline; the pool is only
+    started by the first large upload.
+
+    Workers import this module rather than inherit the app, so under
+    `python app.py` each one also imports app.py as __mp_main__ once, as
+    multiprocessing does for any non-fork pool. The production entry points
+    (gunicorn, waitress via wsgi.py, uvicorn) keep app.py off __main__.
+    """
+
+    def __init__(self, stop_words, workers: Optional[int] = None,
+                 pages_per_task: int = 8, parallel_min_pages: int = 16):
+        self.stop_words = frozenset(stop_words)
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.pages_per_task = pages_per_task
+        self.parallel_min_pages = parallel_min_pages
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Never fork the web process itself: by the first upload it runs server, Gemini,
+                # job and warm-up threads, and a child can inherit a lock one of them holds
+                # (logging, stdio, sqlite) and deadlock. Workers fork from a forkserver that
+                # only preloads this module and pypdf, or are spawned where there is none.
+                if 'forkserver' in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context('forkserver')
+                    context.set_forkserver_preload([__name__, 'pypdf'])
+                else:
+                    context = multiprocessing.get_context('spawn')
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._pool
+
+    def count(self, path: str) -> Tuple[Counter, int]:
+        """
+        Count content words across every page of a PDF on disk.
+
+        Args:
+            path: PDF file path (readable by the worker processes)
+
+        Returns:
+            (content word counts, total word count)
+        """
+        from pypdf import PdfReader
+        with open(path, 'rb') as f:
+            reader = PdfReader(f)
+            page_count = len(reader.pages)
+            if self.workers == 1 or page_count < self.parallel_min_pages:
+                return _count_reader_pages(reader, 0, page_count, self.stop_words)
+        del reader
+
+        pool = self._get_pool()
+        counts, total = Counter(), 0
+        pending = set()
+        for start in range(0, page_count, self.pages_per_task):
+            pending.add(pool.submit(count_pages, path, start,
+                                    min(start + self.pages_per_task, page_count), self.stop_words))
+            if len(pending) >= 2 * self.workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_counts, chunk_total = future.result()
+                    counts.update(chunk_counts)
+                    total += chunk_total
+        for future in pending:
+            chunk_counts, chunk_total = future.result()
+            counts.update(chunk_counts)
+            total += chunk_total
+        return counts, total
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+# Bump whenever the cached analysis layout or the counting rules change
+ANALYSIS_VERSION = 1
+
+
+def spool_upload(stream, path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Copy an upload stream to disk, hashing it on the way.
+
+    Returns:
+        SHA-256 hex digest of the content
+    """
+    digest = hashlib.sha256()
+    with open(path, 'wb') as out:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+
+class PdfAnalysisCache(DiskCache):
+    """
+    Persistent cache of /api/analyze/pdf results keyed by the SHA-256 of the
+    upload, evicting least recently used analyses past max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 64 << 20):
+        super().__init__(cache_dir, max_bytes=max_bytes, version=ANALYSIS_VERSION)
@@ -0,0 +1,272 @@
+import re
+from array import array
+from typing import List, Dict, Tuple
+
+# Penn Treebank tags produced by the tagger
+TAGS = [
+    'NN', 'NNS', 'NNP', 'NNPS',
+    'VB', 'VBD', 'VBG', 'VBN', 'VBP', 'VBZ',
+    'JJ', 'JJR', 'JJS',
+    'RB', 'RBR', 'RBS',
+    'DT', 'PDT', 'PRP', 'PRP$', 'WDT', 'WP', 'WP$', 'WRB', 'EX',
+    'IN', 'CC', 'TO', 'MD', 'CD', 'RP', 'UH', 'SYM', '.', ',', ':',
+]
+
+# Coarse classes used by the transition table
+TAG_CLASS = {
+    'NN': 'N', 'NNS': 'N', 'NNP': 'N', 'NNPS': 'N',
+    'VB': 'VB', 'VBP': 'VF', 'VBZ': 'VF', 'VBD': 'VD', 'VBN': 'VN', 'VBG': 'VG',
+    'JJ': 'J', 'JJR': 'J', 'JJS': 'J',
+    'RB': 'R', 'RBR': 'R', 'RBS': 'R',
+    'DT': 'D', 'PDT': 'D', 'PRP$': 'D', 'WDT': 'D', 'WP$': 'D',
+    'PRP': 'PRO', 'WP': 'PRO', 'EX': 'PRO', 'WRB': 'W',
+    'IN': 'P', 'CC': 'C', 'TO': 'TO', 'MD': 'M', 'CD': 'CD',
+    'RP': 'O', 'UH': 'O', 'SYM': 'O', '.': 'O', ',': 'O', ':': 'O',
+}
+
+# Bonus for moving from one coarse class to the next. '^' lists bonuses for
+# starting a sentence, '$' for ending one. Everything not listed scores 0.
+TRANSITIONS = """
+^  D 1.0  N 0.5  PRO 0.5  VB 0.3  VN -0.5  VD -0.5
+D  N 2.0  J 2.0  CD 1.0  R 0.3  VB -2.0  VF -2.0  VD -2.0  VN -1.0  D -1.0
+J  N 2.0  J 0.5  P 0.5  VB -1.0  VF -1.0  VD -1.0
+N  VF 1.5  VD 1.5  VN 0.5  P 1.0  N 0.5  C 0.5  M 1.0  VB -1.5  D -0.5
+PRO  VF 2.0  VD 2.0  M 1.5  R 0.5  VB -1.0  N -1.0  VN -1.0
+M  VB 3.0  R 1.0  VF -2.0  VD -2.0  N -2.0  D -1.0
+TO  VB 3.0  D 1.0  N 0.5  VF -2.0  VD -2.0
+P  D 1.5  N 1.0  J 0.5  CD 0.5  VG 0.5  VB -2.0  VF -2.0  VD -1.5
+R  J 1.0  VF 0.5  VD 0.5  VN 0.5  VB 0.5  VG 0.5
+VF  VN 1.5  VG 1.5  D 1.0  J 0.5  R 0.5  N 0.2  VF -2.0  VD -2.0
+VD  D 1.0  P 0.5  N 0.5  R 0.3  VN 0.5  VF -2.0  VD -1.5
+VB  D 1.0  N 0.5  P 0.3  VF -2.0  VD -2.0
+VN  P 1.0  D 0.5  N 0.5  TO 0.5  VF -1.5
+VG  D 1.0  N 1.0  P 0.5  VF -1.0
+CD  N 1.5  P 0.5
+C  D 0.5  N 0.5  J 0.3
+W  VF 0.5  PRO 0.5  J 0.5  N 0.3
+$  N 0.5  VB 0.3  VN 0.3  R 0.3  VF -1.0  D -2.0  P -1.5  C -2.0  M -2.0  TO -2.0
+"""
+
+# word -> candidate tags, most likely first. Words on several lines keep every tag.
+LEXICON = """
+DT: a an the this these those each every some any no another either neither
+PDT: all both half such
+PRP: i you he she it we they me him us them myself yourself himself herself itself ourselves themselves
+PRP$: my your his its our their her
+WDT: which whatever whichever
+WP: who whom what whoever
+WP$: whose
+WRB: when where why how whenever wherever
+EX: there
+IN: of in on at by for with from about as into like through after over between out against during without before under around among upon within along across behind beyond near since than until via whether although because though while if unless whereas despite towards toward onto per above below inside outside throughout off up down that
+DT: that
+CC: and or but nor yet plus
+TO: to
+MD: can could may might must shall should will would ought cannot
+CD: one two three four five six seven eight nine ten eleven twelve twenty thirty hundred thousand million billion
+RB: not n't very also just only even still already often always never sometimes usually rather quite too so however therefore then now here there thus perhaps almost again ever soon instead really else hence mainly largely mostly nearly recently generally particularly especially frequently approximately roughly together away back ago
+RBR: more less
+RBS: most least
+JJR: more less better worse higher lower larger greater smaller older younger longer shorter faster slower easier harder earlier later bigger cheaper richer poorer stronger weaker wider deeper fewer
+JJS: most least best worst highest lowest largest greatest smallest oldest youngest longest shortest fastest biggest
+JJ: many much few several other own same different new old good bad high low large small great little long short important major main significant possible able available certain clear common early late full general human local natural public real social special whole free modern recent serious similar simple single strong true various wide young economic political environmental global national international traditional likely unlikely own first last next previous main key
+VBZ: is has does
+VBP: am are have do
+VBD: was were had did
+VBN: been done
+VBG: being having doing
+VB: be have do
+VBD|VBN: made found thought told brought bought built caught felt fought held kept led left lost meant met paid said sold sent spent stood taught understood won heard put set cut read let
+VBD: went took gave became began came drew drove ate fell flew forgot got grew knew ran saw showed spoke rose wrote chose
+VBN: gone taken given become begun come drawn driven eaten fallen flown forgotten gotten grown known run seen shown spoken risen written chosen
+VB|NN: increase decrease change rise fall use need help work play study research report result cause effect control increase drop growth cost demand supply limit design support plan test process record produce lack impact influence focus rate measure benefit experience damage risk harm claim aim view form
+VB: make go take give find think tell begin bring buy build come get grow hold keep know lead leave lose mean meet pay say see sell send show speak spend stand teach understand write provide include allow suggest reduce improve develop create affect involve require consider explain describe discuss compare identify prevent protect produce achieve maintain remain seem become appear believe continue determine encourage ensure establish expect indicate introduce obtain occur offer prove receive replace represent tend apply rely
+NN: family supply series species news means people police data information evidence equipment research analysis basis crisis thesis status bus virus process business access success progress interest forest test rest west request contest protest harvest honesty
+JJ|NN: chemical individual potential professional commercial industrial
+NN|JJ: average total
+"""
+
+# (suffix, minimum word length, candidate tags); the longest matching suffix wins
+SUFFIX_RULES = [
+    ('ness', 6, ('NN',)), ('ment', 6, ('NN',)), ('tion', 6, ('NN',)), ('sion', 6, ('NN',)),
+    ('ship', 6, ('NN',)), ('ance', 6, ('NN',)), ('ence', 6, ('NN',)), ('ism', 5, ('NN',)),
+    ('ity', 5, ('NN',)), ('thing', 5, ('NN',)), ('ist', 5, ('NN',)),
+    ('ics', 5, ('NNS', 'NN')), ('ies', 4, ('NNS', 'VBZ')),
+    ('iest', 6, ('JJS',)), ('est', 6, ('JJS', 'NN')),
+    ('able', 6, ('JJ',)), ('ible', 6, ('JJ',)), ('ful', 5, ('JJ',)), ('ous', 5, ('JJ',)),
+    ('ive', 5, ('JJ', 'NN')), ('less', 6, ('JJ',)), ('ical', 6, ('JJ',)), ('al', 5, ('JJ', 'NN')),
+    ('ic', 5, ('JJ', 'NN')), ('ish', 5, ('JJ',)), ('ary', 5, ('JJ', 'NN')),
+    ('ly', 4, ('RB', 'JJ')),
+    ('ing', 5, ('VBG', 'NN', 'JJ')),
+    ('eed', 4, ('NN', 'VB')), ('ed', 4, ('VBD', 'VBN', 'JJ')),
+    ('ize', 5, ('VB',)), ('ise', 5, ('VB', 'NN')), ('ify', 5, ('VB',)), ('ate', 5, ('VB', 'JJ', 'NN')),
+    ('er', 4, ('NN', 'JJR')), ('or', 4, ('NN',)),
+    ('ss', 3, ('NN',)), ('us', 3, ('NN',)), ('is', 4, ('NN',)),
+    ('s', 3, ('NNS', 'VBZ')),
+]
+
+TOKEN_RE = re.compile(r"\w+(?:[-'’]\w+)*|[^\w\s]")
+# Punctuation tagged like nltk.pos_tag; any other non-word token is SYM
+PUNCTUATION_TAGS = {'.': '.', '!': '.', '?': '.', ',': ',', ':': ':', ';': ':'}
+NUMBER_RE = re.compile(r'^\d[\d.,]*$|^\d+(st|nd|rd|th|s)?$')
+
+# Each additional candidate tag costs this much emission score
+RANK_PENALTY = 0.5
+
+
+class CompactTagger:
+    """
+    Small lexicon + suffix-rule part-of-speech tagger with a Viterbi pass
+    over a coarse transition table.
+
+    It is much less accurate than NLTK's averaged perceptron in general, but
+    it reliably separates content words (nouns, verbs, adjectives, adverbs)
+    from function words, which is all the keyword extractor needs, and it
+    loads in a few milliseconds.
+    """
+
+    def __init__(self):
+        self.tags = TAGS
+        self.tag_index = {tag: i for i, tag in enumerate(TAGS)}
+        self._classes = [TAG_CLASS[tag] for tag in TAGS]
+        self.lexicon = self._parse_lexicon(LEXICON)
+        self._start, self._end, self._transitions = self._build_transitions(TRANSITIONS)
+
+        # Candidate lists are precomputed so tagging only does dict lookups
+        self._lexicon_candidates = {
+            word: self._scored(tag_ids) for word, tag_ids in self.lexicon.items()
+        }
+        self._suffix_rules: Dict[str, Tuple[int, List[Tuple[int, float]]]] = {}
+        for suffix, min_len, tags in SUFFIX_RULES:
+            self._suffix_rules[suffix] = (min_len, self._scored([self.tag_index[t] for t in tags]))
+        self._suffix_lengths = sorted({len(s) for s in self._suffix_rules}, reverse=True)
+        self._punctuation = {
+            mark: self._scored([self.tag_index[tag]]) for mark, tag in PUNCTUATION_TAGS.items()
+        }
+        self._fixed = {
+            name: self._scored([self.tag_index[t] for t in tags])
+            for name, tags in (
+                ('number', ('CD',)), ('symbol', ('SYM',)), ('proper', ('NNP',)),
+                ('proper_plural', ('NNPS', 'NNP')), ('hyphenated', ('JJ', 'NN')),
+                ('unknown', ('NN', 'JJ', 'VB')),
+            )
+        }
+
+    def _parse_lexicon(self, spec: str) -> Dict[str, Tuple[int, ...]]:
+        lexicon: Dict[str, List[int]] = {}
+        for line in spec.strip().splitlines():
+            tags, words = line.split(':', 1)
+            tag_ids = [self.tag_index[tag] for tag in tags.split('|')]
+            for word in words.split():
+                entry = lexicon.setdefault(word, [])
+                entry.extend(t for t in tag_ids if t not in entry)
+        return {word: tuple(tag_ids) for word, tag_ids in lexicon.items()}
+
+    def _build_transitions(self, spec: str) -> Tuple[array, array, array]:
+        """Expand the coarse class table into flat per-tag arrays"""
+        n_tags = len(TAGS)
+        coarse = {}
+        for line in spec.strip().splitlines():
+            fields = line.split()
+            source = fields[0]
+            for target, bonus in zip(fields[1::2], fields[2::2]):
+                coarse[(source, target)] = float(bonus)
+
+        start = array('f', (coarse.get(('^', cls), 0.0) for cls in self._classes))
+        end = array('f', (coarse.get(('$', cls), 0.0) for cls in self._classes))
+        transitions = array('f', bytes(4 * n_tags * n_tags))
+        for i, prev_cls in enumerate(self._classes):
+            row = i * n_tags
+            for j, cls in enumerate(self._classes):
+                transitions[row + j] = coarse.get((prev_cls, cls), 0.0)
+        return start, end, transitions
+
+    def tokenize(self, text: str) -> List[str]:
+        return TOKEN_RE.findall(text)
+
+    def _scored(self, tag_ids) -> List[Tuple[int, float]]:
+        """Attach rank-based emission scores; a bare verb may also be present tense (they increase)"""
+        candidates = [(t, -RANK_PENALTY * rank) for rank, t in enumerate(tag_ids)]
+        vb, vbp = self.tag_index['VB'], self.tag_index['VBP']
+        if vb in tag_ids and vbp not in tag_ids:
+            score = next(s for t, s in candidates if t == vb)
+            candidates.append((vbp, score - 0.3))
+        return candidates
+
+    def _candidates(self, word: str, sentence_start: bool) -> List[Tuple[int, float]]:
+        """Candidate tags for a token with their emission scores"""
+        lower = word.lower()
+        capitalized = word[0].isupper() and not sentence_start
+
+        candidates = self._lexicon_candidates.get(lower)
+        if candidates is not None:
+            if capitalized and not word.isupper():
+                return candidates + self._fixed['proper']
+            return candidates
+        if NUMBER_RE.match(lower):
+            return self._fixed['number']
+        if not word[0].isalnum():
+            return self._punctuation.get(word, self._fixed['symbol'])
+        if capitalized:
+            plural = lower.endswith('s') and len(lower) > 3
+            return self._fixed['proper_plural' if plural else 'proper']
+        if '-' in lower:
+            return self._fixed['hyphenated']
+
+        length = len(lower)
+        for suffix_len in self._suffix_lengths:
+            rule = self._suffix_rules.get(lower[-suffix_len:])
+            if rule is not None and length >= rule[0]:
+                return rule[1]
+        return self._fixed['unknown']
+
+    def tag(self, tokens: List[str]) -> List[Tuple[str, str]]:
+        """
+        Tag a tokenized sentence.
+
+        Args:
+            tokens: Words of the sentence
+
+        Returns:
+            (word, tag) pairs, like nltk.pos_tag
+        """
+        if not tokens:
+            return []
+
+        n_tags = len(self.tags)
+        transitions = self._transitions
+        lattice = []
+        sentence_start = True
+        for token in tokens:
+            lattice.append(self._candidates(token, sentence_start))
+            sentence_start = token in ('.', '!', '?')
+
+        # Viterbi over the (small) candidate sets
+        scores = [self._start[t] + s for t, s in lattice[0]]
+        backpointers = []
+        for position in range(1, len(lattice)):
+            previous = lattice[position - 1]
+            new_scores, pointers = [], []
+            for tag_id, emission in lattice[position]:
+                best_score, best_prev = None, 0
+                for k, (prev_id, _) in enumerate(previous):
+                    score = scores[k] + transitions[prev_id * n_tags + tag_id]
+                    if best_score is None or score > best_score:
+                        best_score, best_prev = score, k
+                new_scores.append(best_score + emission)
+                pointers.append(best_prev)
+            scores = new_scores
+            backpointers.append(pointers)
+
+        final = [score + self._end[t] for score, (t, _) in zip(scores, lattice[-1])]
+        k = max(range(len(final)), key=final.__getitem__)
+        path = [k]
+        for pointers in reversed(backpointers):
+            k = pointers[k]
+            path.append(k)
+        path.reverse()
+
+        return [(token, self.tags[lattice[i][k][0]]) for i, (token, k) in enumerate(zip(tokens, path))]
+
+    def tag_sents(self, sentences: List[List[str]]) -> List[List[Tuple[str, str]]]:
+        return [self.tag(tokens) for tokens in sentences]
@@ -0,0 +1,232 @@
+import os
+import json
+import asyncio
+import hashlib
+import argparse
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from disk_cache import DiskCache
+from llm_json import extract_json, validate, JsonObjectScanner, SchemaError
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Gemini only ever sees this much of an article, so it is all the cache key covers
+CONTENT_LIMIT = 4000
+
+# Bump whenever the prompt or the stored question format changes
+QUESTIONS_VERSION = 1
+
+
+def question_key(content: str, title: str) -> str:
+    """Cache key for a question set: SHA-256 of the title and the prompted part of the content"""
+    digest = hashlib.sha256()
+    digest.update(title.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(content[:CONTENT_LIMIT].encode('utf-8'))
+    return digest.hexdigest()
+
+
+def build_prompt(content: str, title: str) -> str:
+    return f"""
+        You are an expert IELTS examiner. Generate 4 high-quality reading comprehension questions (Multiple Choice) for the following article.
+
+        Article Title: {title}
+        Content: {content[:CONTENT_LIMIT]}
+
+        Return ONLY JSON in this format:
+        {{
+          "title": "{title}",
+          "questions": [
+            {{
+              "id": 1,
+              "question": "...",
+              "options": ["A) ...", "B) ...", "C) ...", "D) ..."],
+              "answer": "A"
+            }}
+          ]
+        }}
+        """
+
+
+# Shape a generated question set must have to be served or cached
+QUESTION_SCHEMA = {
+    'title?': str,
+    'questions': [{
+        'question': str,
+        'options': [str],
+        'answer': str
+    }]
+}
+
+
+def parse_questions(response_text: str) -> Optional[Dict]:
+    """Pull the first valid question set out of a model response, or None"""
+    return extract_json(response_text, QUESTION_SCHEMA)
+
+
+class QuestionStream:
+    """
+    Turns streamed question-set text into questions as each one's JSON
+    object closes and validates. Shared by the blocking and async streams.
+    """
+
+    def __init__(self):
+        self.scanner = JsonObjectScanner(QUESTION_SCHEMA)
+        self.sent = 0
+
+    def feed(self, chunk: str) -> Tuple[List[Dict], bool]:
+        """Returns (newly completed questions, whether the whole set is complete)"""
+        complete = self.scanner.feed(chunk) is not None
+        # Depth 2 cuts inside the questions array, so every listed question is closed
+        questions = (self.scanner.partial(max_depth=2) or {}).get('questions') or []
+        ready = []
+        for question in questions[self.sent:]:
+            try:
+                validate(question, QUESTION_SCHEMA['questions'][0])
+            except SchemaError:
+                break
+            ready.append(question)
+        self.sent += len(ready)
+        return ready, complete
+
+    def finish(self) -> Tuple[str, Dict]:
+        if self.scanner.close() is None:
+            return 'error', {'error': 'Failed to parse AI response'}
+        return 'done', self.scanner.result
+
+
+def stream_questions(llm, content: str, title: str) -> Iterator[Tuple[str, Dict]]:
+    """
+    Generate a question set with a streamed Gemini call.
+
+    Yields ('question', question) as soon as each question object closes and
+    validates, then ('done', question_set), or ('error', {'error': ...}).
+    """
+    parser = QuestionStream()
+    try:
+        for chunk in llm.stream_sync(build_prompt(content, title)):
+            questions, complete = parser.feed(chunk)
+            for question in questions:
+                yield 'question', question
+            if complete:
+                break
+    except Exception as e:
+        yield 'error', {'error': str(e)}
+        return
+    yield parser.finish()
+
+
+async def astream_questions(llm, content: str, title: str) -> AsyncIterator[Tuple[str, Dict]]:
+    """stream_questions() for event loops, using GeminiClient.stream()"""
+    parser = QuestionStream()
+    chunks = llm.stream(build_prompt(content, title))
+    try:
+        async for chunk in chunks:
+            questions, complete = parser.feed(chunk)
+            for question in questions:
+                yield 'question', question
+            if complete:
+                break
+    except Exception as e:
+        yield 'error', {'error': str(e)}
+        return
+    finally:
+        # Stop the Gemini stream now rather than when the generator is collected
+        await chunks.aclose()
+    yield parser.finish()
+
+
+class QuestionCache(DiskCache):
+    """
+    Persistent cache of generated question sets keyed by question_key(),
+    with a TTL so sets are eventually regenerated and LRU eviction past
+    max_bytes.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = 16 << 20,
+                 ttl: Optional[float] = 30 * 86400):
+        super().__init__(cache_dir or os.path.join(BASE_DIR, 'data', 'question_cache'),
+                         max_bytes=max_bytes, ttl=ttl, version=QUESTIONS_VERSION)
+
+
+def collect_sources(data_dir: str) -> List[Tuple[str, str]]:
+    """(content, title) pairs for every Guardian article and Cambridge reading passage"""
+    sources = []
+
+    path = os.path.join(data_dir, 'guardian_articles.json')
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            for article in json.load(f):
+                sources.append(((article.get('content') or '').strip(), article.get('title', 'Article')))
+
+    path = os.path.join(data_dir, 'lessons.json')
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            for book in json.load(f):
+                for test in book.get('tests', []):
+                    for passage in test.get('reading', []):
+                        title = passage.get('title') or f"{book.get('book')} Test {test.get('test_number')} Passage {passage.get('passage_number')}"
+                        sources.append(((passage.get('content') or '').strip(), title))
+
+    return [(content, title) for content, title in sources if content]
+
+
+async def pregenerate(llm, cache: QuestionCache, sources: List[Tuple[str, str]], concurrency: int = 4) -> Dict:
+    """
+    Generate and cache question sets for every source not already cached.
+    At most concurrency calls are in flight; the rest wait here rather than
+    in the client, where queue time would count against each call's timeout.
+    """
+    todo = {}
+    for content, title in sources:
+        key = question_key(content, title)
+        if key not in todo and cache.get(key) is None:
+            todo[key] = (content, title)
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def generate(key, content, title):
+        try:
+            async with slots:
+                questions = parse_questions(await llm.generate(build_prompt(content, title)))
+        except Exception as e:
+            print(f"  failed: {title}: {e}")
+            return False
+        if not questions:
+            print(f"  unparseable response: {title}")
+            return False
+        cache.put(key, questions)
+        print(f"  cached: {title}")
+        return True
+
+    print(f"{len(sources)} sources, {len(sources) - len(todo)} already cached, generating {len(todo)}")
+    results = await asyncio.gather(*(generate(key, *source) for key, source in todo.items()))
+    return {'sources': len(sources), 'generated': sum(results), 'failed': len(results) - sum(results)}
+
+
+if __name__ == "__main__":
+    from llm_client import GeminiClient, GeminiBackend, FakeBackend
+
+    parser = argparse.ArgumentParser(description="Pre-generate reading questions for Guardian articles and Cambridge passages")
+    parser.add_argument('--data-dir', default=os.path.join(BASE_DIR, 'data'))
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--fake', action='store_true', help='use the offline fake backend')
+    args = parser.parse_args()
+
+    if args.fake or os.environ.get("LLM_BACKEND") == 'fake':
+        backend = FakeBackend(latency=0.05)
+    else:
+        import google.generativeai as genai
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            parser.error("GEMINI_API_KEY is not set (use --fake for an offline run)")
+        genai.configure(api_key=api_key)
+        backend = GeminiBackend(genai.GenerativeModel('gemini-flash-latest'))
+
+    client = GeminiClient(backend, max_concurrency=args.concurrency, timeout=120)
+    cache = QuestionCache(
+        max_bytes=int(os.environ.get("QUESTION_CACHE_MAX_MB", 16)) << 20,
+        ttl=float(os.environ.get("QUESTION_CACHE_TTL_DAYS", 30)) * 86400
+    )
+    summary = asyncio.run(pregenerate(client, cache, collect_sources(args.data_dir), args.concurrency))
+    print(f"Generated {summary['generated']} question sets, {summary['failed']} failed")
@@ -0,0 +1,392 @@
+import os
+import re
+import json
+import glob
+import math
+import heapq
+import threading
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+from typing import List, Dict, Tuple, Optional, Callable
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Words are lowercase alphanumerics, optionally with an apostrophe suffix (e.g. "man's")
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:['’][a-z]+)?")
+PHRASE_RE = re.compile(r'"([^"]+)"')
+# Memoized expansions of query words that are not in the index
+UNINDEXED_EXPANSIONS = 1024
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def escape_html(text: str) -> str:
+    """Escape HTML special characters"""
+    return (text.replace('&', '&amp;')
+                .replace('<', '&lt;')
+                .replace('>', '&gt;')
+                .replace('"', '&quot;')
+                .replace("'", '&#x27;'))
+
+
+class IELTSProjectSearch:
+    """
+    Unified full-text search over Cambridge lessons and Guardian articles.
+
+    Builds a positional inverted index once (at construction, or with
+    build=False on warm_up() or the first search) and ranks results with
+    BM25. Quoted parts of a query ("carbon emissions") are
+    treated as phrases that must appear verbatim.
+
+    When a synonym_lookup (e.g. IELTSKeywordExtractor._get_synonyms) is
+    given, a term -> synonyms expansion table is precomputed at build time
+    so expand='synonyms' queries can score paraphrases at a lower weight.
+    The index is read-only once built, so request threads can search
+    concurrently without locking.
+    """
+
+    def __init__(self, data_dir: Optional[str] = None, k1: float = 1.5, b: float = 0.75,
+                 synonym_lookup: Optional[Callable[[str], List[str]]] = None,
+                 synonym_weight: float = 0.5, build: bool = True):
+        self.data_dir = data_dir or os.path.join(BASE_DIR, 'data')
+        self.k1 = k1
+        self.b = b
+        self.synonym_lookup = synonym_lookup
+        self.synonym_weight = synonym_weight
+
+        self.documents: List[Dict] = []
+        # term -> {doc_id: positions}
+        self.postings: Dict[str, Dict[int, array]] = {}
+        self.idf: Dict[str, float] = {}
+        # Per-document token character offsets, used to cut snippets
+        self._starts: List[array] = []
+        self._ends: List[array] = []
+        self._doc_len: List[int] = []
+        self._avgdl = 0.0
+        # term -> synonyms present in the index (multi-word synonyms are phrase keys)
+        self.expansions: Dict[str, Tuple[str, ...]] = {}
+        # Query words outside the index are expanded on first use and memoized here, not in the index
+        self._expand_unindexed = lru_cache(maxsize=UNINDEXED_EXPANSIONS)(self._expand_unindexed_term)
+        self.ready = threading.Event()
+        self._build_lock = threading.Lock()
+
+        if build:
+            self._ensure_built()
+
+    def _ensure_built(self):
+        """Load and index the documents once; concurrent callers wait for the first one"""
+        if self.ready.is_set():
+            return
+        with self._build_lock:
+            if self.ready.is_set():
+                return
+            self._load_documents()
+            self._build_index()
+            self.ready.set()
+
+    def warm_up(self, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Build the index ahead of the first search.
+
+        Args:
+            background: Run in a daemon thread and return immediately
+
+        Returns:
+            The warm-up thread when running in the background
+        """
+        if not background:
+            self._ensure_built()
+            return None
+        thread = threading.Thread(target=self._ensure_built, name='search-warm-up', daemon=True)
+        thread.start()
+        return thread
+
+    def _load_json(self, path: str):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Search: could not load {path}: {e}")
+            return None
+
+    def _load_documents(self):
+        """Collect passages, transcripts, writing prompts and articles as flat documents"""
+        seen = set()
+
+        books = []
+        lessons = self._load_json(os.path.join(self.data_dir, 'lessons.json'))
+        if isinstance(lessons, list):
+            books.extend(lessons)
+        for path in sorted(glob.glob(os.path.join(self.data_dir, 'book_*.json'))):
+            book = self._load_json(path)
+            if isinstance(book, dict):
+                books.append(book)
+
+        for book in books:
+            book_name = book.get('book', 'Cambridge IELTS')
+            for test in book.get('tests', []):
+                test_number = test.get('test_number')
+                parts = (
+                    ('reading', 'passage_number', 'content'),
+                    ('listening', 'section_number', 'transcript'),
+                    ('writing', 'task_number', 'prompt'),
+                )
+                for kind, number_field, text_field in parts:
+                    for item in test.get(kind, []):
+                        text = (item.get(text_field) or '').strip()
+                        number = item.get(number_field)
+                        key = (book_name, test_number, kind, number)
+                        if not text or key in seen:
+                            continue
+                        seen.add(key)
+                        label = {'reading': 'Passage', 'listening': 'Section', 'writing': 'Task'}[kind]
+                        self._add_document({
+                            'source': 'Cambridge',
+                            'type': kind,
+                            'title': item.get('title') or f"{book_name} Test {test_number} {label} {number}",
+                            'book': book_name,
+                            'test': test_number,
+                            'number': number,
+                            'text': text
+                        })
+
+        articles = self._load_json(os.path.join(self.data_dir, 'guardian_articles.json'))
+        for article in articles if isinstance(articles, list) else []:
+            text = (article.get('content') or '').strip()
+            url = article.get('url')
+            if not text or url in seen:
+                continue
+            seen.add(url)
+            self._add_document({
+                'source': article.get('source', 'The Guardian'),
+                'type': 'article',
+                'title': article.get('title', 'Untitled'),
+                'url': url,
+                'text': text
+            })
+
+    def _add_document(self, doc: Dict):
+        doc['id'] = len(self.documents)
+        self.documents.append(doc)
+
+    def _build_index(self):
+        """Tokenize every document once into positional postings"""
+        postings = defaultdict(dict)
+        total_len = 0
+
+        for doc in self.documents:
+            doc_id = doc['id']
+            text = doc['text']
+            starts, ends = array('I'), array('I')
+            position = 0
+            for match in TOKEN_RE.finditer(text.lower()):
+                term = match.group()
+                positions = postings[term].get(doc_id)
+                if positions is None:
+                    positions = postings[term][doc_id] = array('I')
+                positions.append(position)
+                starts.append(match.start())
+                ends.append(match.end())
+                position += 1
+            # Title-only words get an empty posting so they still match
+            for term in tokenize(doc['title']):
+                postings[term].setdefault(doc_id, array('I'))
+
+            self._starts.append(starts)
+            self._ends.append(ends)
+            self._doc_len.append(position)
+            total_len += position
+
+        self.postings = dict(postings)
+        if self.synonym_lookup:
+            self._build_expansions()
+
+        n_docs = len(self.documents)
+        self._avgdl = (total_len / n_docs) if n_docs else 0.0
+        self.idf = {term: self._compute_idf(term) for term in self.postings}
+        print(f"Search: indexed {n_docs} documents, {len(self.postings)} terms")
+
+    def _compute_idf(self, term: str, postings: Optional[Dict[str, Dict[int, array]]] = None) -> float:
+        n_docs = len(self.documents)
+        df = len((self.postings if postings is None else postings).get(term, ()))
+        return math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+    def _build_expansions(self):
+        """
+        Precompute the synonym expansion table for every indexed word.
+        Multi-word synonyms ("largest part") are indexed once as phrase
+        postings under their space-joined key.
+        """
+        for term in list(self.postings):
+            self.expansions[term] = self._expand_term(term, self.postings)
+
+    def _expand_term(self, term: str, postings: Dict[str, Dict[int, array]]) -> Tuple[str, ...]:
+        """
+        Indexed synonyms of a term. Phrase postings for multi-word synonyms
+        are added to postings: the index itself at build time, a per-query
+        dict for query words outside the index, so requests never mutate
+        shared state.
+        """
+        found = []
+        for synonym in sorted(self.synonym_lookup(term)):
+            tokens = tokenize(synonym)
+            if not tokens:
+                continue
+            key = ' '.join(tokens)
+            if key == term:
+                continue
+            if len(tokens) > 1 and key not in self.postings and key not in postings:
+                docs = {}
+                for doc_id in self.postings.get(tokens[0], {}):
+                    starts = self._phrase_positions(tokens, doc_id)
+                    if starts:
+                        docs[doc_id] = array('I', starts)
+                postings[key] = docs
+            if self.postings.get(key) or postings.get(key):
+                found.append(key)
+        return tuple(found)
+
+    def _expand_unindexed_term(self, term: str) -> Tuple[Tuple[str, ...], Dict[str, Dict[int, array]]]:
+        """Expansion of a word outside the index, with the phrase postings it needs"""
+        postings: Dict[str, Dict[int, array]] = {}
+        return self._expand_term(term, postings), postings
+
+    def _parse_query(self, query: str) -> Tuple[List[str], List[List[str]]]:
+        """Split a query into loose terms and quoted phrases"""
+        phrases = [tokenize(p) for p in PHRASE_RE.findall(query)]
+        phrases = [p for p in phrases if p]
+        terms = tokenize(PHRASE_RE.sub(' ', query))
+        for phrase in phrases:
+            terms.extend(phrase)
+        # Keep order, drop duplicates
+        return list(dict.fromkeys(terms)), phrases
+
+    def _phrase_positions(self, phrase: List[str], doc_id: int) -> List[int]:
+        """Start positions of a phrase inside a document"""
+        lists = []
+        for term in phrase:
+            positions = self.postings.get(term, {}).get(doc_id)
+            if not positions:
+                return []
+            lists.append(positions)
+        following = [set(p) for p in lists[1:]]
+        return [
+            start for start in lists[0]
+            if all(start + offset + 1 in positions for offset, positions in enumerate(following))
+        ]
+
+    def _score(self, weighted_terms: Dict[str, float],
+               extra: Optional[Dict[str, Dict[int, array]]] = None) -> Dict[int, float]:
+        """
+        Accumulate BM25 scores for every document containing a query term.
+        extra holds per-query phrase postings that are not in the index.
+        """
+        scores = defaultdict(float)
+        k1, b, avgdl = self.k1, self.b, self._avgdl or 1.0
+        for term, weight in weighted_terms.items():
+            docs = self.postings.get(term)
+            if docs:
+                idf = self.idf[term] * weight
+            else:
+                docs = (extra or {}).get(term)
+                if not docs:
+                    continue
+                idf = self._compute_idf(term, extra) * weight
+            for doc_id, positions in docs.items():
+                tf = len(positions) or 1  # title-only hit
+                norm = k1 * (1 - b + b * self._doc_len[doc_id] / avgdl)
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm)
+        return scores
+
+    def _snippet(self, doc_id: int, terms: Dict[str, float], anchor: Optional[int],
+                 width: int = 30) -> str:
+        """Cut a window of tokens around the first hit and wrap matched words in <mark>"""
+        doc = self.documents[doc_id]
+        text, starts, ends = doc['text'], self._starts[doc_id], self._ends[doc_id]
+        if not starts:
+            return escape_html(text[:200])
+
+        if anchor is None:
+            hits = [self.postings[t][doc_id][0] for t in terms
+                    if doc_id in self.postings.get(t, {}) and len(self.postings[t][doc_id])]
+            anchor = min(hits) if hits else 0
+
+        first = max(0, anchor - width // 3)
+        last = min(len(starts), first + width) - 1
+
+        # Token indexes to highlight: single-word terms and every word of a multi-word one
+        words = [text[starts[i]:ends[i]].lower() for i in range(first, last + 1)]
+        marked = set()
+        for term in terms:
+            term_words = term.split(' ')
+            n = len(term_words)
+            for i in range(len(words) - n + 1):
+                if words[i:i + n] == term_words:
+                    marked.update(range(first + i, first + i + n))
+
+        parts = ['...' if first > 0 else '']
+        cursor = starts[first]
+        for i in range(first, last + 1):
+            parts.append(escape_html(text[cursor:starts[i]]))
+            word = text[starts[i]:ends[i]]
+            if i in marked:
+                parts.append(f'<mark>{escape_html(word)}</mark>')
+            else:
+                parts.append(escape_html(word))
+            cursor = ends[i]
+        if last < len(starts) - 1:
+            parts.append('...')
+        return ''.join(parts).strip()
+
+    def search(self, query: str, limit: int = 10, expand: Optional[str] = None) -> List[Dict]:
+        """
+        Search the corpus.
+
+        Args:
+            query: Free text; quoted parts are phrase queries
+            limit: Maximum number of results
+            expand: 'synonyms' to also score paraphrases of each query term
+
+        Returns:
+            Ranked list of result dictionaries with highlighted snippets
+        """
+        terms, phrases = self._parse_query(query)
+        if not terms:
+            return []
+        self._ensure_built()
+
+        weighted_terms = {term: 1.0 for term in terms}
+        extra = {}
+        if expand == 'synonyms' and self.synonym_lookup:
+            for term in terms:
+                expanded = self.expansions.get(term)
+                if expanded is None:
+                    # Not an indexed word: its phrase postings are only lent to this query
+                    expanded, phrase_postings = self._expand_unindexed(term)
+                    extra.update(phrase_postings)
+                for synonym in expanded:
+                    weighted_terms.setdefault(synonym, self.synonym_weight)
+        scores = self._score(weighted_terms, extra)
+
+        phrase_anchor = {}
+        if phrases:
+            for doc_id in list(scores):
+                for phrase in phrases:
+                    starts = self._phrase_positions(phrase, doc_id)
+                    if not starts:
+                        del scores[doc_id]
+                        break
+                    phrase_anchor.setdefault(doc_id, starts[0])
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        results = []
+        for doc_id, score in top:
+            doc = self.documents[doc_id]
+            result = {k: v for k, v in doc.items() if k != 'text'}
+            result['score'] = round(score, 4)
+            result['snippet'] = self._snippet(doc_id, weighted_terms, phrase_anchor.get(doc_id))
+            results.append(result)
+        return results
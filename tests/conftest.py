@@ -0,0 +1,41 @@
+import os
+import json
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def client():
+    """Test client for app.py with the offline fake Gemini backend; skipped without Flask"""
+    pytest.importorskip('flask')
+    pytest.importorskip('flask_cors')
+    use_fake_backend()
+    import app
+    return app.app.test_client()
+
+
+@pytest.fixture(scope='session')
+def asgi_client():
+    """Starlette test client for asgi.py with the fake Gemini backend; skipped without Starlette"""
+    for module in ('flask', 'flask_cors', 'starlette', 'httpx', 'multipart'):
+        pytest.importorskip(module)
+    use_fake_backend()
+    from starlette.testclient import TestClient
+    import asgi
+    with TestClient(asgi.app) as test_client:
+        yield test_client
+
+
+def use_fake_backend():
+    os.environ['LLM_BACKEND'] = 'fake'
+    os.environ['LLM_FAKE_LATENCY'] = '0'
+
+
+def sse_events(lines):
+    """(event, data) pairs from an iterable of Server-Sent Event text lines"""
+    event = None
+    for line in lines:
+        if line.startswith('event: '):
+            event = line[len('event: '):]
+        elif line.startswith('data: '):
+            yield event, json.loads(line[len('data: '):])
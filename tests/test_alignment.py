@@ -0,0 +1,99 @@
+import random
+import difflib
+
+from alignment import get_matching_blocks, get_opcodes, similarity
+
+
+def matched(blocks):
+    return sum(size for _, _, size in blocks)
+
+
+def check_blocks(a, b, blocks):
+    assert blocks[-1] == (len(a), len(b), 0)
+    i = j = 0
+    for ai, bj, size in blocks:
+        assert ai >= i and bj >= j
+        assert a[ai:ai + size] == b[bj:bj + size]
+        i, j = ai + size, bj + size
+
+
+def test_never_matches_fewer_words_than_difflib():
+    rng = random.Random(11)
+    for _ in range(3000):
+        vocabulary = rng.randint(2, 12)
+        a = [rng.randrange(vocabulary) for _ in range(rng.randint(0, 40))]
+        b = [rng.randrange(vocabulary) for _ in range(rng.randint(0, 40))]
+        blocks = get_matching_blocks(a, b)
+        check_blocks(a, b, blocks)
+        reference = difflib.SequenceMatcher(None, a, b, autojunk=False).get_matching_blocks()
+        assert matched(blocks) >= matched(reference), (a, b)
+
+
+def test_unique_anchor_does_not_lose_matches():
+    # 'end' is the only word unique on both sides; anchoring on it alone matches one word
+    user = 'the the end'.split()
+    reference = 'end the the'.split()
+    assert matched(get_matching_blocks(user, reference)) == 2
+
+
+def test_opcodes_reconstruct_reference():
+    rng = random.Random(3)
+    reference = [f'w{rng.randrange(300)}' for _ in range(2000)]
+    user = list(reference)
+    for _ in range(40):
+        position = rng.randrange(len(user))
+        action = rng.choice(('replace', 'delete', 'insert'))
+        if action == 'replace':
+            user[position] = 'typo'
+        elif action == 'delete':
+            del user[position]
+        else:
+            user.insert(position, 'extra')
+
+    rebuilt = []
+    for tag, i1, i2, j1, j2 in get_opcodes(user, reference):
+        assert tag in ('equal', 'replace', 'delete', 'insert')
+        if tag == 'equal':
+            assert user[i1:i2] == reference[j1:j2]
+        if tag != 'delete':
+            rebuilt.extend(reference[j1:j2])
+    assert rebuilt == reference
+    assert similarity(user, reference) >= difflib.SequenceMatcher(None, user, reference, autojunk=False).ratio()
+
+
+def test_empty_sequences():
+    assert get_opcodes([], []) == []
+    assert get_opcodes(['a'], []) == [('delete', 0, 1, 0, 0)]
+    assert similarity([], []) == 1.0
+
+
+def test_budget_keeps_garbled_input_valid():
+    # Past the Myers budget the remaining gaps go to difflib; the result must still be a valid alignment
+    rng = random.Random(7)
+    reference = [f'w{rng.randrange(600)}' for _ in range(2000)]
+    for user in (reference[::-1], [f'w{rng.randrange(600)}' for _ in range(2000)]):
+        blocks = get_matching_blocks(user, reference)
+        check_blocks(user, reference, blocks)
+        assert matched(blocks) >= matched(difflib.SequenceMatcher(None, user, reference).get_matching_blocks())
+
+
+def test_noisy_transcripts_stay_inside_the_budget(monkeypatch):
+    # Up to half the words wrong is aligned by anchors and Myers alone, never by the difflib fallback
+    import alignment
+    from benchmarks.bench_alignment import cases
+
+    def fallback(*args, **kwargs):
+        raise AssertionError('alignment fell back to difflib')
+
+    monkeypatch.setattr(alignment, 'SequenceMatcher', fallback)
+    for name, user, reference in cases():
+        if name not in ('reversed', 'unrelated'):
+            check_blocks(user, reference, get_matching_blocks(user, reference))
+
+
+def test_no_slower_than_difflib():
+    from benchmarks.bench_alignment import best_ms, cases
+    for name, user, reference in cases():
+        ours = best_ms(lambda: get_matching_blocks(user, reference))
+        theirs = best_ms(lambda: difflib.SequenceMatcher(None, user, reference).get_matching_blocks())
+        assert ours < 1.5 * theirs, name
@@ -0,0 +1,223 @@
+import io
+import os
+import gzip
+import json
+
+import pytest
+
+from payloads import JsonFilePayload
+from llm_client import FakeBackend
+from tests.conftest import sse_events
+
+STREAM = {'Accept': 'text/event-stream'}
+
+
+@pytest.mark.parametrize('body', [{'content': 5}, {'content': ['not', 'text']}, {'content': 'text', 'title': 3}])
+def test_question_content_must_be_a_string(client, body):
+    response = client.post('/api/generate/questions', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_question_body_must_be_an_object(client):
+    response = client.post('/api/generate/questions', json=['content'])
+    assert response.status_code == 400
+
+
+def test_dictation_events_reset_and_close(client):
+    created = client.post('/api/dictation/session', json={
+        'reference_text': 'the quick brown fox jumps over the lazy dog'
+    }).get_json()
+    session_id = created['session_id']
+    base = f'/api/dictation/session/{session_id}'
+    first = client.post(f'{base}/append', json={'text': 'the quikc brown fox jumps over'}).get_json()
+    assert [e['user_word'] for e in first['committed_errors']] == ['quikc']
+    assert first['reset'] is False
+
+    events = client.get(f'{base}/events', buffered=False).response
+    assert next(events).startswith(b'event: update\n')
+
+    retracted = client.post(f'{base}/append', json={'text': 'quick brown fox jumps over', 'retract': 5}).get_json()
+    assert retracted['reset'] is True
+    assert retracted['committed_errors'] == []
+    assert next(events).startswith(b'event: reset\n')
+
+    assert client.delete(base).status_code == 200
+    assert list(events) == [b'event: closed\ndata: {}\n\n']
+    assert client.post(f'{base}/append', json={'text': 'x'}).status_code == 404
+
+
+def test_lesson_test_route(client):
+    response = client.get('/api/lessons/cambridge-ielts-02/1?fields=test_number,reading.title')
+    assert response.status_code == 200
+    test = response.get_json()
+    assert test['test_number'] == 1
+    assert set(test) == {'test_number', 'reading'}
+    assert all(set(passage) == {'title'} for passage in test['reading'])
+    assert client.get('/api/lessons/cambridge-ielts-02/99').status_code == 404
+    assert client.get('/api/lessons/cambridge-ielts-02/1?fields=book').status_code == 400
+
+
+@pytest.mark.parametrize('limit', ['abc', '0', '-1', '1.5'])
+def test_lessons_limit_must_be_a_positive_integer(client, limit):
+    assert client.get(f'/api/lessons?limit={limit}').status_code == 400
+
+
+def test_lessons_pages_follow_cursors(client):
+    everything = [book['book'] for book in client.get('/api/lessons?fields=book').get_json()]
+    seen, url = [], '/api/lessons?fields=book&limit=5'
+    while url:
+        page = client.get(url).get_json()
+        seen.extend(book['book'] for book in page['lessons'])
+        url = page['next_cursor'] and f"/api/lessons?fields=book&limit=5&cursor={page['next_cursor']}"
+    assert seen == everything
+
+
+@pytest.mark.parametrize('accept, encoding', [('br, gzip', 'br'), ('gzip', 'gzip'), ('identity', None)])
+def test_payload_encoding_negotiation(client, accept, encoding):
+    if encoding == 'br':
+        brotli = pytest.importorskip('brotli')
+    response = client.get('/api/vocabulary', headers={'Accept-Encoding': accept})
+    assert response.status_code == 200
+    assert response.headers.get('Content-Encoding') == encoding
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    body = response.get_data()
+    if encoding == 'br':
+        body = brotli.decompress(body)
+    elif encoding == 'gzip':
+        body = gzip.decompress(body)
+    identity = client.get('/api/vocabulary', headers={'Accept-Encoding': 'identity'}).get_data()
+    assert json.loads(body) == json.loads(identity)
+
+
+def test_payload_etags_per_encoding_and_304(client):
+    etags = set()
+    for accept in ('gzip', 'identity'):
+        response = client.get('/api/vocabulary', headers={'Accept-Encoding': accept})
+        etag = response.headers['ETag']
+        etags.add(etag)
+        cached = client.get('/api/vocabulary', headers={'Accept-Encoding': accept, 'If-None-Match': etag})
+        assert cached.status_code == 304
+        assert cached.headers['Vary'] == 'Accept-Encoding'
+    assert len(etags) == 2
+
+
+def test_half_written_file_keeps_the_old_payload(client, monkeypatch, tmp_path):
+    import app
+    path = tmp_path / 'vocabulary.json'
+    path.write_text(json.dumps([{'word': 'energy', 'count': 3}]))
+    payload = JsonFilePayload(str(path), refresh_interval=0)
+    monkeypatch.setitem(app.data_payloads, 'vocabulary', payload)
+    headers = {'Accept-Encoding': 'identity'}
+    assert client.get('/api/vocabulary', headers=headers).get_json() == [{'word': 'energy', 'count': 3}]
+
+    path.write_text('[{"word": "ener')
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    assert client.get('/api/vocabulary', headers=headers).get_json() == [{'word': 'energy', 'count': 3}]
+
+    path.write_text(json.dumps([{'word': 'power', 'count': 1}]))
+    os.utime(path, ns=(3_000_000_000, 3_000_000_000))
+    assert client.get('/api/vocabulary', headers=headers).get_json() == [{'word': 'power', 'count': 1}]
+
+
+def stream(client, *args, **kwargs):
+    response = client.post(*args, headers=STREAM, **kwargs)
+    assert response.mimetype == 'text/event-stream'
+    return list(sse_events(response.get_data(as_text=True).splitlines()))
+
+
+def test_speaking_stream_sends_partial_then_done(client):
+    events = stream(client, '/api/evaluate/speaking', data={'transcript': 'I grew up by the sea.'})
+    assert events[0] == ('partial', {'score': 6.5})
+    assert events[-1] == ('done', {'score': 6.5, 'feedback': 'Sample feedback.'})
+
+
+def fail(contents):
+    raise ValueError('quota exceeded')
+
+
+@pytest.mark.parametrize('responder', [fail, lambda contents: 'not json'])
+def test_speaking_stream_fails_like_the_blocking_route(client, monkeypatch, responder):
+    import app
+    monkeypatch.setattr(app.llm, 'backend', FakeBackend(latency=0, jitter=0, responder=responder))
+    form = {'transcript': 'I grew up by the sea.'}
+    blocking = client.post('/api/evaluate/speaking', data=form)
+    assert blocking.status_code == 200
+    assert blocking.get_json()['score'] == 6.0
+    assert stream(client, '/api/evaluate/speaking', data=form)[-1] == ('done', blocking.get_json())
+
+
+def test_question_and_job_streams(client):
+    body = {'content': 'Tidal power is predictable. Tidal power is expensive.', 'title': 'Tides'}
+    events = stream(client, '/api/generate/questions', json=body)
+    assert [event for event, _ in events].count('question') == 4
+    assert events[-1][0] == 'done'
+
+    accepted = client.post('/api/evaluate/speaking?async=1', data={'transcript': 'Hello.'})
+    assert accepted.status_code == 202
+    response = client.get(accepted.get_json()['status_url'], headers=STREAM)
+    events = list(sse_events(response.get_data(as_text=True).splitlines()))
+    assert events[-1][0] == 'done'
+    assert events[-1][1]['result']['score'] == 6.5
+
+
+@pytest.mark.parametrize('body', [{'questions': 'hello', 'text': 'hello world'},
+                                  {'questions': ['Where?'], 'text': 5}])
+def test_question_set_requires_a_list_of_questions(client, body):
+    response = client.post('/api/keywords/analyze/batch', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+@pytest.mark.parametrize('limit', ['abc', '0', '-1'])
+def test_search_limit_must_be_a_positive_integer(client, limit):
+    assert client.get(f'/api/search?q=energy&limit={limit}').status_code == 400
+
+
+def test_search_limit_is_capped(client):
+    response = client.get('/api/search?q=the&limit=500')
+    assert response.status_code == 200
+    assert len(response.get_json()) <= 50
+
+
+def test_keyword_status_route(client):
+    status = client.get('/api/keywords/status').get_json()
+    assert set(status) == {'ready', 'offline', 'tagger'}
+    assert status['tagger'] in ('nltk', 'builtin', 'loading')
+
+
+def test_compare_by_transcript_id_matches_compare_by_text(client):
+    import app
+    reference = client.get('/api/dictation/transcripts').get_json()[0]
+    text = app.transcripts.get(reference['id']).text
+    user_text = ' '.join(text.split()[:12]) + ' wrongword'
+    by_id = client.post('/api/dictation/compare', json={'user_text': user_text, 'transcript_id': reference['id']})
+    by_text = client.post('/api/dictation/compare', json={'user_text': user_text, 'reference_text': text})
+    assert by_id.status_code == 200
+    assert by_id.get_json() == by_text.get_json()
+    assert by_id.get_json()['total_words_reference'] == reference['word_count']
+
+
+def test_compare_unknown_transcript_id(client):
+    response = client.post('/api/dictation/compare', json={'user_text': 'hello', 'transcript_id': 'No Book/9/9'})
+    assert response.status_code == 404
+    assert 'No Book/9/9' in response.get_json()['error']
+
+
+def test_pdf_analysis_is_cached_by_content(client, monkeypatch, tmp_path):
+    pytest.importorskip('pypdf')
+    import app
+    from pdf_analysis import PdfAnalysisCache
+    from tests.test_pdf_analysis import text_pdf
+    monkeypatch.setattr(app, 'pdf_cache', PdfAnalysisCache(str(tmp_path)))
+    upload = text_pdf('Renewable energy and solar energy')
+
+    def analyze(filename):
+        return client.post('/api/analyze/pdf', data={'file': (io.BytesIO(upload), filename)}).get_json()
+
+    first, second = analyze('energy.pdf'), analyze('renamed.pdf')
+    assert first['cached'] is False and second['cached'] is True
+    assert second['filename'] == 'renamed.pdf'
+    assert second['frequencies'] == first['frequencies']
+    assert first['frequencies'][0]['word'] == 'energy'
+    assert app.pdf_cache.stats()['hits'] == 1
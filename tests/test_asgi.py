@@ -0,0 +1,91 @@
+import time
+import uuid
+
+import pytest
+
+from jobs import FINISHED
+from tests.conftest import sse_events
+
+STREAM = {'Accept': 'text/event-stream'}
+
+
+def finished_job(client, response):
+    assert response.status_code == 202
+    url = response.json()['status_url']
+    for _ in range(200):
+        job = client.get(url).json()
+        if job['status'] in FINISHED:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'job did not finish: {job}')
+
+
+def article():
+    # Unique content, so the question cache never answers instead of the backend
+    return {'content': f'Solar power is growing quickly. {uuid.uuid4()}', 'title': 'Energy'}
+
+
+def test_generate_questions_blocking_stream_and_async(asgi_client):
+    response = asgi_client.post('/api/generate/questions', json=article())
+    assert response.status_code == 200
+    assert len(response.json()['questions']) == 4
+
+    with asgi_client.stream('POST', '/api/generate/questions', json=article(), headers=STREAM) as response:
+        events = list(sse_events(response.iter_lines()))
+    assert [event for event, _ in events].count('question') == 4
+    assert events[-1][0] == 'done'
+
+    job = finished_job(asgi_client, asgi_client.post('/api/generate/questions?async=1', json=article()))
+    assert job['status'] == 'done'
+    assert len(job['result']['questions']) == 4
+
+
+def test_generate_questions_rejects_non_strings(asgi_client):
+    assert asgi_client.post('/api/generate/questions', json={'content': 5}).status_code == 400
+
+
+def test_evaluate_answer_blocking_and_async(asgi_client):
+    body = {'question': 'Q?', 'user_answer': 'A', 'correct_answer': 'A', 'context': 'text'}
+    response = asgi_client.post('/api/evaluate/answer', json=body)
+    assert response.status_code == 200
+    assert response.json()['is_correct'] is True
+
+    job = finished_job(asgi_client, asgi_client.post('/api/evaluate/answer?async=1', json=body))
+    assert job['result']['is_correct'] is True
+
+
+def test_evaluate_speaking_blocking_stream_and_async(asgi_client):
+    form = {'transcript': 'I would like to talk about my hometown.'}
+    response = asgi_client.post('/api/evaluate/speaking', data=form)
+    assert response.status_code == 200
+    assert response.json()['score'] == 6.5
+
+    with asgi_client.stream('POST', '/api/evaluate/speaking', data=form, headers=STREAM) as response:
+        events = list(sse_events(response.iter_lines()))
+    assert events[-1] == ('done', {'score': 6.5, 'feedback': 'Sample feedback.'})
+
+    job = finished_job(asgi_client, asgi_client.post('/api/evaluate/speaking?async=1', data=form))
+    assert job['result']['score'] == 6.5
+
+
+@pytest.mark.parametrize('body', [{'keywords': ['energy'], 'text': 5}, {'keywords': 'energy', 'text': 'power'}])
+def test_keyword_matches_validates_types(asgi_client, body):
+    response = asgi_client.post('/api/keywords/matches', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.json()
+
+
+def test_flask_routes_fall_through(asgi_client):
+    response = asgi_client.get('/api/lessons?fields=book&limit=1')
+    assert response.status_code == 200
+    assert len(response.json()['lessons']) == 1
+
+
+def test_cors_preflight(asgi_client):
+    response = asgi_client.options('/api/generate/questions', headers={
+        'Origin': 'https://example.com',
+        'Access-Control-Request-Method': 'POST',
+        'Access-Control-Request-Headers': 'content-type',
+    })
+    assert response.status_code == 200
+    assert response.headers['access-control-allow-origin'] in ('*', 'https://example.com')
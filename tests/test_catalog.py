@@ -0,0 +1,73 @@
+import os
+import json
+
+import pytest
+
+from catalog import MaterialCatalog
+
+
+@pytest.fixture
+def tree(tmp_path):
+    book = tmp_path / 'Cambridge IELTS 07'
+    (book / 'Audio').mkdir(parents=True)
+    (book / 'Cambridge IELTS 7.pdf').write_bytes(b'%PDF')
+    (book / 'Audio' / 'Test 1_Section 2.mp3').write_bytes(b'ID3')
+    return tmp_path
+
+
+def test_scan_finds_materials(tree):
+    catalog = MaterialCatalog(str(tree))
+    assert [p['name'] for p in catalog.get_pdf_files()] == ['Cambridge IELTS 7.pdf']
+    track = catalog.get_audio_files()[0]
+    assert (track['book'], track['test'], track['section']) == ('Cambridge IELTS 07', '1', '2')
+    assert catalog.resolve('audio', track['path'].replace(os.sep, '/')) == os.path.join(str(tree), track['path'])
+
+
+def test_directory_symlink_loop_is_not_followed(tree):
+    os.symlink(str(tree), str(tree / 'Cambridge IELTS 07' / 'loop'))
+    catalog = MaterialCatalog(str(tree))
+    assert len(catalog.get_pdf_files()) == 1
+    assert len(catalog.get_audio_files()) == 1
+
+
+def test_refresh_picks_up_new_files(tree, capsys):
+    catalog = MaterialCatalog(str(tree), refresh_interval=0)
+    capsys.readouterr()
+    (tree / 'Cambridge IELTS 07' / 'Audio' / 'Test 2_Section 1.mp3').write_bytes(b'ID3')
+    os.utime(tree / 'Cambridge IELTS 07' / 'Audio', ns=(0, 1))
+    assert catalog.refresh(force=True)
+    assert len(catalog.get_audio_files()) == 2
+    # Totals are printed at startup, not on every refresh
+    assert capsys.readouterr().out == ''
+
+
+def test_persisted_index_reloads_without_walking_the_tree(tree, tmp_path_factory, monkeypatch):
+    index_path = str(tmp_path_factory.mktemp('data') / 'catalog_index.json')
+    first = MaterialCatalog(str(tree), index_path=index_path)
+
+    def walk(self, rel_dir):
+        raise AssertionError(f'walked {rel_dir!r}')
+
+    monkeypatch.setattr(MaterialCatalog, '_scan_tree', walk)
+    reloaded = MaterialCatalog(str(tree), index_path=index_path)
+    assert reloaded.get_pdf_files() == first.get_pdf_files()
+    assert reloaded.get_audio_files() == first.get_audio_files()
+    assert reloaded.payload('audio') == first.payload('audio')
+
+
+def test_persisted_index_sees_changes_made_while_down(tree, tmp_path_factory):
+    index_path = str(tmp_path_factory.mktemp('data') / 'catalog_index.json')
+    MaterialCatalog(str(tree), index_path=index_path)
+    (tree / 'Cambridge IELTS 07' / 'Audio' / 'Test 2_Section 1.mp3').write_bytes(b'ID3')
+    os.utime(tree / 'Cambridge IELTS 07' / 'Audio', ns=(0, 1))
+    assert len(MaterialCatalog(str(tree), index_path=index_path).get_audio_files()) == 2
+    # The refreshed directory was written back
+    assert len(MaterialCatalog(str(tree), index_path=index_path).get_audio_files()) == 2
+
+
+def test_unreadable_index_falls_back_to_a_scan(tree, tmp_path_factory):
+    index_path = tmp_path_factory.mktemp('data') / 'catalog_index.json'
+    index_path.write_text('{"version": ')
+    catalog = MaterialCatalog(str(tree), index_path=str(index_path))
+    assert len(catalog.get_audio_files()) == 1
+    assert '' in json.loads(index_path.read_text())['dirs']  # rewritten by the scan
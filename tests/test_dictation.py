@@ -0,0 +1,99 @@
+import time
+import threading
+
+from alignment import get_opcodes
+from dictation import DictationSession, DictationSessions
+
+REFERENCE = 'the quick brown fox jumps over the lazy dog and runs far away from the old farm'
+
+
+def categorize(user, reference):
+    return 'spelling'
+
+
+def session():
+    return DictationSession.from_text(REFERENCE, categorize)
+
+
+def test_incremental_errors_match_a_full_alignment():
+    typed = 'the quikc brown fox jumps over the lazzy dog and runs far away from the old farm'.split()
+    live = session()
+    for start in range(0, len(typed), 3):
+        update = live.append(' '.join(typed[start:start + 3]))
+    full = [(tag, i1, i2) for tag, i1, i2, j1, j2 in get_opcodes(typed, REFERENCE.split()) if tag != 'equal']
+    assert [(e['position'], e['user_word']) for e in live.errors()] == [(i1, ' '.join(typed[i1:i2])) for _, i1, i2 in full]
+    assert update['accuracy'] == round((len(typed) - 2) / len(typed) * 100, 2)
+
+
+def test_committed_errors_are_only_sent_once():
+    live = session()
+    sent = []
+    for chunk in ('the quikc brown fox', 'jumps over the', 'lazzy dog and runs', 'far away'):
+        update = live.append(chunk)
+        assert update['reset'] is False
+        sent.extend(update['committed_errors'])
+    assert [e['user_word'] for e in sent] == ['quikc', 'lazzy']
+
+
+def test_retraction_into_frozen_prefix_resets():
+    live = session()
+    live.append('the quikc brown fox jumps over the')
+    assert live.frozen_errors
+    update = live.append('quick brown fox', retract=6)
+    assert update['reset'] is True
+    assert update['committed_errors'] == [] and live.epoch == 1
+    # Retractions inside the unfrozen tail keep committed errors final
+    assert live.append('jumps ovr', retract=0)['reset'] is False
+    assert live.append('over', retract=1)['reset'] is False
+
+
+def test_since_catches_up_on_skipped_updates():
+    live = session()
+    live.append('the quikc brown fox')
+    live.append('jumps over the lazzy dog and runs')
+    update, epoch, committed = live.since(None, 0)
+    assert [e['user_word'] for e in update['committed_errors']] == ['quikc', 'lazzy']
+    assert update['reset'] is False and committed == 2
+
+    live.append('the quick', retract=9)
+    update, new_epoch, committed = live.since(epoch, committed)
+    assert update['reset'] is True and new_epoch == epoch + 1
+    assert update['committed_errors'] == live.frozen_errors
+
+
+def test_eviction_wakes_waiters():
+    sessions = DictationSessions(ttl=60, max_sessions=1)
+    first = sessions.add(session())
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(first.wait(first.version, timeout=10)))
+    waiter.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    sessions.add(session())
+    waiter.join()
+    assert results == [None] and first.closed
+    assert time.monotonic() - started < 1
+
+
+def test_idle_sessions_expire():
+    sessions = DictationSessions(ttl=0.01)
+    live = sessions.add(session())
+    time.sleep(0.02)
+    assert sessions.get(live.id) is None
+    assert live.closed
+
+
+def test_long_replacements_are_categorized_word_by_word():
+    seen = []
+
+    def counting(user, reference):
+        seen.append((user, reference))
+        return 'vocabulary'
+
+    live = DictationSession.from_text(REFERENCE, counting)
+    for _ in range(4):
+        live.append('zz yy xx ww vv')
+    assert all(' ' not in user and ' ' not in reference for user, reference in seen)
+    # The tail is re-scored on every append, but each pair is categorized once
+    assert len(seen) == len(set(seen))
+    assert [e['user_word'] for e in live.errors()][:3] == ['zz', 'yy', 'xx']
@@ -0,0 +1,57 @@
+import os
+import time
+
+from disk_cache import DiskCache
+
+
+def test_round_trip_and_version(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.put('a', {'x': 1})
+    assert cache.get('a') == {'x': 1}
+    assert DiskCache(str(tmp_path), version=2).get('a') is None
+    assert cache.stats()['hits'] == 1
+
+
+def test_ttl_expires_entries(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=0.01)
+    cache.put('a', {'x': 1})
+    time.sleep(0.02)
+    assert cache.get('a') is None
+    assert not os.path.exists(tmp_path / 'a.json')
+
+
+def test_sees_entries_written_by_another_instance(tmp_path):
+    # Two instances on one directory stand in for two worker processes
+    first, second = DiskCache(str(tmp_path)), DiskCache(str(tmp_path))
+    second.put('shared', {'x': 2})
+    assert first.get('shared') == {'x': 2}
+    assert first.stats()['size'] == 1
+
+
+def test_eviction_counts_files_of_other_instances(tmp_path):
+    first = DiskCache(str(tmp_path), max_bytes=300)
+    second = DiskCache(str(tmp_path), max_bytes=300)
+    first.put('old', {'x': 'a' * 50})
+    time.sleep(0.01)
+    for index in range(6):
+        second.put(f'new{index}', {'x': 'b' * 50})
+        time.sleep(0.01)
+    on_disk = sum(entry.stat().st_size for entry in os.scandir(tmp_path))
+    assert on_disk <= 300
+    assert not os.path.exists(tmp_path / 'old.json')
+    # The entry evicted by the other instance is a miss, not an error
+    assert first.get('old') is None
+    assert first.stats()['bytes'] == 0
+
+
+def test_lru_keeps_recently_read_entries(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=250)
+    cache.put('a', {'x': 'a' * 50})
+    time.sleep(0.01)
+    cache.put('b', {'x': 'b' * 50})
+    time.sleep(0.01)
+    assert cache.get('a') is not None
+    time.sleep(0.01)
+    cache.put('c', {'x': 'c' * 50})
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
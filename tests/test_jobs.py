@@ -0,0 +1,93 @@
+import os
+import time
+import sqlite3
+import threading
+
+from jobs import JobQueue, FINISHED
+
+
+def finished(jobs, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = jobs.get(job_id)
+        if job['status'] in FINISHED or time.monotonic() > deadline:
+            return job
+        time.sleep(0.01)
+
+
+def test_job_result_is_stored(tmp_path):
+    jobs = JobQueue(str(tmp_path / 'jobs.sqlite3'), workers=2)
+    job = finished(jobs, jobs.submit('add', lambda a, b: ({'sum': a + b}, 200), 2, 3))
+    assert (job['status'], job['http_status'], job['result']) == ('done', 200, {'sum': 5})
+    assert jobs.stats() == {'done': 1}
+
+
+def test_failing_job_is_recorded(tmp_path):
+    jobs = JobQueue(str(tmp_path / 'jobs.sqlite3'), workers=1)
+
+    def fail():
+        raise RuntimeError('boom')
+
+    job = finished(jobs, jobs.submit('fail', fail))
+    assert (job['status'], job['http_status'], job['error']) == ('failed', 500, 'boom')
+
+
+def test_jobs_are_shared_between_instances(tmp_path):
+    # A second queue on the same file stands in for another worker process
+    path = str(tmp_path / 'jobs.sqlite3')
+    owner = JobQueue(path, workers=1)
+    reader = JobQueue(path, workers=1)
+    job_id = owner.submit('add', lambda: ({'ok': True}, 200))
+    assert finished(reader, job_id)['result'] == {'ok': True}
+    assert reader.get('missing') is None
+
+
+def insert_running(path, instance):
+    with sqlite3.connect(path) as db:
+        db.execute("INSERT INTO jobs (id, kind, status, owner, instance, created_at) "
+                   "VALUES ('x', 'k', 'running', ?, ?, ?)", (os.getpid(), instance, time.time()))
+
+
+def test_running_jobs_of_live_instances_are_kept(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    insert_running(path, JobQueue(path, workers=1).instance)
+    assert JobQueue(path, workers=1).get('x')['status'] == 'running'
+
+
+def test_orphaned_jobs_fail_on_startup(tmp_path):
+    # The owner's PID is alive (it is ours, as after a restart as PID 1) but its instance never registered
+    path = str(tmp_path / 'jobs.sqlite3')
+    JobQueue(path, workers=1)
+    insert_running(path, 'gone')
+    job = JobQueue(path, workers=1).get('x')
+    assert (job['status'], job['error']) == ('failed', 'Interrupted by a restart')
+
+
+def test_jobs_fail_when_their_instance_stops_heartbeating(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    owner = JobQueue(path, workers=1, lease=0.1)
+    reader = JobQueue(path, workers=1, lease=0.1)
+    release = threading.Event()
+
+    def wait():
+        release.wait()
+        return {}, 200
+
+    job_id = owner.submit('wait', wait)
+    time.sleep(0.3)
+    assert reader.get(job_id)['status'] == 'running'  # kept alive by the owner's heartbeat
+    release.set()
+    assert finished(reader, job_id)['status'] == 'done'
+
+    insert_running(path, reader.instance)
+    time.sleep(0.2)  # the reader never submitted, so nothing renews its lease
+    assert owner.get('x')['status'] == 'failed'
+
+
+def test_purge_drops_expired_jobs(tmp_path):
+    jobs = JobQueue(str(tmp_path / 'jobs.sqlite3'), workers=1, retention=0.0)
+    job_id = jobs.submit('noop', lambda: ({}, 200))
+    assert finished(jobs, job_id)['status'] == 'done'
+    time.sleep(0.01)
+    jobs.purge()
+    assert jobs.get(job_id) is None
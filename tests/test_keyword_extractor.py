@@ -0,0 +1,140 @@
+import re
+import random
+import threading
+
+from keyword_extractor import IELTSKeywordExtractor, KeywordAutomaton, KeywordCache
+
+
+def old_get_synonyms(extractor, word):
+    """_get_synonyms() as it was before the synonym graph: a scan of the whole database"""
+    synonyms = []
+    base_word = extractor._get_synonym_key(word)
+    if base_word in extractor.synonym_db:
+        synonyms.extend(extractor.synonym_db[base_word])
+    for key, synonym_set in extractor.synonym_db.items():
+        if (word in synonym_set or base_word in synonym_set) and key not in synonyms:
+            synonyms.append(key)
+    return list(set(synonyms))
+
+
+def test_synonym_graph_matches_database_scan():
+    extractor = IELTSKeywordExtractor(tagger='builtin')
+    words = set(extractor.synonym_db)
+    for synonym_set in extractor.synonym_db.values():
+        words.update(synonym_set)
+    # Inflected and unknown forms go through the stemming fallback
+    words.update({'increasing', 'increased', 'researches', 'impacts', 'results', 'unknown', 'rises', ''})
+    for word in sorted(words):
+        synonyms = extractor._get_synonyms(word)
+        assert len(synonyms) == len(set(synonyms)), word
+        assert set(synonyms) == set(old_get_synonyms(extractor, word)), word
+
+
+def regex_find_all(patterns, text):
+    """Reference matcher: one word-bounded regex per pattern, overlapping hits included"""
+    hits = {}
+    for pattern in patterns:
+        tokens = re.findall(r'\w+', pattern.lower())
+        regex = re.compile(r'(?<!\w)' + r'[\s\-]+'.join(map(re.escape, tokens)) + r'(?!\w)')
+        spans, position = [], 0
+        while True:
+            match = regex.search(text, position)
+            if match is None:
+                break
+            spans.append(match.span())
+            position = match.start() + 1
+        hits[pattern] = spans
+    return hits
+
+
+def test_automaton_matches_regex_search():
+    rng = random.Random(5)
+    vocabulary = ['rise', 'surprise', 'energy', 'power', 'electric', 'the', 'a', 'greater', 'part']
+    separators = [' ', ' ', '  ', '-', ', ', '. ', '\n']
+    patterns = ['rise', 'power', 'electric power', 'greater part', 'the greater part', 'part', 'a a']
+    automaton = KeywordAutomaton(patterns)
+    for _ in range(300):
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(0, 30))]
+        text = ''.join(word + rng.choice(separators) for word in words)
+        assert automaton.find_all(text) == regex_find_all(patterns, text), text
+
+
+def test_automaton_respects_word_boundaries():
+    hits = KeywordAutomaton(['rise', 'electric power']).find_all('a surprise rise. electric. power, electric-power')
+    assert hits == {'rise': [(11, 15)], 'electric power': [(34, 48)]}
+
+
+def test_find_matches_in_text_reports_synonyms():
+    extractor = IELTSKeywordExtractor(tagger='builtin')
+    text = 'Most of the power was produced by the greater part of the plants.'
+    matches = extractor.find_matches_in_text(['majority', 'energy'], text)
+    assert {m['word'] for m in matches['majority']} == {'most', 'greater part'}
+    assert {(m['type'], m['word']) for m in matches['energy']} == {('synonym', 'power')}
+    assert all(m['original_keyword'] == 'majority' for m in matches['majority'])
+
+
+def test_keyword_cache_hits_and_evicts_least_recently_used():
+    cache = KeywordCache(maxsize=2)
+    cache.put('a', {'n': 1})
+    cache.put('b', {'n': 2})
+    assert cache.get('a') == {'n': 1}  # 'b' is now the least recently used
+    cache.put('c', {'n': 3})
+    assert cache.get('b') is None
+    assert cache.get('c') == {'n': 3}
+    assert cache.stats() == {'size': 2, 'maxsize': 2, 'hits': 2, 'misses': 1, 'evictions': 1, 'hit_rate': 66.67}
+
+
+def test_keyword_cache_is_thread_safe():
+    cache = KeywordCache(maxsize=64)
+
+    def work(offset):
+        for i in range(2000):
+            key = str((offset + i) % 100)
+            if cache.get(key) is None:
+                cache.put(key, {'key': key})
+
+    threads = [threading.Thread(target=work, args=(offset,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert stats['size'] == 64
+    assert stats['hits'] + stats['misses'] == 8 * 2000
+    assert stats['misses'] - stats['evictions'] == 64
+
+
+def test_extract_keywords_is_served_from_the_cache():
+    extractor = IELTSKeywordExtractor(tagger='builtin')
+    first = extractor.extract_keywords('Why did the population of the city increase?')
+    first['keywords'].append('changed by the caller')
+    again = extractor.extract_keywords('Why did the population of the city  increase')
+    assert 'changed by the caller' not in again['keywords']
+    assert extractor.keyword_cache.stats()['hits'] == 1
+
+
+def test_nltk_is_loaded_on_first_use_not_on_construction():
+    extractor = IELTSKeywordExtractor(tagger='nltk', offline=True)
+    assert extractor.status() == {'ready': False, 'offline': True, 'tagger': 'loading'}
+    assert extractor.extract_keywords('Where was the first bridge built?')['keywords']
+    # Without NLTK or its data installed the built-in tagger takes over
+    assert extractor.status()['ready'] is True
+    assert extractor.status()['tagger'] in ('nltk', 'builtin')
+
+
+class CountingEvent(threading.Event):
+    sets = 0
+
+    def set(self):
+        self.sets += 1
+        super().set()
+
+
+def test_warm_up_loads_once_in_the_background():
+    extractor = IELTSKeywordExtractor(tagger='nltk', offline=True)
+    extractor.ready = CountingEvent()
+    threads = [extractor.warm_up() for _ in range(4)]
+    for thread in threads:
+        thread.join()
+    assert extractor.ready.sets == 1
+    assert extractor.status()['tagger'] == ('nltk' if extractor._pos_tag_sents else 'builtin')
@@ -0,0 +1,89 @@
+import os
+import json
+
+import pytest
+
+from lesson_index import LessonIndex
+from payloads import JsonFilePayload
+
+BOOKS = [
+    {'book': 'Cambridge IELTS 1', 'tests': [
+        {'test_number': 1, 'reading': [{'title': 'Fire', 'content': 'long text'}], 'writing': 'essay'},
+        {'test_number': 2, 'reading': [{'title': 'Water', 'content': 'more text'}], 'writing': 'letter'},
+    ]},
+    {'book': 'Cambridge IELTS 2', 'tests': [{'test_number': 1, 'reading': [{'title': 'Air', 'content': 'x'}]}]},
+    {'book': 'Cambridge IELTS 3', 'tests': []},
+]
+
+
+def write(path, books, mtime):
+    path.write_text(json.dumps(books))
+    os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def lessons_file(tmp_path):
+    path = tmp_path / 'lessons.json'
+    write(path, BOOKS, 1_000_000_000)
+    return path
+
+
+@pytest.fixture
+def index(lessons_file):
+    return LessonIndex(JsonFilePayload(str(lessons_file), refresh_interval=0))
+
+
+def value(prepared):
+    return json.loads(prepared.body)
+
+
+def test_projection(index):
+    tree = index.parse_fields('book,reading.title')
+    assert value(index.lessons(tree))[0] == {'book': 'Cambridge IELTS 1', 'tests': [
+        {'reading': [{'title': 'Fire'}]}, {'reading': [{'title': 'Water'}]}]}
+    with pytest.raises(ValueError):
+        index.parse_fields('book,nonsense')
+
+
+def test_single_test_and_test_scope(index):
+    assert value(index.test('cambridge-ielts-1', 2))['writing'] == 'letter'
+    assert index.test('cambridge-ielts-1', 9) is None
+    tree = index.parse_fields('reading.title', scope='test')
+    assert value(index.test('Cambridge IELTS 1', 1, tree)) == {'reading': [{'title': 'Fire'}]}
+    with pytest.raises(ValueError):
+        index.parse_fields('book', scope='test')
+
+
+def test_cursor_round_trip(index):
+    seen, cursor = [], None
+    while True:
+        page = value(index.lessons(index.parse_fields('book'), cursor=cursor, limit=2))
+        seen.extend(book['book'] for book in page['lessons'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == [book['book'] for book in BOOKS]
+    with pytest.raises(ValueError):
+        index.lessons(cursor='bm90LWpzb24')
+
+
+def test_swap_between_requests(index, lessons_file):
+    tree = index.parse_fields('book')
+    assert value(index.book('cambridge-ielts-2', tree)) == {'book': 'Cambridge IELTS 2'}
+    write(lessons_file, [dict(BOOKS[1], book='Cambridge IELTS 2 (revised)')], 2_000_000_000)
+    assert index.book('cambridge-ielts-2', tree) is None
+    assert value(index.book('cambridge-ielts-2-revised', tree)) == {'book': 'Cambridge IELTS 2 (revised)'}
+
+
+def test_result_built_during_a_swap_is_not_cached(index, lessons_file):
+    state = index._current()
+
+    def build():
+        # The file changes while this (old-version) result is being built
+        write(lessons_file, [dict(BOOKS[0], book='Renamed')], 2_000_000_000)
+        index._current()
+        return {'old': True}
+
+    assert value(index._prepared(state, ('book', 0, 'null'), build)) == {'old': True}
+    assert value(index.book('renamed'))['book'] == 'Renamed'
+    assert all(key[0] == index._state.generation for key in index._cache)
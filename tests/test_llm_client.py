@@ -0,0 +1,111 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+import llm_client
+from llm_client import GeminiClient, FakeBackend, LLMError, LLMTimeout
+
+
+class ScriptedBackend:
+    """Raises the queued errors in turn, then answers 'ok'; tracks concurrency and streams"""
+
+    def __init__(self, errors=(), latency=0.0):
+        self.errors = list(errors)
+        self.latency = latency
+        self.active = self.peak = 0
+        self.stream_closed = threading.Event()
+        self.chunks_sent = 0
+
+    async def generate(self, contents):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.errors:
+                raise self.errors.pop(0)
+            return 'ok'
+        finally:
+            self.active -= 1
+
+    async def generate_stream(self, contents):
+        try:
+            while True:
+                await asyncio.sleep(0.005)
+                self.chunks_sent += 1
+                yield f'chunk{self.chunks_sent} '
+        finally:
+            self.stream_closed.set()
+
+
+def unavailable():
+    error = LLMError('unavailable')
+    error.code = 503
+    return error
+
+
+def test_deadline_raises_llm_timeout():
+    client = GeminiClient(FakeBackend(latency=1.0, jitter=0.0), timeout=0.05)
+    start = time.monotonic()
+    with pytest.raises(LLMTimeout):
+        client.generate_sync('prompt')
+    assert time.monotonic() - start < 0.5
+    assert client.timeouts == 1
+
+
+def test_backend_timeout_error_is_retried():
+    backend = ScriptedBackend([TimeoutError('socket timed out')])
+    client = GeminiClient(backend, timeout=5.0, backoff=0.001)
+    assert client.generate_sync('prompt') == 'ok'
+    assert (client.retried, client.timeouts) == (1, 0)
+
+
+def test_non_retryable_errors_are_raised_at_once():
+    backend = ScriptedBackend([ValueError('bad request'), ValueError('unused')])
+    client = GeminiClient(backend, backoff=0.001)
+    with pytest.raises(ValueError):
+        client.generate_sync('prompt')
+    assert (client.retried, client.failures) == (0, 1)
+
+
+def test_retry_backoff_has_full_jitter_within_bounds(monkeypatch):
+    bounds = []
+    uniform = llm_client.random.uniform
+
+    def recording_uniform(low, high):
+        bounds.append((low, high))
+        return uniform(low, high)
+
+    monkeypatch.setattr(llm_client.random, 'uniform', recording_uniform)
+    backend = ScriptedBackend([unavailable() for _ in range(4)])
+    client = GeminiClient(backend, retries=3, backoff=0.001, max_backoff=0.003)
+    with pytest.raises(LLMError):
+        client.generate_sync('prompt')
+    assert bounds == [(0, 0.002), (0, 0.003), (0, 0.003)]
+    assert client.retried == 3
+
+
+def test_semaphore_caps_concurrent_calls():
+    backend = ScriptedBackend(latency=0.02)
+    client = GeminiClient(backend, max_concurrency=2)
+    threads = [threading.Thread(target=client.generate_sync, args=('prompt',)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backend.peak == 2
+    assert client.in_flight == 0
+
+
+def test_closing_stream_sync_stops_the_backend():
+    backend = ScriptedBackend()
+    client = GeminiClient(backend)
+    stream = client.stream_sync('prompt')
+    assert next(stream) == 'chunk1 '
+    stream.close()
+    assert backend.stream_closed.wait(1.0)
+    sent = backend.chunks_sent
+    time.sleep(0.05)
+    assert backend.chunks_sent == sent
+    assert client.in_flight == 0
@@ -0,0 +1,70 @@
+import json
+
+from llm_json import JsonObjectScanner, PartialObjectStream, extract_json, iter_partial
+
+SCHEMA = {'score': int, 'feedback': str}
+
+
+def feed_all(text, schema=SCHEMA, size=3):
+    scanner = JsonObjectScanner(schema)
+    for i in range(0, len(text), size):
+        scanner.feed(text[i:i + size])
+    return scanner
+
+
+def test_finds_object_after_prose():
+    text = 'Sure! Here is the {result}: {"score": 7, "feedback": "a {b} \\"c\\""} thanks'
+    assert feed_all(text).result == {'score': 7, 'feedback': 'a {b} "c"'}
+
+
+def test_matches_extract_json_on_complete_text():
+    texts = [
+        '{"score": 1, "feedback": "x"}',
+        'a } b { "score": 2 } {"score": 3, "feedback": "y"}',
+        '[{"score": 4}] {"feedback": "z", "score": 5}',
+    ]
+    for text in texts:
+        for size in (1, 4, len(text)):
+            assert feed_all(text, size=size).close() == extract_json(text, SCHEMA)
+
+
+def test_unclosed_brace_in_prefix_recovers_at_close():
+    # The scanner commits to the first '{', which never balances
+    text = 'prefix {{{ {"score": 5, "feedback": "z"}'
+    scanner = feed_all(text)
+    assert scanner.result is None
+    assert scanner.close() == {'score': 5, 'feedback': 'z'}
+
+    stream = PartialObjectStream(SCHEMA)
+    stream.feed(text)
+    assert stream.close() == {'score': 5, 'feedback': 'z'}
+    assert list(iter_partial([text], SCHEMA))[-1] == ({'score': 5, 'feedback': 'z'}, True)
+
+
+def test_close_without_object():
+    assert feed_all('no json here {').close() is None
+
+
+def test_partial_grows_with_completed_fields():
+    value = {'score': 6, 'feedback': 'good', 'errors': [{'word': 'a'}, {'word': 'b'}]}
+    text = json.dumps(value)
+    seen = [partial for partial, done in iter_partial(text, max_depth=1) if not done]
+    assert seen[:2] == [{'score': 6}, {'score': 6, 'feedback': 'good'}]
+    assert list(iter_partial(text))[-1] == (value, True)
+
+
+def test_partial_is_cached_until_cut_point_moves():
+    scanner = JsonObjectScanner()
+    scanner.feed('{"a": 1, "b": "long')
+    first = scanner.partial()
+    scanner.feed(' string still open')
+    assert scanner.partial() is first == {'a': 1}
+
+
+def test_question_stream_finish_recovers_after_stray_brace():
+    from question_bank import QuestionStream
+
+    question = {'question': 'Q?', 'options': ['a', 'b', 'c', 'd'], 'answer': 'a'}
+    parser = QuestionStream()
+    assert parser.feed('Here {{ ' + json.dumps({'questions': [question]})) == ([], False)
+    assert parser.finish() == ('done', {'questions': [question]})
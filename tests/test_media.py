@@ -0,0 +1,87 @@
+import os
+import hashlib
+
+import pytest
+
+from media import FileDigests, open_range
+
+
+@pytest.fixture
+def media_file(tmp_path):
+    path = tmp_path / 'track.mp3'
+    path.write_bytes(bytes(range(256)) * 2000)
+    return str(path)
+
+
+def test_digest_is_remembered_and_persisted(tmp_path, media_file):
+    index_path = str(tmp_path / 'digests.json')
+    digests = FileDigests(index_path)
+    stat = os.stat(media_file)
+    with open(media_file, 'rb') as f:
+        expected = hashlib.sha256(f.read()).hexdigest()[:32]
+    assert digests.get(media_file, stat) == expected
+    assert FileDigests(index_path)._digests[media_file] == (stat.st_mtime_ns, stat.st_size, expected)
+
+
+def test_digest_changes_with_the_file(media_file):
+    digests = FileDigests()
+    before = digests.get(media_file, os.stat(media_file))
+    with open(media_file, 'ab') as f:
+        f.write(b'more')
+    assert digests.get(media_file, os.stat(media_file)) != before
+
+
+def test_open_range_streams_exact_bytes(media_file):
+    with open(media_file, 'rb') as f:
+        data = f.read()
+    for start, length in ((0, len(data)), (10, 1), (300000, 200000), (len(data) - 5, 5)):
+        assert b''.join(open_range(media_file, start, length)) == data[start:start + length]
+
+
+@pytest.fixture(scope='module')
+def audio(client):
+    tracks = client.get('/api/audio').get_json()
+    if not tracks:
+        pytest.skip('no cataloged audio files')
+    url = '/audio/' + tracks[0]['path'].replace('\\', '/')
+    import app
+    with open(app.catalog.resolve('audio', tracks[0]['path'].replace('\\', '/')), 'rb') as f:
+        return url, f.read()
+
+
+def test_full_body_matches_file(client, audio):
+    url, data = audio
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.get_data() == data
+
+
+def test_single_ranges(client, audio):
+    url, data = audio
+    size = len(data)
+    for header, start, stop in (('bytes=0-99', 0, 100), ('bytes=100-', 100, size), ('bytes=-50', size - 50, size)):
+        response = client.get(url, headers={'Range': header})
+        assert response.status_code == 206
+        assert response.headers['Content-Range'] == f'bytes {start}-{stop - 1}/{size}'
+        assert response.get_data() == data[start:stop]
+
+
+def test_unsatisfiable_range(client, audio):
+    url, data = audio
+    response = client.get(url, headers={'Range': f'bytes={len(data)}-'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(data)}'
+
+
+def test_etag_revalidation_and_if_range(client, audio):
+    url, data = audio
+    etag = client.get(url, headers={'Range': 'bytes=0-0'}).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    current = client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': etag})
+    assert current.status_code == 206
+    stale = client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': '"stale"'})
+    assert stale.status_code == 200
+    assert stale.get_data() == data
+
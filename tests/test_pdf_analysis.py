@@ -0,0 +1,81 @@
+import gc
+import io
+import hashlib
+
+import pytest
+
+from pdf_analysis import PdfAnalysisCache, PdfWordCounter, spool_upload
+
+
+def live_readers():
+    """Runs in a pool worker: PdfReader objects it still holds"""
+    import pypdf
+    gc.collect()
+    return sum(isinstance(obj, pypdf.PdfReader) for obj in gc.get_objects())
+
+
+@pytest.fixture
+def blank_pdf(tmp_path):
+    pypdf = pytest.importorskip('pypdf')
+    writer = pypdf.PdfWriter()
+    for _ in range(20):
+        writer.add_blank_page(100, 100)
+    path = str(tmp_path / 'blank.pdf')
+    writer.write(path)
+    return path
+
+
+def test_pool_does_not_fork_the_calling_process(blank_pdf):
+    counter = PdfWordCounter({'the'}, workers=2, pages_per_task=4, parallel_min_pages=8)
+    try:
+        assert counter.count(blank_pdf) == ({}, 0)
+        assert counter._pool._mp_context.get_start_method() in ('forkserver', 'spawn')
+    finally:
+        counter.shutdown()
+
+
+def test_workers_do_not_keep_the_reader(blank_pdf):
+    counter = PdfWordCounter({'the'}, workers=2, pages_per_task=2, parallel_min_pages=8)
+    try:
+        counter.count(blank_pdf)
+        probes = [counter._pool.submit(live_readers) for _ in range(8)]
+        assert [probe.result() for probe in probes] == [0] * 8
+    finally:
+        counter.shutdown()
+
+
+def text_pdf(text):
+    """A one-page PDF showing text in Helvetica"""
+    stream = f'BT /F1 12 Tf 10 50 Td ({text}) Tj ET'.encode('latin-1')
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 300 100] '
+        b'/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream),
+    ]
+    pdf, offsets = b'%PDF-1.4\n', []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(pdf)
+    pdf += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    pdf += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    pdf += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return pdf
+
+
+def test_analysis_cache_is_keyed_by_content_and_versioned(tmp_path, monkeypatch):
+    import pdf_analysis
+    upload = text_pdf('Renewable energy')
+    digest = spool_upload(io.BytesIO(upload), str(tmp_path / 'upload.pdf'))
+    assert digest == hashlib.sha256(upload).hexdigest()
+    assert (tmp_path / 'upload.pdf').read_bytes() == upload
+
+    cache_dir = str(tmp_path / 'cache')
+    PdfAnalysisCache(cache_dir).put(digest, {'total_words': 2})
+    # A restarted process finds the analysis on disk
+    assert PdfAnalysisCache(cache_dir).get(digest) == {'total_words': 2}
+    monkeypatch.setattr(pdf_analysis, 'ANALYSIS_VERSION', pdf_analysis.ANALYSIS_VERSION + 1)
+    assert PdfAnalysisCache(cache_dir).get(digest) is None
@@ -0,0 +1,16 @@
+from pos_tagger import CompactTagger
+
+
+def test_punctuation_keeps_its_own_tag():
+    tagger = CompactTagger()
+    tagged = dict(tagger.tag(tagger.tokenize('Prices rose by 20, then fell; sales grew... Why?')))
+    assert tagged[','] == ','
+    assert tagged[';'] == ':'
+    assert tagged['.'] == '.'
+    assert tagged['?'] == '.'
+    assert tagged['20'] == 'CD'
+
+
+def test_numbers_need_a_digit():
+    tagger = CompactTagger()
+    assert [tag for _, tag in tagger.tag(['in', 'the', '1990s', ',', '2nd', '3.5'])] == ['IN', 'DT', 'CD', ',', 'CD', 'CD']
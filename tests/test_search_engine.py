@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from search_engine import IELTSProjectSearch
+
+SYNONYMS = {
+    'majority': ['largest part', 'most'],
+    'zzz': ['largest part'],
+    'automobile': ['cars'],
+}
+
+
+@pytest.fixture
+def search(tmp_path):
+    articles = [
+        {'title': 'Cities', 'url': 'u1', 'content': 'The largest part of the city was rebuilt after the fire.'},
+        {'title': 'Traffic', 'url': 'u2', 'content': 'Most people agree that cars pollute the city.'},
+    ]
+    (tmp_path / 'guardian_articles.json').write_text(json.dumps(articles))
+    return IELTSProjectSearch(data_dir=str(tmp_path), synonym_lookup=lambda term: SYNONYMS.get(term, []))
+
+
+def titles(results):
+    return [result['title'] for result in results]
+
+
+def test_bm25_and_phrases(search):
+    assert sorted(titles(search.search('city'))) == ['Cities', 'Traffic']
+    assert titles(search.search('city fire'))[0] == 'Cities'
+    assert titles(search.search('"cars pollute"')) == ['Traffic']
+    assert search.search('"pollute cars"') == []
+
+
+def test_synonyms_only_when_asked(search):
+    assert search.search('automobile') == []
+    assert titles(search.search('automobile', expand='synonyms')) == ['Traffic']
+
+
+def test_expansion_of_unindexed_words_does_not_grow_the_index(search):
+    sizes = (len(search.postings), len(search.idf), len(search.expansions))
+    for query in ('zzz', 'automobile', 'unknownword', 'majority'):
+        for _ in range(3):
+            search.search(query, expand='synonyms')
+    assert (len(search.postings), len(search.idf), len(search.expansions)) == sizes
+    assert titles(search.search('zzz', expand='synonyms')) == ['Cities']
+
+
+def test_multi_word_synonyms_are_highlighted(search):
+    results = search.search('majority', expand='synonyms')
+    snippets = {result['title']: result['snippet'] for result in results}
+    assert '<mark>largest</mark> <mark>part</mark>' in snippets['Cities']
+    assert '<mark>Most</mark>' in snippets['Traffic']
+    assert '<mark>part</mark>' not in search.search('city')[0]['snippet']
+
+
+def test_lazy_build(tmp_path):
+    (tmp_path / 'guardian_articles.json').write_text(json.dumps([{'title': 'T', 'url': 'u', 'content': 'solar power'}]))
+    search = IELTSProjectSearch(data_dir=str(tmp_path), build=False)
+    assert not search.ready.is_set()
+    assert titles(search.search('solar')) == ['T']
+    assert search.ready.is_set()
+
+
+def test_expansion_of_unindexed_words_is_memoized(search):
+    first = search.search('automobile', expand='synonyms')
+    assert search.search('automobile', expand='synonyms') == first
+    info = search._expand_unindexed.cache_info()
+    assert (info.misses, info.hits) == (1, 1)
@@ -0,0 +1,35 @@
+import json
+
+from transcripts import TranscriptStore, UNKNOWN_TOKEN
+
+
+def write(path, value):
+    path.write_text(json.dumps(value))
+
+
+def test_store_loads_lessons_and_books_once(tmp_path, capsys):
+    section = {'section_number': 1, 'transcript': 'Good  morning, Sarah.'}
+    write(tmp_path / 'lessons.json', [{'book': 'Book 1', 'tests': [{'test_number': 2, 'listening': [section]}]}])
+    write(tmp_path / 'book_1.json', {'book': 'Book 1', 'tests': [{'test_number': 2, 'listening': [
+        {'section_number': 1, 'transcript': 'A later copy of the same section'},
+        {'section_number': 2, 'transcript': 'Good evening.'},
+        {'section_number': 3, 'transcript': '  '}
+    ]}]})
+    write(tmp_path / 'book_2.json', ['not', 'a', 'book'])
+    store = TranscriptStore(str(tmp_path))
+
+    assert [t['id'] for t in store.list()] == ['Book 1/2/1', 'Book 1/2/2']
+    reference = store.find('Book 1', 2, 1)
+    assert reference is store.get('Book 1/2/1')
+    assert reference.words == ('good', 'morning,', 'sarah.')
+    # Words are shared across transcripts by token id
+    assert list(store.encode(['good', 'evening.', 'unheard'])) == [
+        reference.token_ids[0], store.get('Book 1/2/2').token_ids[1], UNKNOWN_TOKEN
+    ]
+    assert 'Transcripts: 2 references, 4 distinct words' in capsys.readouterr().out
+
+
+def test_missing_data_gives_an_empty_store(tmp_path):
+    store = TranscriptStore(str(tmp_path))
+    assert store.list() == []
+    assert store.get('Book 1/1/1') is None
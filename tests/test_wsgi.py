@@ -0,0 +1,32 @@
+from llm_client import GeminiBackend
+
+
+class CountingBackend(GeminiBackend):
+    loads = 0
+
+    def load(self):
+        self.loads += 1
+
+
+def test_create_app_finishes_warm_up_before_returning(client, monkeypatch):
+    import app
+    import wsgi
+    backend = CountingBackend()
+    monkeypatch.setattr(app, 'llm_backend', backend)
+
+    assert wsgi.create_app() is app.app
+    for thread in (app.keyword_warm_up, app.search_warm_up, app.payload_warm_up):
+        assert thread is None or not thread.is_alive()
+    assert app.keyword_extractor.ready.is_set()
+    assert app.search_engine.ready.is_set()
+    assert all(payload._prepared is not None for payload in app.data_payloads.values())
+    assert backend.loads == 1
+
+
+def test_create_app_without_warm_up_skips_the_backend(client, monkeypatch):
+    import app
+    import wsgi
+    backend = CountingBackend()
+    monkeypatch.setattr(app, 'llm_backend', backend)
+    assert wsgi.create_app(warm=False) is app.app
+    assert backend.loads == 0
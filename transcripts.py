@@ -0,0 +1,120 @@
+import os
+import re
+import json
+import glob
+from array import array
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Token id for words that never occur in any reference transcript
+UNKNOWN_TOKEN = -1
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for comparison"""
+    # Lowercase, remove extra whitespace, preserve sentence structure
+    text = WHITESPACE_RE.sub(' ', text)
+    return text.lower().strip()
+
+
+def transcript_key(book: str, test, section) -> str:
+    """Transcript ID in the form 'book/test/section', e.g. 'Cambridge IELTS 10/1/2'"""
+    return f"{book}/{test}/{section}"
+
+
+@dataclass(frozen=True)
+class ReferenceTranscript:
+    id: str
+    book: str
+    test: int
+    section: int
+    text: str
+    words: Tuple[str, ...]
+    token_ids: array
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'book': self.book,
+            'test': self.test,
+            'section': self.section,
+            'word_count': len(self.words)
+        }
+
+
+class TranscriptStore:
+    """
+    Listening transcripts from the lesson data, normalized and tokenized once.
+
+    Every distinct reference word gets a small integer id so dictation
+    alignment compares ints instead of strings; a request only has to
+    normalize, split and look up the user's own text.
+    """
+
+    def __init__(self, data_dir: Optional[str] = None):
+        self.data_dir = data_dir or os.path.join(BASE_DIR, 'data')
+        self.transcripts: Dict[str, ReferenceTranscript] = {}
+        # word -> token id, shared by all transcripts
+        self.vocabulary: Dict[str, int] = {}
+        self._load()
+
+    def _load_json(self, path: str):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Transcripts: could not load {path}: {e}")
+            return None
+
+    def _load(self):
+        books = []
+        lessons = self._load_json(os.path.join(self.data_dir, 'lessons.json'))
+        if isinstance(lessons, list):
+            books.extend(lessons)
+        for path in sorted(glob.glob(os.path.join(self.data_dir, 'book_*.json'))):
+            book = self._load_json(path)
+            if isinstance(book, dict):
+                books.append(book)
+
+        for book in books:
+            book_name = book.get('book', 'Cambridge IELTS')
+            for test in book.get('tests', []):
+                for item in test.get('listening', []):
+                    text = (item.get('transcript') or '').strip()
+                    key = transcript_key(book_name, test.get('test_number'), item.get('section_number'))
+                    if text and key not in self.transcripts:
+                        self._add(key, book_name, test.get('test_number'), item.get('section_number'), text)
+
+        print(f"Transcripts: {len(self.transcripts)} references, {len(self.vocabulary)} distinct words")
+
+    def _add(self, key: str, book: str, test, section, text: str):
+        words = tuple(normalize_text(text).split())
+        vocabulary = self.vocabulary
+        token_ids = array('i')
+        for word in words:
+            token_id = vocabulary.get(word)
+            if token_id is None:
+                token_id = vocabulary[word] = len(vocabulary)
+            token_ids.append(token_id)
+        self.transcripts[key] = ReferenceTranscript(
+            id=key, book=book, test=test, section=section,
+            text=text, words=words, token_ids=token_ids
+        )
+
+    def get(self, transcript_id: str) -> Optional[ReferenceTranscript]:
+        return self.transcripts.get(transcript_id)
+
+    def find(self, book: str, test, section) -> Optional[ReferenceTranscript]:
+        return self.transcripts.get(transcript_key(book, test, section))
+
+    def encode(self, words: List[str]) -> array:
+        """Map words to reference token ids; words no transcript contains become UNKNOWN_TOKEN"""
+        lookup = self.vocabulary.get
+        return array('i', [lookup(word, UNKNOWN_TOKEN) for word in words])
+
+    def list(self) -> List[Dict]:
+        return [t.to_dict() for t in self.transcripts.values()]
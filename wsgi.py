@@ -0,0 +1,52 @@
+"""
+Production entry point.
+
+    gunicorn -c gunicorn.conf.py                 # Linux / macOS
+    python wsgi.py                               # waitress, e.g. on Windows
+
+create_app() imports the Flask app (which builds the catalog, transcripts,
+search index and data payloads) and then finishes the work app.py leaves
+to background threads or to first use, so a preloading server has everything loaded
+before it forks and workers share it copy-on-write.
+"""
+import os
+import time
+
+from llm_client import GeminiBackend
+
+
+def create_app(warm: bool = True):
+    """
+    Build the WSGI application.
+
+    Args:
+        warm: Load NLTK and build the prepared data payloads before returning
+    """
+    start = time.perf_counter()
+    import app as application
+
+    if warm:
+        # app.py started these in background threads; no thread may hold a lock when we fork
+        for thread in (application.keyword_warm_up, application.search_warm_up, application.payload_warm_up):
+            if thread is not None:
+                thread.join()
+        application.catalog.refresh(force=True)
+        # Import google.generativeai here rather than on each worker's first Gemini call
+        if isinstance(application.llm_backend, GeminiBackend):
+            application.llm_backend.load()
+    print(f"App loaded in {time.perf_counter() - start:.2f}s (pid {os.getpid()})")
+    return application.app
+
+
+if __name__ == '__main__':
+    from waitress import serve
+
+    serve(
+        create_app(),
+        host=os.environ.get("HOST", "0.0.0.0"),
+        port=int(os.environ.get("PORT", 8000)),
+        # waitress is a single process; its threads do the I/O-bound waiting on Gemini
+        threads=int(os.environ.get("WAITRESS_THREADS", 64)),
+        connection_limit=int(os.environ.get("WAITRESS_CONNECTION_LIMIT", 1000)),
+        channel_timeout=int(os.environ.get("WAITRESS_CHANNEL_TIMEOUT", 120))
+    )